@@ -1,23 +1,31 @@
-from dash import Dash, html, dcc, Input, Output, State, no_update
+from dash import Dash, html, dcc, Input, Output, State, MATCH, no_update, \
+    ClientsideFunction
 import dash_bootstrap_components as dbc
 import os
 from flask import Flask
 
 from src.dash1 import generate_project_visualisation as viz1, \
-    update_dash1_visuals_func
+    update_project_count_zoom_fig
 from src.dash2 import generate_project_classification_visualizations as viz2, \
-    update_dash2_visuals_func, update_project_classification_overview_fig
+    update_project_classification_overview_patch
 from src.dash3 import \
     generate_project_value_distribution_visualisation as viz3, \
-    update_dash3_visuals_func, get_max_project_value, \
-    update_project_value_overview_fig
+    project_value_overview_patch, generate_value_slider_store, \
+    project_value_view, project_value_zoom, update_project_value_zoom_fig
 from src.dash4 import \
     generate_project_theme_distribution_visualisation as viz4, \
-    update_dash4_visuals_func
-from src.dash5 import generate_project_deep_dive_visualisation as viz5, \
-    update_dash5_visuals_func
-
-from src.load_data import preprocess_data, get_project_classification
+    update_project_theme_zoom_fig
+from src.dash5 import generate_project_deep_dive_visualisation as viz5
+
+from src.data_store import DataStore
+from src.encoded_figures import encoded_figures
+from src.figure_cache import FigureCache
+from src.figure_pool import figure_pool
+from src.level_of_detail import others_zoom
+from src.load_data import distinguish_data
+from src.metrics import metrics
+from src.table_query import CLASSIFICATION_FILTER_TYPE, \
+    CLASSIFICATION_MATCH_TYPE, TABLE_TYPE, query_table
 
 from assets.config import Config
 
@@ -28,8 +36,16 @@ title = "Nottingham Project List Dashboard"
 # Read in data
 print('Reading data...')
 curr_path = os.getcwd()
-data_path = os.path.join(curr_path, 'Master Project List D2N2.xlsx')
-raw_data = preprocess_data(data_path)
+data_paths = [os.path.join(curr_path, path) for path in config.data_paths]
+data_store = DataStore(data_paths)
+if config.hot_reload:
+    data_store.start_watching()
+
+# Outputs are cached per data version, a reload invalidates them
+figure_cache = FigureCache()
+
+# Figures are serialized once when built, cached outputs reuse the JSON
+encode = encoded_figures.encode
 
 # Initialize the app
 print("Initialise app...")
@@ -42,62 +58,123 @@ app = Dash(
 
 server = app.server
 
+
+# Lets caches and clients detect a reloaded workbook
+@server.route('/data-version')
+def data_version():
+    return {'version': data_store.version}
+
+
+if config.metrics:
+    metrics.init_app(server, lambda: data_store.version)
+    metrics.gauge('dash_data_version', 'Version of the loaded workbook',
+                  lambda: data_store.version)
+    for stat in ('size', 'hits', 'misses'):
+        metrics.gauge(f'dash_figure_cache_{stat}',
+                      f'Figure cache {stat}',
+                      lambda stat=stat: figure_cache.stats()[stat])
+    for stat in ('builds', 'shared', 'timeouts', 'pending'):
+        metrics.gauge(f'dash_figure_pool_{stat}',
+                      f'Figure pool {stat}',
+                      lambda stat=stat: figure_pool.stats()[stat])
+
+# Registered after the metrics hooks so it runs before them
+if config.encoded_figures:
+    encoded_figures.init_app(server)
+
+
 # Dropdown for council
-council_dropdown = html.Div(
-    [
-        dbc.Label("Select a Council", html_for="council_dropdown"),
-        dcc.Dropdown(
-            id="council-dropdown",
-            options=sorted(raw_data[(
-            'Fast Followers member', 'Unnamed: 0_level_1',
-            'Organisations')].unique()),
-            value=config.default_council,
-            clearable=False,
-            style={'marginBottom': '5px'}
-        ),
-    ]
-)
+def council_dropdown(data):
+    return html.Div(
+        [
+            dbc.Label("Select a Council", html_for="council_dropdown"),
+            dcc.Dropdown(
+                id="council-dropdown",
+                options=list(data.councils),
+                value=config.default_council,
+                clearable=False,
+                style={'marginBottom': '5px'}
+            ),
+        ]
+    )
+
 
 # Dropdown for project classification
-project_classification_dropdown = html.Div(
-    children=[
-        html.Label("Pick a Classification"),
-        html.Div(
-            children=dcc.Checklist(
-                id="project-classification-checklist",
-                options=[
-                    {"label": "Select All Classification", "value": "All"}],
-                value=[],
+def project_classification_dropdown(data):
+    return html.Div(
+        children=[
+            html.Label("Pick a Classification"),
+            html.Div(
+                children=dcc.Checklist(
+                    id="project-classification-checklist",
+                    options=[
+                        {"label": "Select All Classification",
+                         "value": "All"}],
+                    value=[],
+                ),
             ),
-        ),
-        html.Div(
-            children=dcc.Dropdown(
-                id="project-classification-dropdown",
-                options=get_project_classification(raw_data.copy()),
-                value=get_project_classification(raw_data.copy()),
-                multi=True,
-                searchable=True,
+            html.Div(
+                children=dcc.Dropdown(
+                    id="project-classification-dropdown",
+                    options=list(data.classification_names),
+                    value=list(data.classification_names),
+                    multi=True,
+                    searchable=True,
+                ),
             ),
-        ),
-    ],
-)
+        ],
+    )
+
+
+# What zooming into the project value chart needs of it, so the callback
+# does not take the whole figure as State
+def project_value_view_store(fig_bar):
+    return dcc.Store(id='project-value-distribution-view',
+                     data=project_value_view(fig_bar))
+
+
+# View of a chart that may sum councils into 'Others', read when zooming
+def others_view_store(store_id, fig):
+    return dcc.Store(id=store_id, data=fig['layout'].get('meta') or {})
+
+
+# The chart is redrawn in the browser up to lod_threshold projects. The
+# store holds every project, so larger datasets are patched from the server
+# and their response stays the size of the binned chart.
+def clientside_value_slider(data) -> bool:
+    return config.clientside_value_slider and \
+        len(data.project_values) <= config.lod_threshold
+
 
 # Slider for project value
-project_value_slider = html.Div(
-    children=[
-        html.Label("Project Value Slider"),
-        html.Div(
-            children=dcc.RangeSlider(
-                id="project-value-slider",
-                min=0,
-                max=get_max_project_value(raw_data.copy()),
-                value=[0, get_max_project_value(raw_data.copy())],
-                tooltip={"placement": "bottom", "always_visible": True},
-                allowCross=False,
-            ),
-        )
-    ],
-)
+def project_value_slider(data):
+    # Sorted values for redrawing the chart in the browser, kept encoded in
+    # the figure cache rather than as lists of Python objects
+    if clientside_value_slider(data):
+        slider_id = "project-value-client-slider"
+        value_store = [dcc.Store(
+            id="project-value-store",
+            data=encode(generate_value_slider_store(data)))]
+    else:
+        slider_id = "project-value-slider"
+        value_store = []
+
+    return html.Div(
+        children=value_store + [
+            html.Label("Project Value Slider"),
+            html.Div(
+                children=dcc.RangeSlider(
+                    id=slider_id,
+                    min=0,
+                    max=data.max_project_value,
+                    value=[0, data.max_project_value],
+                    tooltip={"placement": "bottom", "always_visible": True},
+                    allowCross=False,
+                ),
+            )
+        ],
+    )
+
 
 app.layout = html.Div([
     dbc.Container([
@@ -159,83 +236,193 @@ app.layout = html.Div([
 ], style={'backgroundColor': 'white', 'minHeight': '100vh'})
 
 
-# Update dash 1
+# Council view of the visible dashboard. Only mounted with the council
+# dropdown, and the tab render already builds the default council.
 @app.callback(
-    Output("project-count-card", "children"),
-    Output('project-count-graph1', 'figure'),
-    Output('project-count-graph2', 'children'),
-    Input("council-dropdown", "value")
+    Output('council-content', 'children'),
+    Input('council-dropdown', 'value'),
+    State('graph-tabs', 'value'),
+    prevent_initial_call=True
 )
-def update_dash1_visuals(council):
-    return update_dash1_visuals_func(raw_data.copy(), council)
+@metrics.callback
+@encoded_figures.callback
+def update_council_content(council, tab):
+    return figure_cache.call(
+        council_content, data_store.current(), tab, council)
 
 
-# Update dash 2
+# Project classification overview
 @app.callback(
-    Output("project-classification-graph1", "figure"),
-    Output('project-classification-graph2', 'figure'),
-    Input("council-dropdown", "value")
+    Output("project-classification-dropdown", "value"),
+    Output("project-classification-graph1", "figure", allow_duplicate=True),
+    [Input("project-classification-checklist", "value"),
+     Input("project-classification-dropdown", "value")]
 )
-def update_dash2_visuals(council):
-    return update_dash2_visuals_func(raw_data.copy(), council)
+@metrics.callback
+@encoded_figures.callback
+def update_classification_dropdown(select_all, select_some):
+    data = data_store.current()
+
+    if select_all == ["All"]:
+        value = list(data.classification_names)
+    else:
+        value = no_update
+
+    # Only the visibility of the chart's traces and its height change
+    fig = figure_cache.call(update_project_classification_overview_patch,
+                            data, select_some, select_all)
+
+    return value, fig
+
+
+# Project value distribution overview, see clientside_value_slider
+if config.clientside_value_slider:
+    # See assets/project_value_slider.js
+    app.clientside_callback(
+        ClientsideFunction(namespace='project_value',
+                           function_name='filter_figure'),
+        Output("project-value-distribution-graph1", "figure",
+               allow_duplicate=True),
+        Output("project-value-distribution-view", "data",
+               allow_duplicate=True),
+        Input("project-value-client-slider", "value"),
+        State("project-value-store", "data"),
+        prevent_initial_call=True
+    )
 
 
-# Update dash 3
 @app.callback(
-    Output("project-value-distribution-graph1", "figure"),
-    Input("council-dropdown", "value")
+    Output("project-value-distribution-graph1", "figure",
+           allow_duplicate=True),
+    Output("project-value-distribution-view", "data",
+           allow_duplicate=True),
+    Input("project-value-slider", "value")
 )
-def update_dash3_visuals(council):
-    return update_dash3_visuals_func(raw_data.copy(), council)
+@metrics.callback
+@encoded_figures.callback
+def update_project_value_slider(slider_value):
+    fig, view = figure_cache.call(project_value_overview_patch,
+                                  data_store.current(), slider_value)
 
+    return fig, view
 
-# Update dash 4
+
+# Zooming into a binned project value chart fetches the finer detail
 @app.callback(
-    Output("project-theme-distribution-graph1", "figure"),
-    Input("council-dropdown", "value")
+    Output("project-value-distribution-graph1", "figure",
+           allow_duplicate=True),
+    Output("project-value-distribution-view", "data", allow_duplicate=True),
+    Input("project-value-distribution-graph1", "relayoutData"),
+    State("project-value-distribution-view", "data"),
+    prevent_initial_call=True
 )
-def update_dash4_visuals(council):
-    return update_dash4_visuals_func(raw_data.copy(), council)
+@metrics.callback
+@encoded_figures.callback
+def zoom_project_value_graph(relayout, view):
+    zoom = project_value_zoom(relayout, view)
+    if zoom is None:
+        return no_update, no_update
+
+    return figure_cache.call(project_value_zoom_outputs,
+                             data_store.current(), *zoom)
 
 
-# Update dash 5
+def project_value_zoom_outputs(data, low, high, view):
+    fig_bar = update_project_value_zoom_fig(data, low, high, view)
+    return encode(fig_bar), project_value_view(fig_bar)
+
+
+# Zooming into the 'Others' bar of a large council chart fetches the
+# councils in it, double-clicking returns to the top councils
 @app.callback(
-    Output("project-deep-dive-graph1", "children"),
-    Input("council-dropdown", "value")
+    Output("project-count-graph1", "figure"),
+    Output("project-count-view", "data"),
+    Input("project-count-graph1", "relayoutData"),
+    State("project-count-view", "data"),
+    prevent_initial_call=True
 )
-def update_dash5_visuals(council):
-    return update_dash5_visuals_func(raw_data.copy(), council)
+@metrics.callback
+@encoded_figures.callback
+def zoom_project_count_graph(relayout, view):
+    skip = others_zoom(relayout, view)
+    if skip is None:
+        return no_update, no_update
+
+    return figure_cache.call(project_count_zoom_outputs,
+                             data_store.current(), skip)
+
+
+def project_count_zoom_outputs(data, skip):
+    fig_bar = update_project_count_zoom_fig(data, skip)
+    return encode(fig_bar), fig_bar['layout'].get('meta') or {}
 
 
-# Project classification overview
 @app.callback(
-    Output("project-classification-dropdown", "value"),
-    Output("project-classification-graph1", "figure", allow_duplicate=True),
-    [Input("project-classification-checklist", "value"),
-     Input("project-classification-dropdown", "value")]
+    Output("project-theme-distribution-graph1", "figure"),
+    Output("project-theme-distribution-view", "data"),
+    Input("project-theme-distribution-graph1", "relayoutData"),
+    State("project-theme-distribution-view", "data"),
+    prevent_initial_call=True
 )
-def update_classification_dropdown(select_all, select_some):
-    if select_all == ["All"]:
-        value = get_project_classification(raw_data.copy())
-    else:
-        value = no_update
+@metrics.callback
+@encoded_figures.callback
+def zoom_project_theme_graph(relayout, view):
+    skip = others_zoom(relayout, view)
+    if skip is None:
+        return no_update, no_update
 
-    fig = update_project_classification_overview_fig(
-        raw_data.copy(), select_some, select_all)
+    return figure_cache.call(project_theme_zoom_outputs,
+                             data_store.current(), skip)
 
-    return value, fig
+
+def project_theme_zoom_outputs(data, skip):
+    fig_bar = update_project_theme_zoom_fig(data, skip)
+    return encode(fig_bar), fig_bar['layout'].get('meta') or {}
+
+
+# Server-side paging, sorting and filtering of the project tables
+def table_input(prop):
+    return Input({'type': TABLE_TYPE, 'tab': MATCH, 'council': MATCH}, prop)
 
 
-# Project value distribution overview
 @app.callback(
-    Output("project-value-distribution-graph1", "figure",
-           allow_duplicate=True),
-    Input("project-value-slider", "value")
+    Output({'type': TABLE_TYPE, 'tab': MATCH, 'council': MATCH}, 'data'),
+    Output({'type': TABLE_TYPE, 'tab': MATCH, 'council': MATCH},
+           'page_count'),
+    table_input('page_current'),
+    table_input('page_size'),
+    table_input('sort_by'),
+    table_input('filter_query'),
+    Input({'type': CLASSIFICATION_FILTER_TYPE, 'tab': MATCH,
+           'council': MATCH}, 'value'),
+    Input({'type': CLASSIFICATION_MATCH_TYPE, 'tab': MATCH,
+           'council': MATCH}, 'value'),
+    State({'type': TABLE_TYPE, 'tab': MATCH, 'council': MATCH}, 'id'),
+    prevent_initial_call=True
 )
-def update_classification_dropdown(slider_value):
-    fig = update_project_value_overview_fig(raw_data.copy(), slider_value)
-
-    return fig
+@metrics.callback
+def update_project_table(page_current, page_size, sort_by, filter_query,
+                         classifications, match, table_id):
+    data = data_store.current()
+    df = distinguish_data(table_id['tab'], data.project_table(),
+                          table_id['council'], data.council_index['projects'])
+
+    # Bitwise on the packed classifications, one per project, then only
+    # the council's as distinguish_data picks them
+    keep = None
+    if classifications:
+        keep = data.classification_flags.mask(classifications, match)
+        if table_id['tab'] == 'council_view':
+            keep = keep[data.council_index['projects'].get(
+                table_id['council'], [])]
+
+    try:
+        return query_table(df, page_current or 0, page_size, sort_by,
+                           filter_query, keep)
+    except ValueError:
+        # A filter the server cannot apply leaves the table as it was,
+        # rather than showing rows it did not filter
+        return no_update, no_update
 
 
 # @app.callback(
@@ -264,111 +451,155 @@ def update_classification_dropdown(slider_value):
 #     )
 
 
-@app.callback(
-    Output('tabs-content', 'children'),
-    [Input('graph-tabs', 'value'),
-     Input('tabs', 'value')]
-)
-def update_tab(tab, tab2):
+def council_content(data, tab, council):
     if tab == 'project_count':
-        fig_card, fig_bar, fig_donut, table_fig = viz1(raw_data.copy(), tab2)
-        if tab2 == "overview":
-            return html.Div([
-                fig_card,
-                html.Div([
-                    dcc.Graph(id='project-count-graph1', figure=fig_bar),
-                ], style={'width': '100%', 'paddingTop': '20px',
-                          'paddingBottom': '20px',
-                          'display': 'inline-block'})
-            ])
-        else:
-            return html.Div([
-                dbc.Col([council_dropdown]),
-                fig_card,
-                html.Div([
-                    dcc.Graph(id='project-count-graph1', figure=fig_donut),
-                ], style={'width': '50%', 'paddingTop': '20px',
-                          'paddingBottom': '5px', 'margin': 'auto'}),
-                html.Div([
-                    table_fig,
-                ], id="project-count-graph2", style={'width': '100%'}),
-            ])
+        fig_card, _, fig_donut, table_fig = viz1(data, 'council_view', council)
+        return [
+            fig_card,
+            html.Div([
+                others_view_store('project-count-view', fig_donut),
+                dcc.Graph(id='project-count-graph1',
+                          figure=encode(fig_donut)),
+            ], style={'width': '50%', 'paddingTop': '20px',
+                      'paddingBottom': '5px', 'margin': 'auto'}),
+            html.Div([
+                table_fig,
+            ], id="project-count-graph2", style={'width': '100%'}),
+        ]
     elif tab == 'project_classification':
-        fig1, donut_fig = viz2(raw_data.copy(), tab2)
-
-        if tab2 == "overview":
-            return html.Div([
-                dbc.Col([project_classification_dropdown]),
-                html.Div([
-                    dcc.Graph(id='project-classification-graph1', figure=fig1),
-                ], style={'width': '100%', 'display': 'inline-block',
-                          'height': '150vh', 'paddingTop': '20px'}),
-            ])
-        else:
-            return html.Div([
-                dbc.Col([council_dropdown]),
-                html.Div([
-                    dcc.Graph(id='project-classification-graph1', figure=fig1),
-                ], style={'width': '60%', 'paddingTop': '20px',
-                          'display': 'inline-block'}),
-                html.Div([
-                    dcc.Graph(id='project-classification-graph2',
-                              figure=donut_fig),
-                ], style={'width': '40%', 'paddingTop': '20px',
-                          'paddingBottom': '5px',
-                          'display': 'inline-block'}),
-            ])
+        fig1, donut_fig = viz2(data, 'council_view', council)
+        return [
+            html.Div([
+                dcc.Graph(id='project-classification-graph1',
+                          figure=encode(fig1)),
+            ], style={'width': '60%', 'paddingTop': '20px',
+                      'display': 'inline-block'}),
+            html.Div([
+                dcc.Graph(id='project-classification-graph2',
+                          figure=encode(donut_fig)),
+            ], style={'width': '40%', 'paddingTop': '20px',
+                      'paddingBottom': '5px',
+                      'display': 'inline-block'}),
+        ]
     elif tab == 'project_value_distribution':
-        fig_bar = viz3(raw_data.copy(), tab2)
-
-        if tab2 == 'overview':
-            return html.Div([
-                dbc.Col([project_value_slider]),
-                html.Div([
-                    dcc.Graph(id='project-value-distribution-graph1',
-                              figure=fig_bar),
-                ], style={'width': '100%', 'paddingTop': '20px'}),
-            ])
-        else:
-            return html.Div([
-                dbc.Col([council_dropdown]),
-                html.Div([
-                    dcc.Graph(id='project-value-distribution-graph1',
-                              figure=fig_bar),
-                ], style={'width': '100%', 'paddingTop': '20px'}),
-            ])
+        fig_bar = viz3(data, 'council_view', council)
+        return [
+            html.Div([
+                project_value_view_store(fig_bar),
+                dcc.Graph(id='project-value-distribution-graph1',
+                          figure=encode(fig_bar)),
+            ], style={'width': '100%', 'paddingTop': '20px'}),
+        ]
     elif tab == 'project_theme_distribution':
-        fig_bar = viz4(raw_data.copy(), tab2)
-
-        if tab2 == "overview":
-            return html.Div([
-                html.Div([
-                    dcc.Graph(id='project-theme-distribution-graph1',
-                              figure=fig_bar),
-                ], style={'width': '100%', 'paddingTop': '20px'}),
-            ])
-        else:
-            return html.Div([
-                dbc.Col([council_dropdown]),
-                html.Div([
-                    dcc.Graph(id='project-theme-distribution-graph1',
-                              figure=fig_bar),
-                ], style={'width': '100%', 'paddingTop': '20px'}),
-            ])
+        fig_bar = viz4(data, 'council_view', council)
+        return [
+            html.Div([
+                others_view_store('project-theme-distribution-view',
+                                  fig_bar),
+                dcc.Graph(id='project-theme-distribution-graph1',
+                          figure=encode(fig_bar)),
+            ], style={'width': '100%', 'paddingTop': '20px'}),
+        ]
     elif tab == 'project_deep_dive':
-        table_fig = viz5(raw_data.copy(), tab2)
-
-        if tab2 == "overview":
-            return html.Div([
+        table_fig = viz5(data, 'council_view', council)
+        return [
+            html.Div([
                 table_fig,
-            ], id="project-deep-dive-graph1", style={'width': '100%'})
-        else:
-            return html.Div([
-                dbc.Col([council_dropdown]),
-                html.Div([
-                    table_fig,
-                ], id="project-deep-dive-graph1", style={'width': '100%'}),
-            ])
+            ], id="project-deep-dive-graph1", style={'width': '100%'}),
+        ]
+
+
+def render_tab(data, tab, tab2):
+    if tab2 == 'council_view':
+        return html.Div([
+            dbc.Col([council_dropdown(data)]),
+            html.Div(council_content(data, tab, config.default_council),
+                     id='council-content'),
+        ])
+
+    if tab == 'project_count':
+        fig_card, fig_bar, _, _ = viz1(data, tab2)
+        return html.Div([
+            fig_card,
+            html.Div([
+                others_view_store('project-count-view', fig_bar),
+                dcc.Graph(id='project-count-graph1',
+                          figure=encode(fig_bar)),
+            ], style={'width': '100%', 'paddingTop': '20px',
+                      'paddingBottom': '20px',
+                      'display': 'inline-block'})
+        ])
+    elif tab == 'project_classification':
+        fig1, _ = viz2(data, tab2)
+        return html.Div([
+            dbc.Col([project_classification_dropdown(data)]),
+            html.Div([
+                dcc.Graph(id='project-classification-graph1',
+                          figure=encode(fig1)),
+            ], style={'width': '100%', 'display': 'inline-block',
+                      'height': '150vh', 'paddingTop': '20px'}),
+        ])
+    elif tab == 'project_value_distribution':
+        fig_bar = viz3(data, tab2)
+        return html.Div([
+            dbc.Col([project_value_slider(data)]),
+            html.Div([
+                project_value_view_store(fig_bar),
+                dcc.Graph(id='project-value-distribution-graph1',
+                          figure=encode(fig_bar)),
+            ], style={'width': '100%', 'paddingTop': '20px'}),
+        ])
+    elif tab == 'project_theme_distribution':
+        fig_bar = viz4(data, tab2)
+        return html.Div([
+            html.Div([
+                others_view_store('project-theme-distribution-view',
+                                  fig_bar),
+                dcc.Graph(id='project-theme-distribution-graph1',
+                          figure=encode(fig_bar)),
+            ], style={'width': '100%', 'paddingTop': '20px'}),
+        ])
+    elif tab == 'project_deep_dive':
+        table_fig = viz5(data, tab2)
+        return html.Div([
+            table_fig,
+        ], id="project-deep-dive-graph1", style={'width': '100%'})
+
+
+# Sent when a tab is built for the first time and takes longer than
+# figure_pool_timeout, the build carries on in the pool
+def pending_tab(data, tab, tab2):
+    return html.Div(
+        html.P("This dashboard is still loading, select the tab again in a "
+               "moment.", style={'fontWeight': 'bold'}),
+        style={'textAlign': 'center', 'paddingTop': '40px',
+               'color': config.secondary_color})
+
+
+# Tabs are built in the figure pool, off the request thread
+offloaded_tab = figure_pool.offload(render_tab, fallback=pending_tab)
+
+
+def build_tab(data, tab, tab2):
+    # Tabs with a project table are built in the worker, which loads the
+    # project details once for them and update_project_table, rather than
+    # each pool process loading its own copy
+    if tab == 'project_deep_dive' or (
+            tab == 'project_count' and tab2 == 'council_view'):
+        return render_tab(data, tab, tab2)
+
+    return offloaded_tab(data, tab, tab2)
+
+
+@app.callback(
+    Output('tabs-content', 'children'),
+    [Input('graph-tabs', 'value'),
+     Input('tabs', 'value')]
+)
+@metrics.callback
+@encoded_figures.callback
+def update_tab(tab, tab2):
+    return figure_cache.call(build_tab, data_store.current(), tab, tab2)
 
 
 if __name__ == '__main__':
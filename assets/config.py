@@ -1,7 +1,75 @@
+import os
+
+
 class Config:
+    # Workbooks to load, relative to the working directory. Each one, e.g. a
+    # region's, is a partition of the data tagged with its file name.
+    # PROJECT_WORKBOOK separates several with os.pathsep.
+    data_paths = os.environ.get(
+        'PROJECT_WORKBOOK', 'Master Project List D2N2.xlsx').split(os.pathsep)
+
     default_council = "Nottingham City Council"
     primary_color = "#C0D731"
     secondary_color = "#4A4B4D"
+
+    # Cache the parsed workbook as an Arrow file next to it
+    snapshot_cache = True
+
+    # Also write the cleaned model next to it, so a restart or a recycled
+    # worker skips cleaning the workbook. Rebuilt when src/ changes.
+    model_snapshot = os.environ.get('MODEL_SNAPSHOT', '1') != '0'
+
+    # Decode the free-text project columns from the snapshot the first time
+    # a project table is opened, the dashboards do not use them
+    lazy_details = True
+
+    # Parse workbooks through openpyxl's read-only row iterator, in typed
+    # chunks of stream_chunk_rows rows, instead of loading every cell first
+    stream_workbooks = True
+    stream_chunk_rows = 10_000
+
+    # Workbooks without a current snapshot are parsed in up to this many
+    # processes at once
+    ingest_processes = os.cpu_count()
+
+    # Reload the workbook in the background when it changes on disk
+    hot_reload = True
+    reload_interval = 5
+
+    # Under gunicorn, load the workbook once in the master and fork the
+    # workers from it so they share its pages, see gunicorn.conf.py
+    shared_data = os.environ.get('SHARED_PROJECT_DATA', '1') != '0'
+
+    # Max number of cached dashboard outputs per worker
+    figure_cache_size = 256
+
+    # Build the dashboard tabs in processes forked from each worker, so a
+    # slow build does not hold the GIL against other callbacks. After
+    # figure_pool_timeout seconds the previous or a placeholder tab is sent.
+    # Every gunicorn worker forks its own pool, so a server runs workers x
+    # (1 + figure_pool_processes) processes, see gunicorn.conf.py
+    figure_pool = True
+    figure_pool_processes = int(os.environ.get('FIGURE_POOL_PROCESSES', '2'))
+    figure_pool_timeout = 10
+
+    # Page, sort and filter project tables on the server
+    server_side_tables = True
+
+    # Filter the project value chart in the browser as the slider moves
+    clientside_value_slider = True
+
+    # Serialize figures once when built, not on every callback response
+    encoded_figures = True
+
+    # Charts with more bars than this are aggregated: project values into
+    # lod_bins value bins, councils into the top lod_top_n plus 'Others'
+    lod_threshold = 500
+    lod_bins = 100
+    lod_top_n = 100
+
+    # Server-Timing headers on callbacks and a Prometheus /metrics route
+    metrics = True
+
     tab_style = {
         'idle': {
             'borderRadius': '10px',
@@ -0,0 +1,51 @@
+// Redraws the project value overview chart for a slider range without a
+// server round trip. The store holds the projects sorted by value, so the
+// range is one contiguous slice found by binary search. Also returns the
+// chart's view store, as dash3.project_value_view builds it. The store is
+// only sent up to lod_threshold projects, so the chart is never binned here.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    project_value: {
+        filter_figure: function (sliderValue, store) {
+            if (!store || !sliderValue) {
+                const noUpdate = window.dash_clientside.no_update;
+                return [noUpdate, noUpdate];
+            }
+
+            const start = firstIndex(store.values, v => v >= sliderValue[0]);
+            const end = firstIndex(store.values, v => v > sliderValue[1]);
+
+            const names = store.names.slice(start, end);
+            const figure = store.figure;
+
+            return [{
+                data: [Object.assign({}, figure.data[0], {
+                    x: store.values.slice(start, end),
+                    y: names,
+                })],
+                layout: Object.assign({}, figure.layout, {
+                    height: Math.max(1100, new Set(names).size * 40),
+                    yaxis: Object.assign({}, figure.layout.yaxis, {
+                        tickvals: names,
+                        ticktext: store.ticktext.slice(start, end),
+                    }),
+                }),
+            }, {view: {}, bins: []}];
+        },
+    },
+});
+
+// First index of a sorted array where predicate holds
+function firstIndex(values, predicate) {
+    let low = 0;
+    let high = values.length;
+
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (predicate(values[mid])) {
+            high = mid;
+        } else {
+            low = mid + 1;
+        }
+    }
+    return low;
+}
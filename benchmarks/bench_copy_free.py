@@ -0,0 +1,88 @@
+"""
+Latency and peak allocation of each server callback on the shared,
+read-only data, against the same callback given its own copy of every
+frame, as app.py copied the workbook before each callback. Allocations are
+traced with tracemalloc, which does not see Arrow's string buffers.
+
+    python -m benchmarks.bench_copy_free
+    python -m benchmarks.bench_copy_free --rows 100000 --councils 500
+"""
+import argparse
+import dataclasses
+import time
+import tracemalloc
+
+import pandas as pd
+
+from assets.config import Config
+from benchmarks.check_read_only import callbacks
+from benchmarks.run_benchmarks import workbook_path
+
+config = Config()
+
+
+def copied(data):
+    """
+    data with a deep copy of each of its frames
+    :param data: ProjectData
+    :return: ProjectData
+    """
+    return dataclasses.replace(data, **{
+        field.name: getattr(data, field.name).copy()
+        for field in dataclasses.fields(data)
+        if isinstance(getattr(data, field.name), pd.DataFrame)})
+
+
+def latency(callback, data, copy: bool, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        callback(copied(data) if copy else data)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def peak_allocation(callback, data, copy: bool) -> int:
+    tracemalloc.start()
+    try:
+        callback(copied(data) if copy else data)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--rows', type=int,
+                        help='use a synthetic workbook with this many rows')
+    parser.add_argument('--councils', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.rows:
+        # Read by the app on import
+        Config.data_paths = [workbook_path(args.rows, args.councils, 0)]
+
+    from app import data_store
+
+    data = data_store.current()
+    data.project_table()
+
+    print(f'{len(data.projects)} projects')
+    print(f"{'callback':<52} {'copied ms':>10} {'shared ms':>10} "
+          f"{'saved':>6} {'copied MB':>10} {'shared MB':>10}")
+    for name, callback in callbacks(data).items():
+        # The first call warms caches such as the project table's
+        callback(data)
+        before = latency(callback, data, True, args.repeat)
+        after = latency(callback, data, False, args.repeat)
+        before_mb = peak_allocation(callback, data, True) / 2 ** 20
+        after_mb = peak_allocation(callback, data, False) / 2 ** 20
+        print(f"{name:<52} {before * 1000:>10.1f} {after * 1000:>10.1f} "
+              f"{1 - after / before:>6.0%} {before_mb:>10.1f} "
+              f"{after_mb:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
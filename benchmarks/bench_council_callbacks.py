@@ -0,0 +1,85 @@
+"""
+Server CPU per council interaction with the routed council callback
+against the previous five per-dashboard callbacks, which all fired on
+every dropdown change and again when a council view was first rendered.
+
+    python -m benchmarks.bench_council_callbacks
+"""
+import time
+
+from plotly.io.json import to_json_plotly
+
+from app import council_content, render_tab
+from assets.config import Config
+from benchmarks.generate_workbook import generate_frame
+from benchmarks.load_harness import GRAPH_TABS
+from src.load_data import preprocess_data
+from src.project_data import ProjectData
+
+config = Config()
+
+REPEAT = 5
+
+
+def previous_council_change(data, tab, council):
+    # One callback per dashboard, whichever tab is visible
+    return [council_content(data, t, council) for t in GRAPH_TABS]
+
+
+def current_council_change(data, tab, council):
+    return [council_content(data, tab, council)]
+
+
+def previous_council_view(data, tab, council):
+    # The tab render plus the five callbacks firing for the new dropdown
+    return [render_tab(data, tab, 'council_view')] + \
+        previous_council_change(data, tab, council)
+
+
+def current_council_view(data, tab, council):
+    return [render_tab(data, tab, 'council_view')]
+
+
+def cpu_time(func, data, tab, council) -> float:
+    # Outputs are serialized as Dash would before responding
+    times = []
+    for _ in range(REPEAT):
+        start = time.process_time()
+        for output in func(data, tab, council):
+            to_json_plotly(output)
+        times.append(time.process_time() - start)
+    return min(times)
+
+
+def main():
+    workbooks = {
+        'bundled workbook': preprocess_data(config.data_paths),
+        'synthetic 10k x 100': ProjectData.from_raw(
+            generate_frame(10_000, councils=100)),
+    }
+
+    interactions = {
+        'council change': (previous_council_change, current_council_change),
+        'open council view': (previous_council_view, current_council_view),
+    }
+
+    print(f"{'workbook':<22} {'interaction':<18} {'tab':<28} "
+          f"{'previous (ms)':>14} {'current (ms)':>13} {'saved':>7}")
+    for name, data in workbooks.items():
+        council = data.councils[-1]
+        for interaction, (previous, current) in interactions.items():
+            # Council views open on the default council
+            if interaction == 'open council view' and \
+                    config.default_council not in data.councils:
+                continue
+
+            for tab in GRAPH_TABS:
+                before = cpu_time(previous, data, tab, council)
+                after = cpu_time(current, data, tab, council)
+                print(f"{name:<22} {interaction:<18} {tab:<28} "
+                      f"{before * 1000:>14.1f} {after * 1000:>13.1f} "
+                      f"{1 - after / before:>6.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Times dash2.clean_data against the previous per-cell implementation on
+synthetic workbooks of 10k, 100k and 1M projects.
+
+    python -m benchmarks.bench_dash2_clean_data
+"""
+import time
+
+import pandas as pd
+
+from benchmarks.generate_workbook import generate_frame
+from src import dash2
+
+ROWS = [10_000, 100_000, 1_000_000]
+REPEAT = 3
+
+
+def previous_clean_data(df: pd.DataFrame) -> pd.DataFrame:
+    # dash2.clean_data before vectorisation, kept as the baseline
+    column_index = df.columns.get_loc(
+        ('Project Classification', 'Power Generation', 'Solar'))
+    df_project_classification = pd.concat(
+        [df.iloc[:, :2], df.iloc[:, column_index:]], axis=1)
+    df_project_classification.columns = (
+        df_project_classification.columns.droplevel(0))
+
+    columns_to_fill = [column for column in df_project_classification.columns
+                       if column[0] != 'Unnamed: 0_level_1'
+                       and column[0] != 'Unnamed: 1_level_1']
+
+    df_project_classification[columns_to_fill] = df_project_classification[
+        columns_to_fill].fillna(0)
+    for col in columns_to_fill:
+        df_project_classification[col] = df_project_classification[col].apply(
+            lambda x: 0 if isinstance(x, str) else int(x))
+
+    grouped = df_project_classification.groupby(
+        ('Unnamed: 0_level_1', 'Organisations'))[columns_to_fill].sum()
+    df_melted = grouped.reset_index().melt(
+        id_vars=[('Unnamed: 0_level_1', 'Organisations')],
+        value_vars=columns_to_fill)
+    df_melted.columns = ['Organisations', 'Project Classification',
+                         'Project Classification Breakdown', 'Count']
+    df_melted['Project Classification Count'] = (
+        df_melted.groupby(['Organisations', 'Project Classification'])[
+            'Count'].transform('sum'))
+    return df_melted
+
+
+def best_time(func, df) -> float:
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(df)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    print(f"{'rows':>10} {'previous (s)':>14} {'current (s)':>13} "
+          f"{'speedup':>8}")
+    for rows in ROWS:
+        df = generate_frame(rows, councils=100)
+        pd.testing.assert_frame_equal(
+            previous_clean_data(df), dash2.clean_data(df))
+
+        previous = best_time(previous_clean_data, df)
+        current = best_time(dash2.clean_data, df)
+        print(f"{rows:>10} {previous:>14.3f} {current:>13.3f} "
+              f"{previous / current:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
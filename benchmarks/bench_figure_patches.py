@@ -0,0 +1,101 @@
+"""
+Response size and server time of the classification filter and the
+server-side value slider (Config.clientside_value_slider = False) when they
+send a Patch of the chart in the browser, against rebuilding the whole
+figure as they did before.
+
+    python -m benchmarks.bench_figure_patches
+    python -m benchmarks.bench_figure_patches --rows 100000 --councils 500
+"""
+import argparse
+import os
+import time
+
+from plotly.io.json import to_json_plotly
+
+from benchmarks.load_harness import ROOT
+from benchmarks.run_benchmarks import workbook_path
+from src.dash2 import generate_bar_fig, \
+    update_project_classification_overview_patch
+from src.dash3 import project_value_overview_patch, \
+    update_project_value_overview_fig
+from src.encoded_figures import encoded_figures
+from src.load_data import preprocess_data
+
+REPEAT = 5
+
+
+def previous_classification_fig(data, select_some, select_all):
+    # The figure the classification filter rebuilt on every change
+    if select_all != ['All']:
+        df_clean = data.classification_cube.slice(select_some)
+    else:
+        df_clean = data.classifications
+
+    return generate_bar_fig(df_clean, "Count", "Organisations",
+                            "Project Classification Breakdown",
+                            "Project Classification Count Per Council")
+
+
+def response_bytes(output) -> int:
+    # As Dash serializes it, with the encoded parts expanded
+    return len(encoded_figures.expand(to_json_plotly(output).encode()))
+
+
+def measure(func, data, *args) -> tuple:
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        output = func(data, *args)
+        times.append(time.perf_counter() - start)
+    return response_bytes(output), min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--workbook',
+                        default=os.path.join(ROOT,
+                                             'Master Project List D2N2.xlsx'))
+    parser.add_argument('--rows', type=int,
+                        help='use a synthetic workbook with this many rows')
+    parser.add_argument('--councils', type=int, default=100)
+    args = parser.parse_args()
+
+    workbook = args.workbook
+    if args.rows:
+        workbook = workbook_path(args.rows, args.councils, 0)
+
+    data = preprocess_data(workbook)
+    names = list(data.classification_names)
+    values = data.project_value_index.values
+
+    classifications = (previous_classification_fig,
+                       update_project_classification_overview_patch)
+    cases = {}
+    for n in (1, 3, 6):
+        cases[f'classifications, {n} of {len(names)}'] = (
+            *classifications, (names[:n], []))
+    cases['classifications, select all'] = (
+        *classifications, (names, ['All']))
+
+    # Ranges holding about these shares of the projects
+    for share in (0.001, 0.01, 0.1, 1):
+        high = int(values[max(0, int(len(values) * share) - 1)])
+        cases[f'value slider, {share:.1%} of projects'] = (
+            update_project_value_overview_fig, project_value_overview_patch,
+            ([int(values[0]), high],))
+
+    print(f'{os.path.basename(workbook)}, {len(data.projects)} projects')
+    print(f"{'interaction':<36} {'figure KB':>10} {'patch KB':>9} "
+          f"{'figure ms':>10} {'patch ms':>9}")
+    for name, (previous, current, inputs) in cases.items():
+        before_bytes, before = measure(previous, data, *inputs)
+        after_bytes, after = measure(current, data, *inputs)
+        print(f"{name:<36} {before_bytes / 1024:>10.1f} "
+              f"{after_bytes / 1024:>9.1f} {before * 1000:>10.2f} "
+              f"{after * 1000:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
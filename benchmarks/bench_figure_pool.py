@@ -0,0 +1,114 @@
+"""
+Latency of a fast callback (the classification overview filter) while
+another thread keeps rebuilding the heaviest tab, the project value
+overview. Compares building that tab in the request thread, where it holds
+the GIL against the fast callback, with building it in the figure pool.
+
+    python -m benchmarks.bench_figure_pool
+    python -m benchmarks.bench_figure_pool --rows 1000000 --councils 500
+"""
+import argparse
+import os
+import random
+import threading
+import time
+
+from assets.config import Config
+from benchmarks.generate_workbook import generate_frame, write_workbook
+from benchmarks.load_harness import DATA_DIR, percentile
+
+HEAVY_TAB = ('project_value_distribution', 'overview')
+
+
+def fast_latencies(data, update_fig, duration: float) -> list:
+    rng = random.Random(0)
+    names = list(data.classification_names)
+    latencies = []
+
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        start = time.perf_counter()
+        update_fig(data, rng.sample(names, rng.randint(1, len(names))), [])
+        latencies.append((time.perf_counter() - start) * 1000)
+        # Arrives every 10ms, like a user's clicks spread over a worker
+        time.sleep(0.01)
+
+    return latencies
+
+
+def run(data, build, clear, duration: float) -> dict:
+    from app import update_project_classification_overview_patch
+
+    builds = []
+    stop = threading.Event()
+
+    def rebuild():
+        while not stop.is_set():
+            clear()
+            start = time.perf_counter()
+            build(data, *HEAVY_TAB)
+            builds.append(time.perf_counter() - start)
+
+    thread = None
+    if build is not None:
+        thread = threading.Thread(target=rebuild)
+        thread.start()
+
+    latencies = fast_latencies(
+        data, update_project_classification_overview_patch, duration)
+
+    stop.set()
+    if thread is not None:
+        thread.join()
+
+    return {
+        'requests': len(latencies),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': max(latencies),
+        'heavy_builds': len(builds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--rows', type=int,
+                        help='use a synthetic workbook with this many rows')
+    parser.add_argument('--councils', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=20)
+    args = parser.parse_args()
+
+    if args.rows:
+        workbook = os.path.join(
+            DATA_DIR, f'projects_{args.rows}x{args.councils}_0.xlsx')
+        if not os.path.exists(workbook):
+            write_workbook(generate_frame(args.rows, args.councils), workbook)
+        # Read by the app on import
+        Config.data_paths = [workbook]
+
+    from app import data_store, pending_tab, render_tab
+    from src.figure_pool import FigurePool
+
+    data = data_store.current()
+    pool = FigurePool(processes=2, timeout=600)
+    cases = {
+        'idle': (None, None),
+        'request thread': (render_tab, lambda: None),
+        'figure pool': (pool.offload(render_tab, fallback=pending_tab),
+                        pool.clear),
+    }
+
+    print(f'{len(data.projects)} projects, {args.duration:.0f}s per case')
+    print(f"{'heavy build in':<16} {'requests':>9} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'heavy builds':>13}")
+    for name, (build, clear) in cases.items():
+        result = run(data, build, clear, args.duration)
+        print(f"{name:<16} {result['requests']:>9} {result['p50_ms']:>8.1f} "
+              f"{result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+              f"{result['max_ms']:>8.1f} {result['heavy_builds']:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Build and serialize time per figure type: the previous plotly.express and
+go.Figure charts serialized by Dash, against the figure specs built from
+the column arrays and encoded once with orjson.
+
+    python -m benchmarks.bench_figure_specs
+"""
+import json
+import time
+
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+
+from assets.config import Config
+from benchmarks.generate_workbook import generate_frame
+from src import dash1, dash2, dash3, dash4
+from src.encoded_figures import encoded_figures
+from src.load_data import preprocess_data
+from src.project_data import ProjectData
+
+config = Config()
+
+REPEAT = 5
+
+
+# Chart functions before the figure specs, kept as the baseline
+def previous_dash1_bar(df):
+    return px.bar(df, x="Project Counts", y="Organisations",
+                  title="Project Count Per Council",
+                  height=max(700, df['Organisations'].nunique() * 40),
+                  color_discrete_sequence=[config.primary_color] * len(df))
+
+
+def previous_dash1_sunburst(df):
+    fig = go.Figure(go.Sunburst(labels=list(df['Project Name']),
+                                parents=list(df['Organisations']),
+                                branchvalues="total"))
+    fig.update_layout(title='Council Project Names',
+                      margin=dict(t=30, l=10, r=10, b=0))
+    return fig
+
+
+def previous_dash2_bar(df):
+    fig = px.bar(df, x="Count", y="Organisations",
+                 color="Project Classification Breakdown",
+                 title="Project Classification Count Per Council",
+                 height=max(700, df['Organisations'].nunique() * 40))
+    fig.update_layout(legend=dict(orientation="h", yanchor="top", y=1.1,
+                                  xanchor="right", x=1))
+    return fig
+
+
+def previous_dash2_sunburst(df):
+    temp = df[['Project Classification', 'Organisations',
+               'Project Classification Count']].drop_duplicates()
+    fig = go.Figure(go.Sunburst(
+        labels=list(temp['Project Classification']) + list(
+            df['Project Classification Breakdown']),
+        parents=[''] * len(temp) + list(df['Project Classification']),
+        values=list(temp['Project Classification Count']) + list(df['Count']),
+        branchvalues="total"))
+    fig.update_layout(height=550, width=550)
+    return fig
+
+
+def previous_dash3_bar(df):
+    fig = px.bar(df, x="Project Value", y="Project Name",
+                 height=max(1100, df['Project Name'].nunique() * 40),
+                 title="Project Value Distribution",
+                 color_discrete_sequence=[config.primary_color] * len(df))
+    fig.update_layout(yaxis=dict(
+        tickvals=df['Project Name'],
+        ticktext=[dash3.wrap_label(label) for label in df['Project Name']]))
+    return fig
+
+
+def previous_dash4_bar(df):
+    return px.bar(df, x="Theme count", y="Organisations", color="Theme",
+                  title="Theme Count Per Council",
+                  height=max(600, df['Organisations'].nunique() * 40))
+
+
+def figure_cases(data: ProjectData) -> dict:
+    council = data.councils[0]
+    names = dash1.distinguish_data(
+        'council_view', data.project_names, council,
+        data.council_index['project_names'])
+    counts = data.project_names.assign(**{
+        'Project Counts': data.project_names.groupby('Organisations')[
+            'Project Name'].transform('count')})[
+        ['Organisations', 'Project Counts']].drop_duplicates().sort_values(
+        ['Project Counts'])
+    classifications = data.classifications[
+        data.classifications['Count'] != 0].sort_values(['Count'])
+    council_classifications = classifications[
+        classifications['Organisations'] == council]
+    values = data.project_values.iloc[:config.lod_threshold]
+
+    return {
+        'dash1 px.bar': (
+            lambda: previous_dash1_bar(counts),
+            lambda: dash1.generate_bar_chart(data.project_names)),
+        'dash1 go.Sunburst': (
+            lambda: previous_dash1_sunburst(names),
+            lambda: dash1.generate_donut_chart(names)),
+        'dash2 px.bar': (
+            lambda: previous_dash2_bar(classifications),
+            lambda: dash2.generate_bar_fig(
+                classifications, "Count", "Organisations",
+                "Project Classification Breakdown",
+                "Project Classification Count Per Council")),
+        'dash2 go.Sunburst': (
+            lambda: previous_dash2_sunburst(council_classifications),
+            lambda: dash2.generate_donut_fig(council_classifications)),
+        'dash3 px.bar': (
+            lambda: previous_dash3_bar(values),
+            lambda: dash3.generate_bar_graph(values)),
+        'dash4 px.bar': (
+            lambda: previous_dash4_bar(data.themes),
+            lambda: dash4.generate_bar_graph(data.themes, 'overview')),
+    }
+
+
+def best_times(build, serialize) -> tuple:
+    builds, serializes = [], []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        figure = build()
+        built = time.perf_counter()
+        serialize(figure)
+        builds.append(built - start)
+        serializes.append(time.perf_counter() - built)
+    return min(builds), min(serializes)
+
+
+def main():
+    workbooks = {
+        'bundled workbook': preprocess_data(config.data_paths),
+        'synthetic 10k x 100': ProjectData.from_raw(
+            generate_frame(10_000, councils=100)),
+    }
+
+    print(f"{'workbook':<22} {'figure':<18} {'previous build':>15} "
+          f"{'serialize':>10} {'spec build':>11} {'encode':>8} "
+          f"{'speedup':>8}")
+    for name, data in workbooks.items():
+        for figure, (previous, current) in figure_cases(data).items():
+            # Dash serializes the returned figure on every request, the
+            # spec is encoded once and the bytes reused
+            old = best_times(previous, to_json_plotly)
+            new = best_times(current, encoded_figures.encode)
+
+            # Both must describe the same chart
+            assert json.loads(to_json_plotly(previous())) == \
+                json.loads(encoded_figures.encode(current()).payload), figure
+
+            print(f"{name:<22} {figure:<18} {old[0] * 1000:>13.2f}ms "
+                  f"{old[1] * 1000:>8.2f}ms {new[0] * 1000:>9.2f}ms "
+                  f"{new[1] * 1000:>6.2f}ms {sum(old) / sum(new):>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
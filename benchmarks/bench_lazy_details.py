@@ -0,0 +1,87 @@
+"""
+Load time and memory of the data, from the workbook's snapshot and from the
+model snapshot, with the free-text project columns loaded up front and left
+for the first project table (Config.lazy_details), and the time that first
+table then takes. Each run is a fresh process, and the memory is its
+private resident memory above what it held after the imports, the pages of
+the memory-mapped snapshots are shared page cache. Linux only.
+
+    python -m benchmarks.bench_lazy_details
+    python -m benchmarks.bench_lazy_details --rows 1000000 --councils 500
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.bench_streaming import memory_mb
+from benchmarks.load_harness import ROOT
+from benchmarks.run_benchmarks import workbook_path
+from src.snapshot_cache import model_path
+
+
+def load(lazy: bool, path: str, use_model: bool) -> dict:
+    from assets.config import Config
+    from src.load_data import preprocess_data
+
+    Config.lazy_details = lazy
+    baseline = memory_mb('RssAnon')
+
+    start = time.perf_counter()
+    data = preprocess_data(path, use_model=use_model)
+    seconds = time.perf_counter() - start
+    loaded_mb = memory_mb('RssAnon') - baseline
+
+    start = time.perf_counter()
+    data.project_table()
+    table_seconds = time.perf_counter() - start
+
+    return {'seconds': seconds, 'memory_mb': loaded_mb,
+            'table_seconds': table_seconds,
+            'table_memory_mb': memory_mb('RssAnon') - baseline}
+
+
+def measure(lazy: bool, path: str, use_model: bool) -> dict:
+    with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(load, lazy, path, use_model).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--workbook',
+                        default=os.path.join(ROOT,
+                                             'Master Project List D2N2.xlsx'))
+    parser.add_argument('--rows', type=int,
+                        help='use a synthetic workbook with this many rows')
+    parser.add_argument('--councils', type=int, default=100)
+    args = parser.parse_args()
+
+    workbook = args.workbook
+    if args.rows:
+        workbook = workbook_path(args.rows, args.councils, 0)
+
+    print(os.path.basename(workbook))
+    print(f"{'details':<16} {'load':>8} {'memory':>9} {'first table':>12} "
+          f"{'memory after':>13}")
+    for lazy in (False, True):
+        # Writes the snapshots, the model holds the details only when eager
+        if os.path.exists(model_path([workbook])):
+            os.remove(model_path([workbook]))
+        measure(lazy, workbook, True)
+
+        for use_model in (False, True):
+            result = measure(lazy, workbook, use_model)
+            name = (f"{'lazy' if lazy else 'eager'}, "
+                    f"{'model' if use_model else 'snapshot'}")
+            print(f"{name:<16} {result['seconds']:>7.2f}s "
+                  f"{result['memory_mb']:>7.1f}MB "
+                  f"{result['table_seconds']:>11.2f}s "
+                  f"{result['table_memory_mb']:>11.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
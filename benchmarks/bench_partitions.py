@@ -0,0 +1,90 @@
+"""
+Load time of the data as more regional workbooks are added, each holding
+--rows projects. Compares parsing every workbook in one process and in the
+ingestion pool (Config.ingest_processes), loading them from their
+snapshots, from the model snapshot, and after one region's workbook
+changed, when only that one is parsed again.
+
+    python -m benchmarks.bench_partitions --regions 1 2 4 8
+    python -m benchmarks.bench_partitions --rows 100000 --regions 1 2 4
+"""
+import argparse
+import os
+import time
+
+from assets.config import Config
+from benchmarks.run_benchmarks import workbook_path
+from src.load_data import combine_partitions, load_partitions, \
+    preprocess_data
+from src.project_data import ProjectData
+from src.snapshot_cache import model_path, snapshot_path
+
+config = Config()
+
+
+def remove(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def build(paths: list, processes: int):
+    return ProjectData.from_raw(
+        combine_partitions(paths, load_partitions(paths, True, processes)))
+
+
+def measure(paths: list, processes: int) -> dict:
+    for path in paths:
+        remove(snapshot_path(path))
+    serial = timed(lambda: build(paths, 1))
+
+    for path in paths:
+        remove(snapshot_path(path))
+    parallel = timed(lambda: build(paths, processes))
+
+    warm = timed(lambda: build(paths, processes))
+
+    remove(model_path(paths))
+    preprocess_data(paths)
+    model = timed(lambda: preprocess_data(paths))
+
+    # As if the last region's workbook was replaced
+    remove(snapshot_path(paths[-1]))
+    changed = timed(lambda: build(paths, processes))
+
+    return {'serial': serial, 'parallel': parallel, 'warm': warm,
+            'model': model, 'changed': changed}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=10_000,
+                        help='projects per regional workbook')
+    parser.add_argument('--councils', type=int, default=20)
+    parser.add_argument('--regions', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--processes', type=int,
+                        default=config.ingest_processes)
+    args = parser.parse_args()
+
+    print(f'{args.rows} projects per region, {args.processes} processes, '
+          f'{os.cpu_count()} CPUs')
+    print(f"{'regions':>7} {'parse serial':>13} {'parse pool':>11} "
+          f"{'snapshots':>10} {'model':>8} {'1 changed':>10}")
+    for regions in args.regions:
+        # One seed per region, so each has its own projects
+        paths = [workbook_path(args.rows, args.councils, seed)
+                 for seed in range(regions)]
+        result = measure(paths, args.processes)
+        print(f"{regions:>7} {result['serial']:>12.2f}s "
+              f"{result['parallel']:>10.2f}s {result['warm']:>9.2f}s "
+              f"{result['model']:>7.2f}s {result['changed']:>9.2f}s")
+
+
+if __name__ == '__main__':
+    main()
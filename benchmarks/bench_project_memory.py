@@ -0,0 +1,140 @@
+"""
+Memory of the whole resident model with councils and themes stored as
+strings against categorical codes in every view, and any/all
+multi-classification filters on the classification cells against the
+bit-packed flags. Each model is loaded in a fresh process, after a project
+table has been opened, and its memory is the private resident memory above
+what the process held after the imports. Linux only.
+
+The classification cells stay resident for the project tables, the flags
+are kept beside them for the filters.
+
+    python -m benchmarks.bench_project_memory
+    python -m benchmarks.bench_project_memory --rows 100000 --councils 500
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_streaming import memory_mb
+from benchmarks.load_harness import ROOT
+from benchmarks.run_benchmarks import workbook_path
+from src.load_data import preprocess_data
+from src.project_data import CATEGORY_COLUMNS, VIEWS
+
+FILTER = ('Solar', 'Battery', 'Heat pumps')
+
+
+def column_bytes(s: pd.Series) -> int:
+    if s.dtype != object:
+        return int(s.memory_usage(deep=True, index=False))
+
+    # memory_usage(deep=True) counts shared objects, such as nan, per cell
+    distinct = {id(value): value for value in s.to_numpy()}
+    return int(s.memory_usage(deep=False, index=False)) + \
+        sum(sys.getsizeof(value) for value in distinct.values())
+
+
+def load(compact: bool, path: str) -> dict:
+    from src import project_data
+
+    if not compact:
+        # The views as they were, councils and themes as strings
+        project_data._compact = lambda view: view
+
+    baseline = memory_mb('RssAnon')
+    # Built from the workbook snapshot, the model snapshot holds the codes
+    data = preprocess_data(path, use_model=False)
+    data.project_table()
+
+    return {
+        'projects': len(data.projects),
+        'columns': sum(column_bytes(view[column])
+                       for view in (getattr(data, name) for name in VIEWS)
+                       for column in CATEGORY_COLUMNS
+                       if column in view.columns),
+        'flags': data.classification_flags.bits.nbytes,
+        'memory_mb': memory_mb('RssAnon') - baseline,
+    }
+
+
+def measure(compact: bool, path: str) -> dict:
+    with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(load, compact, path).result()
+
+
+def cell_mask(cells: pd.DataFrame, names: list, match: str) -> np.ndarray:
+    # As dash2 counts the cells
+    classified = cells[names].apply(
+        pd.to_numeric, errors='coerce').fillna(0).astype('int64') != 0
+    if match == 'any':
+        return classified.any(axis=1).to_numpy()
+    return classified.all(axis=1).to_numpy()
+
+
+def best_of(func, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--workbook',
+                        default=os.path.join(ROOT,
+                                             'Master Project List D2N2.xlsx'))
+    parser.add_argument('--rows', type=int,
+                        help='use a synthetic workbook with this many rows')
+    parser.add_argument('--councils', type=int, default=100)
+    args = parser.parse_args()
+
+    workbook = args.workbook
+    if args.rows:
+        workbook = workbook_path(args.rows, args.councils, 0)
+
+    # Writes the snapshot, so both models are built from it
+    preprocess_data(workbook, use_model=False)
+    before = measure(False, workbook)
+    after = measure(True, workbook)
+
+    print(f"{os.path.basename(workbook)}, {after['projects']} projects")
+    print(f"{'':<36} {'strings':>9} {'codes':>9}")
+    print(f"{'councils and themes in the views':<36} "
+          f"{before['columns'] / 2 ** 20:>7.2f}MB "
+          f"{after['columns'] / 2 ** 20:>7.2f}MB")
+    print(f"{'classification flags':<36} "
+          f"{before['flags'] / 2 ** 20:>7.2f}MB "
+          f"{after['flags'] / 2 ** 20:>7.2f}MB")
+    print(f"{'resident model, table opened':<36} "
+          f"{before['memory_mb']:>7.1f}MB {after['memory_mb']:>7.1f}MB")
+
+    data = preprocess_data(workbook)
+    flags = data.classification_flags
+    cells = data.project_table()[list(flags.names)]
+
+    print(f"\n{'filter':<36} {'cells ms':>9} {'bits ms':>9}")
+    for match in ('any', 'all'):
+        names = list(FILTER)
+        if not np.array_equal(cell_mask(cells, names, match),
+                              flags.mask(names, match)):
+            raise AssertionError(f'{match} filter differs')
+        cell_time = best_of(lambda: cell_mask(cells, names, match))
+        bit_time = best_of(lambda: flags.mask(names, match))
+        print(f"{match + ' of ' + ', '.join(names):<36} "
+              f"{cell_time * 1000:>9.2f} {bit_time * 1000:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
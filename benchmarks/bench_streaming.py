@@ -0,0 +1,90 @@
+"""
+Peak memory and time of parsing a workbook with pd.read_excel, with the
+streaming reader (Config.stream_workbooks) and into the streamed
+aggregates alone. Each run is a fresh process, and the peak is its
+resident memory above what it held after the imports. Linux only.
+
+    python -m benchmarks.bench_streaming
+    python -m benchmarks.bench_streaming --rows 100000 --councils 500
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from assets.config import Config
+from benchmarks.load_harness import ROOT
+from benchmarks.run_benchmarks import workbook_path
+
+config = Config()
+
+
+def memory_mb(field: str) -> float:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(f'{field}:'):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def parse(mode: str, path: str, chunk_rows: int) -> dict:
+    # Imported before the baseline, the aggregates use its counts
+    import src.dash2  # noqa: F401
+    from src.load_data import read_workbook
+    from src.workbook_stream import aggregate_workbook, \
+        read_workbook_streaming
+
+    parsers = {
+        'pd.read_excel': lambda: read_workbook(path, stream=False),
+        'streaming': lambda: read_workbook_streaming(path, chunk_rows),
+        'aggregates only': lambda: aggregate_workbook(path, chunk_rows),
+    }
+
+    # Resets the peak to the current resident memory
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+    baseline = memory_mb('VmRSS')
+
+    start = time.perf_counter()
+    result = parsers[mode]()
+    seconds = time.perf_counter() - start
+
+    return {'seconds': seconds, 'peak_mb': memory_mb('VmHWM') - baseline,
+            'rows': result.rows if mode == 'aggregates only' else len(result)}
+
+
+def measure(mode: str, path: str, chunk_rows: int) -> dict:
+    with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(parse, mode, path, chunk_rows).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--workbook',
+                        default=os.path.join(ROOT,
+                                             'Master Project List D2N2.xlsx'))
+    parser.add_argument('--rows', type=int,
+                        help='use a synthetic workbook with this many rows')
+    parser.add_argument('--councils', type=int, default=100)
+    parser.add_argument('--chunk-rows', type=int,
+                        default=config.stream_chunk_rows)
+    args = parser.parse_args()
+
+    workbook = args.workbook
+    if args.rows:
+        workbook = workbook_path(args.rows, args.councils, 0)
+
+    print(f'{os.path.basename(workbook)}, chunks of {args.chunk_rows} rows')
+    print(f"{'parser':<16} {'projects':>9} {'time':>8} {'peak memory':>12}")
+    for mode in ('pd.read_excel', 'streaming', 'aggregates only'):
+        result = measure(mode, workbook, args.chunk_rows)
+        print(f"{mode:<16} {result['rows']:>9} {result['seconds']:>7.2f}s "
+              f"{result['peak_mb']:>10.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+Per-worker memory of the app under gunicorn, with every worker loading its
+own copy of the workbook against the shared mode where the master loads it
+once before forking (Config.shared_data). Each server is warmed up with the
+load test scenarios before measuring. Linux only, memory is read from
+/proc/<pid>/smaps_rollup.
+
+    python -m benchmarks.bench_worker_memory --workers 4 8 16
+    python -m benchmarks.bench_worker_memory --rows 1000000 --councils 500
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+from benchmarks.generate_workbook import generate_frame, write_workbook
+from benchmarks.load_harness import (DATA_DIR, ROOT, Scenarios, client,
+                                     free_port, start_server,
+                                     wait_until_ready)
+from src.load_data import preprocess_data
+
+MODES = {'per-worker': '0', 'shared': '1'}
+
+# Runs predicted to need more than this share of the available memory are
+# skipped rather than risking the OOM killer
+MEMORY_HEADROOM = 0.8
+
+
+def children(pid: int) -> list:
+    pids = []
+    for child in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            with open(f'/proc/{child}/stat') as f:
+                if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                    pids.append(int(child))
+        except (OSError, IndexError, ValueError):
+            continue
+    return pids
+
+
+def process_memory(pid: int) -> dict:
+    """
+    RSS, PSS and private (unshared) memory of a process in MB. PSS splits
+    each shared page between the processes mapping it.
+    :param pid: int
+    :return: dict
+    """
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'private': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+def cpu_ticks(pids: list) -> int:
+    ticks = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                ticks += sum(map(int, f.read().rsplit(')', 1)[1].split()[11:13]))
+        except OSError:
+            continue
+    return ticks
+
+
+def wait_until_idle(master_pid: int, workers: int, timeout: float = 600):
+    """
+    Waits for every worker to be up and no longer using CPU, i.e. done
+    importing the app and loading the workbook
+    """
+    deadline = time.time() + timeout
+    previous = None
+    while time.time() < deadline:
+        pids = children(master_pid)
+        ticks = cpu_ticks(pids)
+        if len(pids) == workers and ticks == previous:
+            return
+        previous = ticks
+        time.sleep(1)
+    raise TimeoutError(f'workers still busy after {timeout}s')
+
+
+def available_mb() -> float:
+    with open('/proc/meminfo') as f:
+        for line in f:
+            if line.startswith('MemAvailable:'):
+                return int(line.split()[1]) / 1024
+    return float('inf')
+
+
+def measure(workbook: str, workers: int, shared: str, data, warmup: float,
+            clients: int) -> dict:
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    process = start_server(workbook, workers, port,
+                           env={'SHARED_PROJECT_DATA': shared})
+
+    try:
+        wait_until_ready(base_url, process, timeout=600)
+        wait_until_idle(process.pid, workers)
+        with urllib.request.urlopen(f'{base_url}/_dash-dependencies') as r:
+            scenarios = Scenarios(json.load(r), data)
+
+        # Every worker serves some of each interaction, touching the data
+        # the way real traffic does
+        weights = scenarios.available()
+        results, lock = [], threading.Lock()
+        deadline = time.time() + warmup
+        threads = [threading.Thread(
+            target=client, args=(base_url, scenarios, weights, deadline, seed,
+                                 results, lock))
+            for seed in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wait_until_idle(process.pid, workers)
+
+        memory = [process_memory(pid) for pid in children(process.pid)]
+        master = process_memory(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+
+    return {
+        'workers': workers,
+        'requests': len(results),
+        'errors': sum(not r[3] for r in results),
+        'master': master,
+        'worker_mean': {key: sum(m[key] for m in memory) / len(memory)
+                        for key in ('rss', 'pss', 'private')},
+        'total_pss': master['pss'] + sum(m['pss'] for m in memory),
+    }
+
+
+def scenario_data(workbook: str) -> dict:
+    data = preprocess_data(workbook)
+    return {
+        'councils': data.councils,
+        'classification_names': data.classification_names,
+        'max_project_value': data.max_project_value,
+        'projects': range(len(data.projects)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--workbook',
+                        default=os.path.join(ROOT,
+                                             'Master Project List D2N2.xlsx'))
+    parser.add_argument('--rows', type=int,
+                        help='use a synthetic workbook with this many rows')
+    parser.add_argument('--councils', type=int, default=100)
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--warmup', type=float, default=20)
+    parser.add_argument('--output', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    workbook = args.workbook
+    if args.rows:
+        workbook = os.path.join(
+            DATA_DIR, f'projects_{args.rows}x{args.councils}_0.xlsx')
+        if not os.path.exists(workbook):
+            write_workbook(generate_frame(args.rows, args.councils), workbook)
+
+    # Only what the scenarios read, loaded in a child process so the model
+    # does not stay in this process's memory during the measurements
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        data = SimpleNamespace(**executor.submit(
+            scenario_data, workbook).result())
+
+    print(f'{os.path.basename(workbook)}, {len(data.projects)} projects')
+    print(f"{'mode':<11} {'workers':>7} {'RSS/worker':>11} "
+          f"{'PSS/worker':>11} {'private/worker':>15} {'master RSS':>11} "
+          f"{'total PSS':>10}")
+
+    results = []
+    for mode, shared in MODES.items():
+        previous = None
+        for workers in sorted(args.workers):
+            if previous is not None:
+                # Private pages grow with the worker count, shared ones do not
+                needed = previous['master']['pss'] + \
+                    workers * previous['worker_mean']['private']
+                if needed > MEMORY_HEADROOM * available_mb():
+                    print(f'{mode:<11} {workers:>7} skipped, needs about '
+                          f'{needed / 1024:.1f} GB')
+                    results.append({'mode': mode, 'workers': workers,
+                                    'skipped_needs_mb': needed})
+                    continue
+
+            result = measure(workbook, workers, shared, data, args.warmup,
+                             workers * 2)
+            previous = result
+            results.append({'mode': mode, **result})
+
+            mean = result['worker_mean']
+            print(f"{mode:<11} {workers:>7} {mean['rss']:>9.1f}MB "
+                  f"{mean['pss']:>9.1f}MB {mean['private']:>13.1f}MB "
+                  f"{result['master']['rss']:>9.1f}MB "
+                  f"{result['total_pss']:>8.1f}MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'workbook': workbook, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
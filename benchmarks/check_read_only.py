@@ -0,0 +1,169 @@
+"""
+Checks that no callback writes to the shared data. Runs every server
+callback of app.py, for every tab and view, on one loaded dataset and
+exits non-zero if any frame, array or index in it changed.
+
+    python -m benchmarks.check_read_only
+    python -m benchmarks.check_read_only --rows 10000 --councils 100
+"""
+import argparse
+import dataclasses
+import hashlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+from assets.config import Config
+from benchmarks.load_harness import GRAPH_TABS
+from benchmarks.run_benchmarks import workbook_path
+
+config = Config()
+
+TABLE_QUERIES = [
+    (None, ''),
+    ([{'column_id': 'Project Value', 'direction': 'desc'}],
+     '{Theme} icontains retrofit'),
+]
+
+
+def callbacks(data) -> dict:
+    """
+    Callback name -> function of the data running what the callback runs,
+    without the figure cache
+    :param data: ProjectData
+    :return: dict
+    """
+    from app import council_content, render_tab
+    from src.dash1 import update_project_count_zoom_fig
+    from src.dash2 import update_project_classification_overview_patch
+    from src.dash3 import project_value_overview_patch, \
+        update_project_value_zoom_fig
+    from src.dash4 import update_project_theme_zoom_fig
+    from src.load_data import distinguish_data
+    from src.table_query import query_table
+
+    council = data.councils[-1]
+    names = list(data.classification_names)
+    middle = data.max_project_value // 2
+
+    cases = {}
+    for tab in GRAPH_TABS:
+        for view in ('overview', 'council_view'):
+            cases[f'update_tab[{tab}, {view}]'] = \
+                lambda d, tab=tab, view=view: render_tab(d, tab, view)
+        cases[f'update_council_content[{tab}]'] = \
+            lambda d, tab=tab: council_content(d, tab, council)
+
+    cases.update({
+        'update_classification_dropdown[subset]':
+            lambda d: update_project_classification_overview_patch(
+                d, names[:3], []),
+        'update_classification_dropdown[all]':
+            lambda d: update_project_classification_overview_patch(
+                d, names, ['All']),
+        'update_project_value_slider':
+            lambda d: project_value_overview_patch(d, [0, middle]),
+        'zoom_project_value_graph':
+            lambda d: update_project_value_zoom_fig(
+                d, 0, middle, {'range': [0, middle], 'council': None}),
+        'zoom_project_value_graph[council]':
+            lambda d: update_project_value_zoom_fig(
+                d, 0, middle, {'range': [0, middle], 'council': council}),
+        'zoom_project_count_graph':
+            lambda d: update_project_count_zoom_fig(d, config.lod_top_n),
+        'zoom_project_theme_graph':
+            lambda d: update_project_theme_zoom_fig(d, config.lod_top_n),
+    })
+
+    for view in ('overview', 'council_view'):
+        for i, (sort_by, filter_query) in enumerate(TABLE_QUERIES):
+            cases[f'update_project_table[{view}, query {i}]'] = \
+                lambda d, view=view, sort_by=sort_by, query=filter_query: \
+                query_table(distinguish_data(view, d.project_table(), council,
+                                             d.council_index['projects']),
+                            0, 20, sort_by, query)
+    cases['update_project_table[classifications]'] = \
+        lambda d: query_table(d.project_table(), 0, 20, [], '',
+                              d.classification_flags.mask(names[:3], 'all'))
+
+    return cases
+
+
+def fingerprint(value, name: str, prints: dict):
+    """
+    Adds a digest of every frame, series, index and array reachable from
+    value to prints, keyed by its path from the data
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        digest = hashlib.sha256(pd.util.hash_pandas_object(
+            value, index=not isinstance(value, pd.Index)).to_numpy())
+        # Column names and dtypes are not part of the row hashes
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr((list(value.columns),
+                                list(map(str, value.dtypes)))).encode())
+        prints[name] = digest.hexdigest()
+    elif isinstance(value, np.ndarray):
+        prints[name] = hashlib.sha256(
+            repr((value.dtype, value.shape)).encode() +
+            np.ascontiguousarray(value).tobytes()).hexdigest()
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            fingerprint(item, f'{name}[{key!r}]', prints)
+    elif isinstance(value, (list, tuple)):
+        for i, item in enumerate(value):
+            fingerprint(item, f'{name}[{i}]', prints)
+    elif dataclasses.is_dataclass(value):
+        for field in dataclasses.fields(value):
+            fingerprint(getattr(value, field.name), f'{name}.{field.name}',
+                        prints)
+    elif hasattr(value, '__dict__') and not callable(value):
+        for key, item in vars(value).items():
+            fingerprint(item, f'{name}.{key}', prints)
+    else:
+        prints[name] = repr(value)
+
+
+def fingerprints(data) -> dict:
+    prints = {}
+    fingerprint(data, 'data', prints)
+    return prints
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--rows', type=int,
+                        help='use a synthetic workbook with this many rows')
+    parser.add_argument('--councils', type=int, default=100)
+    args = parser.parse_args()
+
+    if args.rows:
+        # Read by the app on import
+        Config.data_paths = [workbook_path(args.rows, args.councils, 0)]
+
+    from app import data_store
+
+    data = data_store.current()
+    # Loads the project details, so they are checked too
+    data.project_table()
+    before = fingerprints(data)
+
+    failed = []
+    for name, callback in callbacks(data).items():
+        callback(data)
+        after = fingerprints(data)
+        changed = [path for path in before if before[path] != after[path]]
+        if changed:
+            failed.append(name)
+            print(f'{name} changed {", ".join(changed)}')
+            before = after
+
+    if failed:
+        print(f'{len(failed)} callbacks wrote to the shared data')
+        sys.exit(1)
+    print(f'{len(callbacks(data))} callbacks left the shared data unchanged')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Compares two run_benchmarks result files and exits non-zero when a
+benchmark got slower than the threshold.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 1.2
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        report = json.load(f)
+
+    return report['commit'], {
+        (r['case'], r['rows'], r['councils']): r['best']
+        for r in report['results']}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    baseline_commit, baseline = load(args.baseline)
+    candidate_commit, candidate = load(args.candidate)
+
+    print(f"{'benchmark':<70} {'rows':>8} {'councils':>8} "
+          f"{baseline_commit:>10} {candidate_commit:>10} {'ratio':>7}")
+
+    regressions = 0
+    for key in sorted(baseline.keys() & candidate.keys()):
+        ratio = candidate[key] / baseline[key]
+        flag = ''
+        if ratio > args.threshold:
+            regressions += 1
+            flag = '  REGRESSION'
+
+        case, rows, councils = key
+        print(f"{case:<70} {rows:>8} {councils:>8} "
+              f"{baseline[key] * 1000:>8.2f}ms {candidate[key] * 1000:>8.2f}ms"
+              f" {ratio:>6.2f}x{flag}")
+
+    print(f'{regressions} regression(s) above {args.threshold}x')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
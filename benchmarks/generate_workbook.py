@@ -0,0 +1,184 @@
+"""
+Synthetic project workbooks with the same 3-level header layout as
+Master Project List D2N2.xlsx, for benchmarking at any size.
+
+    python -m benchmarks.generate_workbook --rows 100000 --councils 500 \
+        --output benchmarks/data/projects_100000x500.xlsx
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+MEMBER = 'Fast Followers member'
+CLASSIFICATION = 'Project Classification'
+
+PROJECT_COLUMNS = [
+    'Organisations',
+    'Project Name',
+    'Project Value',
+    'Actual or Estimated',
+    'Theme',
+    'Status (e.g.,concept, business case, shovel ready,etc.)',
+    'Additional support required to make the project happen',
+    'Additional Notes',
+    'Barriers to project delivery',
+]
+
+CLASSIFICATION_COLUMNS = [
+    ('Power Generation', 'Solar'),
+    ('Power Generation', 'Wind'),
+    ('Power Generation', 'Hydrogen'),
+    ('Heat generation', 'Heat networks'),
+    ('Heat generation', 'Heat pumps'),
+    ('Storage', 'Battery'),
+    ('Storage', 'Thermal'),
+    ('Buildings', 'Retrofit'),
+    ('Transport', 'Electric vehicles'),
+    ('Horticulture', 'Farming'),
+    ('Horticulture', 'Multi-'),
+    ('Horticulture', 'Comments (types)'),
+]
+
+# Includes the misspellings dash4 normalises
+THEMES = ['Retrofit', 'Retrofit ', 'retrofit', 'Transport', 'Heat',
+          'Heating ', 'EV Infastructure', 'Energy Efficiency', 'Other',
+          'Renewable Generation', 'Transport/Alternative Fuels', 'Waste']
+
+VALUE_TEXT = ['Unknown', 'TBC', 'To be decided ', ' ', '1.6m euros']
+
+# Object array so numpy keeps the numbers as ints
+FLAGS = np.array([1, 1, 1, 2, 'x'], dtype=object)
+
+NOTES = ['Funding', 'Capacity\nFunding', 'Awaiting business case',
+         'Grid connection constraints', 'Planning permission required']
+
+
+def column_tuples() -> list:
+    """
+    Column tuples as pandas reads the workbook header
+    :return: list
+    """
+    columns = [(MEMBER, f'Unnamed: {i}_level_1', name)
+               for i, name in enumerate(PROJECT_COLUMNS)]
+    columns += [(CLASSIFICATION, group, name)
+                for group, name in CLASSIFICATION_COLUMNS]
+    return columns
+
+
+def generate_frame(rows: int, councils: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Synthetic projects shaped like the output of load_data.read_workbook
+    :param rows: int, number of projects
+    :param councils: int, number of distinct organisations
+    :param seed: int
+    :return: pd.DataFrame
+    """
+    rng = np.random.default_rng(seed)
+
+    # Contiguous council blocks, like the workbook
+    council_ids = np.sort(rng.integers(0, councils, rows))
+    council_ids[:min(rows, councils)] = np.arange(min(rows, councils))
+    council_ids.sort()
+
+    values = rng.integers(1_000, 50_000_000, rows).astype(object)
+    text_values = rng.random(rows) < 0.1
+    values[text_values] = rng.choice(VALUE_TEXT, text_values.sum())
+
+    def sparse_text(probability):
+        column = np.full(rows, np.nan, dtype=object)
+        filled = rng.random(rows) < probability
+        column[filled] = rng.choice(NOTES, filled.sum())
+        return column
+
+    data = {
+        'Organisations': [f'Council {i:05d}' for i in council_ids],
+        'Project Name': [f'Project {i} {w}' for i, w in zip(
+            range(rows), rng.choice(['Schools', 'Campus heat network',
+                                     'EV charging hubs', 'Solar farm'],
+                                    rows))],
+        'Project Value': values,
+        'Actual or Estimated': rng.choice(['Actual', 'Estimated'], rows),
+        'Theme': rng.choice(THEMES, rows),
+        'Status (e.g.,concept, business case, shovel ready,etc.)':
+            rng.choice(['Concept', 'Business case', 'Shovel ready'], rows),
+        'Additional support required to make the project happen':
+            sparse_text(0.5),
+        'Additional Notes': sparse_text(0.5),
+        'Barriers to project delivery': sparse_text(0.5),
+    }
+
+    for group, name in CLASSIFICATION_COLUMNS:
+        flags = np.full(rows, np.nan, dtype=object)
+        flagged = rng.random(rows) < 0.15
+        flags[flagged] = rng.choice(FLAGS, flagged.sum())
+        if name in ('Solar', 'Comments (types)'):
+            noted = rng.random(rows) < 0.05
+            flags[noted] = rng.choice(NOTES, noted.sum())
+        data[name] = flags
+
+    df = pd.DataFrame(data)
+    df.columns = pd.MultiIndex.from_tuples(column_tuples())
+
+    return df
+
+
+def write_workbook(df: pd.DataFrame, path: str):
+    """
+    Writes df with the workbook's header rows, the organisation only on the
+    first row of each council block and a total row after each block
+    :param df: pd.DataFrame, from generate_frame
+    :param path: str
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+
+    columns = df.columns.tolist()
+    top, groups, names = zip(*columns)
+    sheet.append(_header_row(top))
+    sheet.append(_header_row([None if group.startswith('Unnamed') else group
+                              for group in groups]))
+    sheet.append(list(names))
+
+    organisations = df.iloc[:, 0].tolist()
+    previous = None
+    for i, row in enumerate(df.itertuples(index=False)):
+        row = [None if isinstance(v, float) and np.isnan(v) else v
+               for v in row]
+        if row[0] == previous:
+            row[0] = None
+        previous = organisations[i]
+        sheet.append(row)
+
+        if i + 1 == len(df) or organisations[i + 1] != previous:
+            sheet.append([None, 'Total'] + [None] * (len(columns) - 2))
+
+    workbook.save(path)
+
+
+def _header_row(labels) -> list:
+    # Merged header cells only hold their value in the first cell
+    row = []
+    for i, label in enumerate(labels):
+        row.append(label if i == 0 or labels[i - 1] != label else None)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=1_000)
+    parser.add_argument('--councils', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    write_workbook(generate_frame(args.rows, args.councils, args.seed),
+                   args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,378 @@
+"""
+Load test for the Dash callback endpoints. Starts app.server under
+gunicorn, replays tab switches, council changes, classification filters,
+slider drags and table paging from concurrent clients, and reports
+latency percentiles, throughput and per-worker RSS. Runs fully offline.
+
+    python -m benchmarks.load_harness --workers 4 --clients 32 --duration 30
+    python -m benchmarks.load_harness --rows 100000 --councils 500
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.generate_workbook import generate_frame, write_workbook
+from src.load_data import preprocess_data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, 'benchmarks', 'data')
+
+GRAPH_TABS = ['project_count', 'project_classification',
+              'project_value_distribution', 'project_theme_distribution',
+              'project_deep_dive']
+
+SCENARIO_WEIGHTS = {
+    'tab_switch': 3,
+    'council_change': 4,
+    'classification_filter': 2,
+    'slider_drag': 2,
+    'table_page': 2,
+}
+
+
+def start_server(workbook: str, workers: int, port: int,
+                 extra_args=(), env: dict = None) -> subprocess.Popen:
+    env = dict(os.environ, **(env or {}), PROJECT_WORKBOOK=workbook)
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:server',
+         '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+         '--chdir', ROOT, '--timeout', '120', *extra_args],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen,
+                     timeout: float = 120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(process.stderr.read().decode())
+        try:
+            urllib.request.urlopen(f'{base_url}/_dash-dependencies',
+                                   timeout=5)
+            return
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            time.sleep(0.2)
+    raise TimeoutError(f'{base_url} did not start within {timeout}s')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def output_specs(output: str, pattern_id=None) -> list:
+    # '..a.x...b.y..' for several outputs, 'a.x' for one
+    parts = output[2:-2].split('...') if output.startswith('..') \
+        else [output]
+
+    specs = []
+    for part in parts:
+        component_id, prop = part.rsplit('.', 1)
+        if component_id.startswith('{'):
+            component_id = pattern_id
+        specs.append({'id': component_id, 'property': prop.split('@')[0]})
+    return specs
+
+
+def build_payload(dependency: dict, values: dict, changed: str,
+                  pattern_id=None) -> dict:
+    """
+    /_dash-update-component body for a callback, as the renderer sends it
+    :param dependency: dict, entry of /_dash-dependencies
+    :param values: dict, 'id.property' -> current value
+    :param changed: str, 'id.property' of the triggering input
+    :param pattern_id: dict, concrete id for pattern-matching callbacks
+    :return: dict
+    """
+    def fill(specs):
+        filled = []
+        for spec in specs:
+            component_id = spec['id']
+            if component_id.startswith('{'):
+                key = f"pattern.{spec['property']}"
+                component_id = pattern_id
+            else:
+                key = f"{component_id}.{spec['property']}"
+            filled.append({'id': component_id, 'property': spec['property'],
+                           'value': values.get(key)})
+        return filled
+
+    outputs = output_specs(dependency['output'], pattern_id)
+    if pattern_id is not None:
+        changed = json.dumps(pattern_id, sort_keys=True,
+                             separators=(',', ':')) + '.' + changed
+
+    return {
+        'output': dependency['output'],
+        'outputs': outputs if len(outputs) > 1 else outputs[0],
+        'inputs': fill(dependency['inputs']),
+        'state': fill(dependency.get('state', [])),
+        'changedPropIds': [changed],
+    }
+
+
+def server_callbacks(dependencies: list, input_id: str) -> list:
+    return [d for d in dependencies
+            if not d.get('clientside_function')
+            and any(i['id'] == input_id for i in d['inputs'])]
+
+
+class Scenarios:
+    """
+    Builds request sequences for each user interaction
+    """
+
+    def __init__(self, dependencies: list, data):
+        self.data = data
+        self.tab_callbacks = server_callbacks(dependencies, 'graph-tabs')
+        self.council_callbacks = server_callbacks(
+            dependencies, 'council-dropdown')
+        self.classification_callbacks = server_callbacks(
+            dependencies, 'project-classification-dropdown')
+        self.slider_callbacks = server_callbacks(
+            dependencies, 'project-value-slider')
+        self.table_callbacks = [d for d in dependencies
+                                if 'project-table' in d['output']]
+
+    def available(self) -> dict:
+        callbacks = {
+            'tab_switch': self.tab_callbacks,
+            'council_change': self.council_callbacks,
+            'classification_filter': self.classification_callbacks,
+            'slider_drag': self.slider_callbacks,
+            'table_page': self.table_callbacks,
+        }
+        return {name: weight for name, weight in SCENARIO_WEIGHTS.items()
+                if callbacks[name]}
+
+    def payloads(self, name: str, rng: random.Random) -> list:
+        return getattr(self, name)(rng)
+
+    def tab_switch(self, rng):
+        values = {'graph-tabs.value': rng.choice(GRAPH_TABS),
+                  'tabs.value': rng.choice(['overview', 'council_view'])}
+        return [build_payload(d, values, 'graph-tabs.value')
+                for d in self.tab_callbacks]
+
+    def council_change(self, rng):
+        values = {'council-dropdown.value': rng.choice(self.data.councils),
+                  'graph-tabs.value': rng.choice(GRAPH_TABS),
+                  'tabs.value': 'council_view'}
+        # Only the mounted dashboard's callback fires in the browser
+        return [build_payload(rng.choice(self.council_callbacks), values,
+                              'council-dropdown.value')]
+
+    def classification_filter(self, rng):
+        names = list(self.data.classification_names)
+        values = {'project-classification-checklist.value': [],
+                  'project-classification-dropdown.value':
+                      rng.sample(names, rng.randint(1, len(names)))}
+        return [build_payload(d, values, 'project-classification-dropdown.value')
+                for d in self.classification_callbacks]
+
+    def slider_drag(self, rng):
+        # A drag sends a burst of ranges as the handle moves
+        high = self.data.max_project_value
+        low = 0
+        payloads = []
+        for _ in range(5):
+            low = rng.randint(low, max(low, high // 2))
+            values = {'project-value-slider.value': [low, high]}
+            payloads += [build_payload(d, values, 'project-value-slider.value')
+                         for d in self.slider_callbacks]
+        return payloads
+
+    def table_page(self, rng):
+        table_id = {'type': 'project-table', 'tab': 'overview',
+                    'council': self.data.councils[0]}
+        pages = max(1, len(self.data.projects) // 20)
+        values = {
+            'pattern.page_current': rng.randrange(pages),
+            'pattern.page_size': 20,
+            'pattern.sort_by': rng.choice(
+                [[], [{'column_id': 'Project Value', 'direction': 'desc'}]]),
+            'pattern.filter_query': rng.choice(
+                ['', '{Theme} icontains retrofit']),
+            'pattern.id': table_id,
+        }
+        return [build_payload(d, values, 'page_current', table_id)
+                for d in self.table_callbacks]
+
+
+def client(base_url, scenarios, weights, deadline, seed, results, lock):
+    rng = random.Random(seed)
+    names = list(weights)
+
+    while time.time() < deadline:
+        name = rng.choices(names, [weights[n] for n in names])[0]
+        for payload in scenarios.payloads(name, rng):
+            body = json.dumps(payload).encode()
+            request = urllib.request.Request(
+                f'{base_url}/_dash-update-component', data=body,
+                headers={'Content-Type': 'application/json'})
+
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=120) as r:
+                    size = len(r.read())
+                ok = True
+            except (urllib.error.URLError, ConnectionError):
+                size, ok = 0, False
+            elapsed = time.perf_counter() - start
+
+            with lock:
+                results.append((name, elapsed, size, ok))
+
+
+def worker_rss(master_pid: int) -> dict:
+    """
+    Resident set size in MB of each gunicorn worker (Linux only)
+    :param master_pid: int
+    :return: dict
+    """
+    rss = {}
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+            if parent != master_pid:
+                continue
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        rss[int(pid)] = int(line.split()[1]) / 1024
+        except (OSError, IndexError, ValueError):
+            continue
+    return rss
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def summarise(results: list, duration: float) -> dict:
+    summary = {}
+    for name in sorted({r[0] for r in results}) + ['all']:
+        rows = [r for r in results if name in ('all', r[0])]
+        latencies = [r[1] * 1000 for r in rows if r[3]]
+        summary[name] = {
+            'requests': len(rows),
+            'errors': sum(not r[3] for r in rows),
+            'throughput': len(rows) / duration,
+            'p50_ms': percentile(latencies, 50) if latencies else None,
+            'p95_ms': percentile(latencies, 95) if latencies else None,
+            'p99_ms': percentile(latencies, 99) if latencies else None,
+            'mean_kb': statistics.mean(r[2] for r in rows) / 1024,
+        }
+    return summary
+
+
+def run_load_test(workbook, workers, clients, duration, warmup=5,
+                  server_args=()) -> dict:
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    process = start_server(workbook, workers, port, server_args)
+
+    try:
+        wait_until_ready(base_url, process)
+        with urllib.request.urlopen(f'{base_url}/_dash-dependencies') as r:
+            dependencies = json.load(r)
+
+        scenarios = Scenarios(dependencies, preprocess_data(workbook))
+        weights = scenarios.available()
+
+        lock = threading.Lock()
+        for phase_duration, results in ((warmup, []), (duration, [])):
+            deadline = time.time() + phase_duration
+            threads = [threading.Thread(
+                target=client,
+                args=(base_url, scenarios, weights, deadline, seed, results,
+                      lock))
+                for seed in range(clients)]
+            peak_rss = {}
+            for thread in threads:
+                thread.start()
+            while any(t.is_alive() for t in threads):
+                for pid, rss in worker_rss(process.pid).items():
+                    peak_rss[pid] = max(peak_rss.get(pid, 0), rss)
+                time.sleep(0.5)
+
+        rss = worker_rss(process.pid)
+        for pid, value in rss.items():
+            peak_rss[pid] = max(peak_rss.get(pid, 0), value)
+
+        return {
+            'workbook': workbook,
+            'workers': workers,
+            'clients': clients,
+            'duration': duration,
+            'scenarios': summarise(results, duration),
+            'worker_rss_mb': rss,
+            'worker_peak_rss_mb': peak_rss,
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def print_report(report: dict):
+    print(f"{report['workers']} workers, {report['clients']} clients, "
+          f"{report['duration']}s on {report['workbook']}")
+    print(f"{'scenario':<24} {'requests':>9} {'errors':>7} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'KB':>8}")
+    for name, s in report['scenarios'].items():
+        print(f"{name:<24} {s['requests']:>9} {s['errors']:>7} "
+              f"{s['throughput']:>8.1f} {s['p50_ms'] or 0:>8.1f} "
+              f"{s['p95_ms'] or 0:>8.1f} {s['p99_ms'] or 0:>8.1f} "
+              f"{s['mean_kb']:>8.1f}")
+
+    for pid, rss in sorted(report['worker_rss_mb'].items()):
+        peak = report['worker_peak_rss_mb'].get(pid, rss)
+        print(f'worker {pid}: {rss:.1f} MB RSS (peak {peak:.1f} MB)')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--workbook',
+                        default=os.path.join(ROOT,
+                                             'Master Project List D2N2.xlsx'))
+    parser.add_argument('--rows', type=int,
+                        help='use a synthetic workbook with this many rows')
+    parser.add_argument('--councils', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--output', help='also write the report as JSON')
+    args = parser.parse_args()
+
+    workbook = args.workbook
+    if args.rows:
+        workbook = os.path.join(
+            DATA_DIR, f'projects_{args.rows}x{args.councils}_0.xlsx')
+        if not os.path.exists(workbook):
+            write_workbook(generate_frame(args.rows, args.councils), workbook)
+
+    report = run_load_test(workbook, args.workers, args.clients,
+                           args.duration, args.warmup)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
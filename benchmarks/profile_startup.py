@@ -0,0 +1,191 @@
+"""
+Startup profile of the app: import time per package and module from
+python -X importtime, the time from starting gunicorn to the first served
+page and tab callback, and the time a recycled worker takes to serve again,
+with and without the model snapshot (Config.model_snapshot).
+
+    python -m benchmarks.profile_startup
+    python -m benchmarks.profile_startup --rows 100000 --councils 500
+"""
+import argparse
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+from benchmarks.bench_worker_memory import children
+from benchmarks.generate_workbook import generate_frame, write_workbook
+from benchmarks.load_harness import (DATA_DIR, ROOT, build_payload,
+                                     free_port, server_callbacks,
+                                     start_server)
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+# What a browser requests when it opens the dashboard
+PAGE = ('/', '/_dash-layout', '/_dash-dependencies')
+
+MODES = {
+    'per-worker': {'SHARED_PROJECT_DATA': '0', 'MODEL_SNAPSHOT': '0'},
+    'per-worker, model': {'SHARED_PROJECT_DATA': '0', 'MODEL_SNAPSHOT': '1'},
+    'shared': {'SHARED_PROJECT_DATA': '1', 'MODEL_SNAPSHOT': '0'},
+    'shared, model': {'SHARED_PROJECT_DATA': '1', 'MODEL_SNAPSHOT': '1'},
+}
+
+
+def import_times(workbook: str, model_snapshot: str = '1') -> list:
+    """
+    (self us, cumulative us, depth, module) for every module imported by
+    app, the app module's own time includes loading the workbook
+    :param workbook: str
+    :param model_snapshot: str, MODEL_SNAPSHOT environment variable
+    :return: list
+    """
+    env = dict(os.environ, PROJECT_WORKBOOK=workbook,
+               MODEL_SNAPSHOT=model_snapshot)
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+    rows = []
+    for line in process.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            rows.append((int(match[1]), int(match[2]),
+                         len(match[3]) // 2, match[4]))
+    return rows
+
+
+def print_import_report(rows: list, top: int):
+    by_package = Counter()
+    for self_us, _, _, module in rows:
+        by_package[module.split('.')[0]] += self_us
+    total = sum(by_package.values())
+
+    print(f'Import of app: {total / 1000:.0f} ms')
+    print(f"{'package':<32} {'self ms':>8}")
+    for package, self_us in by_package.most_common(top):
+        print(f'{package:<32} {self_us / 1000:>8.1f}')
+
+    print(f"\n{'module imported by app':<32} {'cumulative ms':>14}")
+    for _, cumulative, depth, module in sorted(
+            (r for r in rows if r[2] == 1), key=lambda r: -r[1])[:top]:
+        print(f'{module:<32} {cumulative / 1000:>14.1f}')
+
+
+def request(base_url: str, path: str, body: dict = None, timeout=120):
+    data = None if body is None else json.dumps(body).encode()
+    r = urllib.request.Request(f'{base_url}{path}', data=data,
+                               headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(r, timeout=timeout) as response:
+        return response.read()
+
+
+def first_tab_payload(base_url: str) -> dict:
+    dependencies = json.loads(request(base_url, '/_dash-dependencies'))
+    return build_payload(
+        server_callbacks(dependencies, 'graph-tabs')[0],
+        {'graph-tabs.value': 'project_count', 'tabs.value': 'overview'},
+        'graph-tabs.value')
+
+
+def wait_for_page(base_url: str, process, timeout: float = 600) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(process.stderr.read().decode())
+        try:
+            request(base_url, '/', timeout=5)
+            return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            time.sleep(0.02)
+    raise TimeoutError(f'{base_url} did not start within {timeout}s')
+
+
+def total_us(rows: list) -> int:
+    return sum(row[0] for row in rows)
+
+
+def cold_start(workbook: str, env: dict) -> dict:
+    """
+    Seconds from starting a one-worker gunicorn to serving the page and the
+    first tab, and for a recycled worker to serve the page again
+    """
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+
+    start = time.perf_counter()
+    process = start_server(workbook, 1, port, env=env)
+    try:
+        timings = {'first page': wait_for_page(base_url, process)}
+        for path in PAGE[1:]:
+            request(base_url, path)
+        payload = first_tab_payload(base_url)
+        request(base_url, '/_dash-update-component', payload)
+        timings['first tab'] = time.perf_counter() - start
+
+        tab_start = time.perf_counter()
+        request(base_url, '/_dash-update-component', payload)
+        timings['cached tab'] = time.perf_counter() - tab_start
+
+        # Gunicorn replaces a worker that exits, as after max_requests
+        worker, = children(process.pid)
+        os.kill(worker, signal.SIGTERM)
+        while children(process.pid) == [worker]:
+            time.sleep(0.01)
+        recycle_start = time.perf_counter()
+        wait_for_page(base_url, process)
+        request(base_url, '/_dash-update-component', payload)
+        timings['recycled worker tab'] = time.perf_counter() - recycle_start
+    finally:
+        process.terminate()
+        process.wait()
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--workbook',
+                        default=os.path.join(ROOT,
+                                             'Master Project List D2N2.xlsx'))
+    parser.add_argument('--rows', type=int,
+                        help='use a synthetic workbook with this many rows')
+    parser.add_argument('--councils', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    workbook = args.workbook
+    if args.rows:
+        workbook = os.path.join(
+            DATA_DIR, f'projects_{args.rows}x{args.councils}_0.xlsx')
+        if not os.path.exists(workbook):
+            write_workbook(generate_frame(args.rows, args.councils), workbook)
+
+    # Best of several runs, the first also writes the snapshots
+    runs = [import_times(workbook) for _ in range(args.repeat)]
+    print_import_report(min(runs, key=total_us), args.top)
+
+    rebuilt = min(total_us(import_times(workbook, '0'))
+                  for _ in range(args.repeat))
+    print(f'\nImport of app without the model snapshot: {rebuilt / 1000:.0f} ms')
+
+    print(f"\n{'gunicorn, 1 worker':<22} {'first page':>11} {'first tab':>10} "
+          f"{'cached tab':>11} {'recycled worker tab':>20}")
+    for mode, env in MODES.items():
+        timings = [cold_start(workbook, env) for _ in range(args.repeat)]
+        best = {key: min(t[key] for t in timings) for key in timings[0]}
+        print(f"{mode:<22} {best['first page']:>10.2f}s "
+              f"{best['first tab']:>9.2f}s {best['cached tab'] * 1000:>9.1f}ms "
+              f"{best['recycled worker tab']:>19.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Times workbook loading and every clean_data, generate_* and update_*
+function in src/dash1.py - src/dash5.py on synthetic workbooks, and stores
+the results as JSON so runs on different commits can be compared.
+
+    python -m benchmarks.run_benchmarks --rows 100 10000 --councils 10 500
+    python -m benchmarks.compare benchmarks/results/a.json \
+        benchmarks/results/b.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import time
+
+import pandas as pd
+import plotly
+
+from assets.config import Config
+from benchmarks.generate_workbook import generate_frame, write_workbook
+from src import dash1, dash2, dash3, dash4, dash5
+from src.load_data import preprocess_data, read_workbook
+from src.project_data import ProjectData
+
+config = Config()
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def benchmark_cases(raw: pd.DataFrame, data: ProjectData) -> dict:
+    """
+    Benchmark name -> zero-argument callable for one workbook
+    :param raw: pd.DataFrame, output of read_workbook
+    :param data: ProjectData built from raw
+    :return: dict
+    """
+    council = data.councils[0]
+    names = distinguish(data.project_names, council)
+    values = distinguish(data.project_values, council)
+    classifications = data.classifications.sort_values(['Count'])
+    council_classifications = distinguish(classifications, council)
+    all_classifications = list(data.classification_names)
+
+    return {
+        'ProjectData.from_raw': lambda: ProjectData.from_raw(raw),
+
+        'dash1.clean_data': lambda: dash1.clean_data(raw),
+        'dash1.generate_project_visualisation[overview]':
+            lambda: dash1.generate_project_visualisation(data, 'overview'),
+        'dash1.generate_project_visualisation[council_view]':
+            lambda: dash1.generate_project_visualisation(
+                data, 'council_view'),
+        'dash1.generate_stats_card':
+            lambda: dash1.generate_stats_card('Project Count', len(names)),
+        'dash1.generate_bar_chart':
+            lambda: dash1.generate_bar_chart(data.project_names),
+        'dash1.generate_donut_chart':
+            lambda: dash1.generate_donut_chart(names),
+        'dash1.generate_table_data':
+            lambda: dash1.generate_table_data(
+                data.project_table(), council,
+                data.council_index['projects']),
+        'dash1.generate_project_visualisation[council]':
+            lambda: dash1.generate_project_visualisation(
+                data, 'council_view', council),
+
+        'dash2.clean_data': lambda: dash2.clean_data(raw),
+        'dash2.generate_project_classification_visualizations[overview]':
+            lambda: dash2.generate_project_classification_visualizations(
+                data, 'overview'),
+        'dash2.generate_project_classification_visualizations'
+        '[council_view]':
+            lambda: dash2.generate_project_classification_visualizations(
+                data, 'council_view'),
+        'dash2.generate_bar_fig':
+            lambda: dash2.generate_bar_fig(
+                classifications, 'Count', 'Organisations',
+                'Project Classification Breakdown', 'Overview'),
+        'dash2.generate_donut_fig':
+            lambda: dash2.generate_donut_fig(council_classifications),
+        'dash2.generate_project_classification_visualizations[council]':
+            lambda: dash2.generate_project_classification_visualizations(
+                data, 'council_view', council),
+        'dash2.update_project_classification_overview_patch[subset]':
+            lambda: dash2.update_project_classification_overview_patch(
+                data, all_classifications[:3], []),
+        'dash2.update_project_classification_overview_patch[all]':
+            lambda: dash2.update_project_classification_overview_patch(
+                data, all_classifications, ['All']),
+
+        'dash3.clean_data': lambda: dash3.clean_data(raw),
+        'dash3.generate_project_value_distribution_visualisation[overview]':
+            lambda: dash3.generate_project_value_distribution_visualisation(
+                data, 'overview'),
+        'dash3.generate_bar_graph':
+            lambda: dash3.generate_bar_graph(values),
+        'dash3.generate_value_slider_store':
+            lambda: dash3.generate_value_slider_store(data),
+        'dash3.generate_project_value_distribution_visualisation[council]':
+            lambda: dash3.generate_project_value_distribution_visualisation(
+                data, 'council_view', council),
+        'dash3.update_project_value_overview_fig':
+            lambda: dash3.update_project_value_overview_fig(
+                data, [0, data.max_project_value // 2]),
+        'dash3.project_value_overview_patch':
+            lambda: dash3.project_value_overview_patch(
+                data, [0, data.max_project_value // 2]),
+
+        'dash4.clean_data': lambda: dash4.clean_data(raw),
+        'dash4.generate_project_theme_distribution_visualisation[overview]':
+            lambda: dash4.generate_project_theme_distribution_visualisation(
+                data, 'overview'),
+        'dash4.generate_bar_graph[council_view]':
+            lambda: dash4.generate_bar_graph(
+                distinguish(data.themes, council), 'council_view'),
+        'dash4.generate_project_theme_distribution_visualisation[council]':
+            lambda: dash4.generate_project_theme_distribution_visualisation(
+                data, 'council_view', council),
+
+        'dash5.clean_data': lambda: dash5.clean_data(raw),
+        'dash5.generate_project_deep_dive_visualisation[overview]':
+            lambda: dash5.generate_project_deep_dive_visualisation(
+                data, 'overview'),
+        'dash5.generate_table_data':
+            lambda: dash5.generate_table_data(data.project_table()),
+        'dash5.generate_project_deep_dive_visualisation[council]':
+            lambda: dash5.generate_project_deep_dive_visualisation(
+                data, 'council_view', council),
+    }
+
+
+def distinguish(df: pd.DataFrame, council: str) -> pd.DataFrame:
+    return df[df['Organisations'] == council]
+
+
+def time_call(func, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return {'best': min(times), 'median': statistics.median(times),
+            'repeat': repeat}
+
+
+def workbook_path(rows: int, councils: int, seed: int) -> str:
+    path = os.path.join(DATA_DIR, f'projects_{rows}x{councils}_{seed}.xlsx')
+    if not os.path.exists(path):
+        write_workbook(generate_frame(rows, councils, seed), path)
+    return path
+
+
+def run(rows_list, councils_list, repeat, pattern, seed) -> list:
+    results = []
+
+    for rows in rows_list:
+        for councils in councils_list:
+            if councils > rows:
+                continue
+
+            path = workbook_path(rows, councils, seed)
+            print(f'{rows} rows, {councils} councils ({path})')
+
+            cases = {
+                'load_data.read_workbook': lambda: read_workbook(path),
+                'load_data.preprocess_data': lambda: preprocess_data(
+                    path, use_snapshot=False),
+            }
+            raw = read_workbook(path)
+            cases.update(benchmark_cases(raw, ProjectData.from_raw(raw)))
+
+            for name, func in cases.items():
+                if not re.search(pattern, name):
+                    continue
+
+                timing = time_call(func, repeat)
+                results.append(dict(case=name, rows=rows, councils=councils,
+                                    **timing))
+                print(f"  {name:<70} {timing['best'] * 1000:>10.2f} ms")
+
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+',
+                        default=[100, 1_000, 10_000])
+    parser.add_argument('--councils', type=int, nargs='+',
+                        default=[10, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cases', default='.',
+                        help='regex selecting benchmark names')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output',
+                        help='JSON file, defaults to results/<commit>.json')
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = run(args.rows, args.councils, args.repeat, args.cases,
+                  args.seed)
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{commit}.json')
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'plotly': plotly.__version__,
+            'results': results,
+        }, f, indent=2)
+    print(f'Wrote {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Gunicorn settings, picked up from the working directory:
+
+    gunicorn app:server --workers 8
+
+With Config.shared_data the app is imported once in the master, so the
+workbook is parsed once and every worker is forked with the cleaned model
+already in memory. The workers share those pages copy-on-write instead of
+each holding its own copy.
+
+Each worker also forks its own figure pool of Config.figure_pool_processes
+processes (FIGURE_POOL_PROCESSES, 2 by default), so 8 workers run 24
+processes besides the master. The pool processes share their worker's
+pages copy-on-write, but each one adds the private memory of the tabs it
+builds. Keep workers x (1 + figure_pool_processes) within the CPUs and
+memory available, e.g. fewer workers, or FIGURE_POOL_PROCESSES=1.
+"""
+import gc
+import os
+import signal
+
+from assets.config import Config
+
+# Module level names are read as settings, so Config is not instantiated
+preload_app = Config.shared_data
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+
+    from app import data_store
+
+    # Forked workers do not inherit the watcher thread, it keeps running in
+    # the master. After a reload there the workers are gracefully replaced by
+    # forks holding the new model, so it stays shared.
+    def restart_workers(data):
+        gc.unfreeze()
+        os.kill(os.getpid(), signal.SIGHUP)
+
+    data_store.add_listener(restart_workers)
+
+
+def pre_fork(server, worker):
+    # Objects in the permanent generation are never visited by the cyclic
+    # collector, which would otherwise write to every shared page in each
+    # worker
+    gc.freeze()
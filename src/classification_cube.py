@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from src.metrics import metrics
+
+
+class ClassificationCube:
+    """
+    Organisation x classification x breakdown project counts, stored as an
+    organisation x breakdown matrix plus the classification of each
+    breakdown. Built once per data version from dash2.clean_data.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        :param df: pd.DataFrame, melted output of dash2.clean_data
+        """
+        columns = df[['Project Classification',
+                      'Project Classification Breakdown']].drop_duplicates()
+        pivot = df.pivot_table(
+            index='Organisations',
+            columns=['Project Classification',
+                     'Project Classification Breakdown'],
+            values='Count', aggfunc='sum', observed=True, sort=False)
+        pivot = pivot.sort_index()[pd.MultiIndex.from_frame(columns)]
+
+        # Labels keep their pandas dtype so slices need no re-inference
+        self.organisations = pivot.index
+        self.classifications = pd.Index(columns['Project Classification'])
+        self.breakdowns = pd.Index(
+            columns['Project Classification Breakdown'])
+        self.counts = pivot.to_numpy(dtype='int64')
+        # Shared by every callback and forked worker
+        self.counts.flags.writeable = False
+
+        self._organisation_position = {
+            org: i for i, org in enumerate(self.organisations)}
+        self._breakdown_positions = {}
+        for i, breakdown in enumerate(self.breakdowns):
+            self._breakdown_positions.setdefault(breakdown, []).append(i)
+
+    def __setstate__(self, state):
+        # Arrays are unpickled writeable
+        self.__dict__.update(state)
+        self.counts.flags.writeable = False
+
+    @metrics.stage('pandas')
+    def slice(self, breakdowns=None, organisations=None,
+              drop_zero: bool = True) -> pd.DataFrame:
+        """
+        Long-format counts for the selected breakdowns and organisations,
+        ordered like the melted view (breakdown, then organisation)
+        :param breakdowns: list of breakdown names, all when None
+        :param organisations: list of organisations, all when None
+        :param drop_zero: bool, leave out zero counts
+        :return: pd.DataFrame
+        """
+        columns = self._columns(breakdowns)
+        rows = self._rows(organisations)
+
+        row_positions = np.tile(rows, len(columns))
+        column_positions = np.repeat(columns, len(rows))
+        counts = self.counts[row_positions, column_positions]
+
+        if drop_zero:
+            keep = counts != 0
+            row_positions = row_positions[keep]
+            column_positions = column_positions[keep]
+            counts = counts[keep]
+
+        return pd.DataFrame({
+            'Organisations': self.organisations.take(row_positions),
+            'Project Classification': self.classifications.take(
+                column_positions),
+            'Project Classification Breakdown': self.breakdowns.take(
+                column_positions),
+            'Count': counts,
+        })
+
+    @metrics.stage('pandas')
+    def roll_up(self, breakdowns=None, organisations=None) -> pd.DataFrame:
+        """
+        Organisation x classification totals over the selected breakdowns
+        :param breakdowns: list of breakdown names, all when None
+        :param organisations: list of organisations, all when None
+        :return: pd.DataFrame
+        """
+        columns = self._columns(breakdowns)
+        rows = self._rows(organisations)
+
+        df = pd.DataFrame(self.counts[np.ix_(rows, columns)],
+                          index=self.organisations.take(rows),
+                          columns=self.classifications.take(columns))
+
+        return df.T.groupby(level=0, sort=False).sum().T
+
+    def _columns(self, breakdowns):
+        if breakdowns is None:
+            return np.arange(len(self.breakdowns))
+
+        return np.array(sorted(
+            i for breakdown in set(breakdowns)
+            for i in self._breakdown_positions.get(breakdown, [])),
+            dtype=np.intp)
+
+    def _rows(self, organisations):
+        if organisations is None:
+            return np.arange(len(self.organisations))
+
+        return np.array(
+            [self._organisation_position[org] for org in organisations
+             if org in self._organisation_position], dtype=np.intp)
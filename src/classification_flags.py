@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+from src.metrics import metrics
+
+# Smallest unsigned integer holding the flags, wider sets use several
+WORD_DTYPES = (np.uint8, np.uint16, np.uint32, np.uint64)
+
+
+class ClassificationFlags:
+    """
+    Classifications of every project packed into one unsigned integer, bit i
+    set when the project counts towards the i-th classification column.
+    Multi-classification filters are bitwise operations on that integer.
+    Built once per data version, rows in the order of ProjectData.projects.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        :param df: pd.DataFrame with the 3-level workbook header
+        """
+        # The dashboards import load_data, which the model imports
+        from src.dash2 import classification_values
+
+        values = classification_values(df)
+        self._set_names(tuple(name for _, name in values.columns))
+        self.bits = self._pack(values.to_numpy() != 0)
+        # Shared by every callback and forked worker
+        self.bits.flags.writeable = False
+
+    @classmethod
+    def from_bits(cls, names, bits: np.ndarray) -> "ClassificationFlags":
+        """
+        Flags already packed, e.g. read from the model snapshot
+        :param names: iterable of classification names, in bit order
+        :param bits: np.ndarray, projects x words as in bits
+        :return: ClassificationFlags
+        """
+        flags = cls.__new__(cls)
+        flags._set_names(tuple(names))
+        flags.bits = np.ascontiguousarray(bits, dtype=flags._word_dtype)
+        flags.bits.flags.writeable = False
+        return flags
+
+    def _set_names(self, names: tuple):
+        self.names = names
+        self._bit = {name: i for i, name in enumerate(self.names)}
+
+        self._word_dtype = next(
+            (dtype for dtype in WORD_DTYPES
+             if np.iinfo(dtype).bits >= len(self.names)), np.uint64)
+
+    def __setstate__(self, state):
+        # Arrays are unpickled writeable
+        self.__dict__.update(state)
+        self.bits.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.bits)
+
+    @metrics.stage('pandas')
+    def mask(self, names, match: str = 'any') -> np.ndarray:
+        """
+        Projects classified under any or all of names
+        :param names: iterable of classification names, e.g. 'Solar'
+        :param match: str, 'any' or 'all'
+        :return: np.ndarray of bool, one per project
+        """
+        names = list(names)
+        unknown = [name for name in names if name not in self._bit]
+        if unknown:
+            raise KeyError(f"Unknown classifications {unknown}")
+        if match not in ('any', 'all'):
+            raise ValueError(f"match must be 'any' or 'all', not {match!r}")
+
+        selected = np.zeros((1, len(self.names)), dtype=bool)
+        selected[0, [self._bit[name] for name in names]] = True
+        query = self._pack(selected)[0]
+
+        masked = self.bits & query
+        if match == 'any':
+            return (masked != 0).any(axis=1)
+        return (masked == query).all(axis=1)
+
+    def _pack(self, flags: np.ndarray) -> np.ndarray:
+        """
+        projects x classifications booleans as projects x words integers,
+        a single word for up to 64 classifications
+        """
+        word_bits = np.iinfo(self._word_dtype).bits
+        words = max(1, -(-flags.shape[1] // word_bits))
+
+        bits = np.zeros((len(flags), words), dtype=self._word_dtype)
+        for i in range(flags.shape[1]):
+            bits[:, i // word_bits] |= \
+                flags[:, i].astype(self._word_dtype) << (i % word_bits)
+
+        return bits
@@ -1,23 +1,25 @@
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
 import dash_bootstrap_components as dbc
 from dash import html
 from dash.dash_table import DataTable
 
 from assets.config import Config
+from src import figure_specs
+from src.level_of_detail import others_title, others_view, \
+    top_n_with_others
 from src.load_data import distinguish_data
+from src.table_query import table_props, with_classification_filter
 
 config = Config()
 
 
-def generate_project_visualisation(df: pd.DataFrame, tab: str):
-    df_cleaned = clean_data(df)
-    df_council_and_projects = distinguish_data(tab, df_cleaned)
+def generate_project_visualisation(data, tab: str,
+                                   council: str = config.default_council):
+    df_council_and_projects = distinguish_data(
+        tab, data.project_names, council,
+        data.council_index['project_names'])
 
-    df_council_and_projects = df_council_and_projects.drop_duplicates()
-
-    value = len(list(df_council_and_projects['Project Name']))
+    value = len(df_council_and_projects)
     fig_card = generate_stats_card("Project Count", value)
 
     if tab == "overview":
@@ -26,7 +28,9 @@ def generate_project_visualisation(df: pd.DataFrame, tab: str):
         fig_donut = None
     else:
         fig_donut = generate_donut_chart(df_council_and_projects)
-        fig_table = generate_table_data(df.copy())
+        fig_table = generate_table_data(
+            data.project_table(), council, data.council_index['projects'],
+            data.classification_flags.names)
         fig_bar = None
 
     return fig_card, fig_bar, fig_donut, fig_table
@@ -38,7 +42,7 @@ def clean_data(df: pd.DataFrame):
     df_council_and_projects = df_council_and_projects[
         ['Organisations', 'Project Name']]
 
-    return df_council_and_projects
+    return df_council_and_projects.drop_duplicates()
 
 
 def generate_stats_card(title, value):
@@ -58,69 +62,77 @@ def generate_stats_card(title, value):
     )
 
 
-def generate_bar_chart(df):
-    df["Project Counts"] = df.groupby(['Organisations'])['Project Name'].transform('count')
+def generate_bar_chart(df, skip: int = 0):
+    """
+    Project count of each council, the top config.lod_top_n and 'Others'
+    above config.lod_threshold councils
+    :param df: pd.DataFrame, council and project names
+    :param skip: int, councils with the most projects left out, set when
+        zoomed into 'Others'
+    :return: dict, figure spec
+    """
+    df = df.assign(**{"Project Counts": df.groupby(
+        ['Organisations'], observed=True)['Project Name'].transform('count')})
 
     df = df[['Organisations', 'Project Counts']]
     df = df.drop_duplicates()
 
     df = df.sort_values(['Project Counts'], ascending=True)
 
+    view = None
+    if len(df) > config.lod_threshold:
+        df = top_n_with_others(df, 'Organisations', 'Project Counts',
+                               config.lod_top_n, skip=skip)
+        view = others_view(df, 'Organisations', config.lod_top_n, skip)
+
     max_value = len(set(df['Organisations']))
     fig_height = max(700, max_value * 40)
 
-    fig = px.bar(
+    fig = figure_specs.bar(
         df,
         x="Project Counts",
         y="Organisations",
-        title="Project Count Per Council",
+        title=others_title("Project Count Per Council", skip),
         height=fig_height,
-        color_discrete_sequence=[config.primary_color] * len(df)
+        colors=[config.primary_color]
     )
+
+    if view:
+        fig['layout']['meta'] = view
+
     return fig
 
 
+def update_project_count_zoom_fig(data, skip: int):
+    return generate_bar_chart(data.project_names, skip)
+
+
 def generate_donut_chart(df):
     label = list(df['Project Name'])
 
     parents = list(df['Organisations'])
 
-    fig = go.Figure(go.Sunburst(
+    fig = figure_specs.sunburst(
         labels=label,
         parents=parents,
-        branchvalues="total"))
-
-    fig.update_layout(title='Council Project Names',
-                      margin=dict(t=30, l=10, r=10, b=0))
+        title={'text': 'Council Project Names'},
+        margin=dict(t=30, l=10, r=10, b=0))
 
     return fig
 
 
-def generate_table_data(df: pd.DataFrame, council: str = config.default_council) -> DataTable:
-    df.columns = df.columns.droplevel(0)
-    df.columns = df.columns.droplevel(0)
-
-    df = df[df['Organisations'] == council]
+def generate_table_data(df: pd.DataFrame, council: str = config.default_council,
+                        council_index: dict = None,
+                        classifications: tuple = ()):
+    df = distinguish_data('council_view', df, council, council_index)
 
     table = DataTable(
             columns=[{"name": col, "id": col} for col in df.columns[1:]],
-            data=df.to_dict('records'),
+            **table_props(df, 10, 'council_view', council),
             page_size=10,
             style_table={'overflowX': 'auto'},
             style_cell={'textAlign': 'left'},
             style_header={'fontWeight': 'bold'},
         )
-    return table
-
-
-def update_dash1_visuals_func(df, council):
-    df_cleaned = clean_data(df)
-    df_council_and_projects = distinguish_data('council_view', df_cleaned, council)
-    df_council_and_projects = df_council_and_projects.drop_duplicates()
-
-    value = len(list(df_council_and_projects['Project Name']))
-    fig_card = generate_stats_card("Project Count", value)
-
-    table_fig = generate_table_data(df, council)
-
-    return fig_card, generate_donut_chart(df_council_and_projects), table_fig
+    return with_classification_filter(table, classifications, 'council_view',
+                                      council)
@@ -1,16 +1,18 @@
-import plotly.express as px
 import pandas as pd
-import plotly.graph_objects as go
+from dash import Patch
 
+from assets.config import Config
+from src import figure_specs
 from src.load_data import distinguish_data
 
+config = Config()
 
-def generate_project_classification_visualizations(df: pd.DataFrame, tab: str):
-    df_clean = clean_data(df.copy())
-    df_data = distinguish_data(tab, df_clean)
-    df_data = df_data[df_data['Count'] != 0]
 
-    df_data = df_data.sort_values(['Count'], ascending=True)
+def generate_project_classification_visualizations(
+        data, tab: str, council: str = config.default_council):
+    df_data = classified(distinguish_data(
+        tab, data.classifications, council,
+        data.council_index['classifications']))
 
     if tab == "overview":
         fig_bar_chart = generate_bar_fig(
@@ -30,85 +32,90 @@ def generate_project_classification_visualizations(df: pd.DataFrame, tab: str):
             "Project Classification Breakdown",
             "Project Classification Distribution"
         )
-        donut_fig = generate_donut_fig(df_data.copy())
+        donut_fig = generate_donut_fig(df_data)
 
     return fig_bar_chart, donut_fig
 
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+def classified(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Cleans the raw data and structure it for visualisation
-    :param df: pd.DataFrame
+    Non-zero counts in the order the charts draw them
+    :param df: pd.DataFrame, rows of ProjectData.classifications
     :return: pd.DataFrame
     """
-    # Get specific columns related to project classification
-    column_index = df.columns.get_loc(
-        ('Project Classification', 'Power Generation', 'Solar'))
-
-    df_project_classification = df.iloc[:, column_index:]
-
-    # Organisation and project name cols
-    df_organisation_project_name = df.iloc[:, :2]
-
-    # Concat above together
-    df_project_classification = pd.concat(
-        [df_organisation_project_name, df_project_classification], axis=1)
-
-    df_project_classification.columns = (
-        df_project_classification.columns.droplevel(0))
-
-    # Fill with 0 if nan
-    columns_to_fill = [('Power Generation', 'Solar'),
-                       ('Power Generation', 'Wind'),
-                       ('Power Generation', 'Hydrogen'),
-                       ('Heat generation', 'Heat networks'),
-                       ('Heat generation', 'Heat pumps'),
-                       ('Storage', 'Battery'),
-                       ('Storage', 'Thermal'),
-                       ('Buildings', 'Retrofit'),
-                       ('Transport', 'Electric vehicles'),
-                       ('Horticulture', 'Farming'),
-                       ('Horticulture', 'Multi-'),
-                       ('Horticulture', 'Comments (types)')]
-
-    df_project_classification[columns_to_fill] = df_project_classification[
-        columns_to_fill].fillna(0)
-
-    # Deal with classifications that are not int
-    for col in columns_to_fill:
-        df_project_classification[col] = df_project_classification[col].apply(
-            lambda x: 0 if isinstance(x, str) else int(x)
-        )
+    df = df[df['Count'] != 0]
+    return df.sort_values(['Count'], ascending=True)
+
+
+def get_classification_columns(df: pd.DataFrame) -> list:
+    """
+    (group, classification) pairs under the Project Classification header
+    :param df: pd.DataFrame with the 3-level workbook header
+    :return: list
+    """
+    return [column[1:] for column in df.columns
+            if column[0] == 'Project Classification']
+
+
+def classification_values(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    What each project counts towards each classification
+    :param df: pd.DataFrame with the 3-level workbook header
+    :return: pd.DataFrame, project x (group, classification) counts
+    """
+    # Classification flags keyed by (group, classification)
+    df_project_classification = df['Project Classification'][
+        get_classification_columns(df)]
+
+    # Nan and text cells (notes, "x" marks) count as 0, numbers are truncated
+    return (df_project_classification
+            .apply(pd.to_numeric, errors='coerce')
+            .fillna(0)
+            .astype('int64'))
+
+
+def classification_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Classified projects per organisation
+    :param df: pd.DataFrame with the 3-level workbook header
+    :return: pd.DataFrame, organisation x (group, classification) counts
+    """
+    organisations = df.iloc[:, 0].rename('Organisations')
 
     # Group by Organisation to get count
-    df_project_classification_groupby_organisation = (
-        df_project_classification.groupby(
-            ('Unnamed: 0_level_1', 'Organisations'))[
-            columns_to_fill
-        ].sum()).reset_index()
+    return classification_values(df).groupby(organisations).sum()
 
-    # Melt dataframe
-    df_melted = df_project_classification_groupby_organisation.melt(
-        id_vars=[('Unnamed: 0_level_1', 'Organisations')],
-        value_vars=columns_to_fill)
 
-    # Rename columns
-    df_melted.columns = ['Organisations', 'Project Classification',
-                         'Project Classification Breakdown', 'Count']
+def melt_classification_counts(counts: pd.DataFrame) -> pd.DataFrame:
+    """
+    :param counts: pd.DataFrame, output of classification_counts
+    :return: pd.DataFrame, one row per organisation and classification
+    """
+    # Melt dataframe and rename columns
+    df_melted = counts.melt(ignore_index=False).reset_index().set_axis(
+        ['Organisations', 'Project Classification',
+         'Project Classification Breakdown', 'Count'], axis=1)
 
     # Get Project Classification higher level count
-    df_melted['Project Classification Count'] = (
+    return df_melted.assign(**{'Project Classification Count': (
         df_melted.groupby(['Organisations', 'Project Classification'])[
-                            'Count'].transform('sum'))
+            'Count'].transform('sum'))})
 
-    return df_melted
+
+def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cleans the raw data and structure it for visualisation
+    :param df: pd.DataFrame
+    :return: pd.DataFrame
+    """
+    return melt_classification_counts(classification_counts(df))
 
 
 def generate_bar_fig(df: pd.DataFrame, x, y, color, title):
     max_value = len(set(df[y]))
     fig_height = max(700, max_value * 40)
 
-    fig_bar_chart = px.bar(
+    fig_bar_chart = figure_specs.bar(
         df,
         x=x,
         y=y,
@@ -116,12 +123,12 @@ def generate_bar_fig(df: pd.DataFrame, x, y, color, title):
         title=title,
         height=fig_height)
 
-    fig_bar_chart.update_layout(legend=dict(
+    fig_bar_chart['layout']['legend'].update(
         orientation="h",
         yanchor="top",
         y=1.1,
         xanchor="right",
-        x=1))
+        x=1)
 
     return fig_bar_chart
 
@@ -140,14 +147,10 @@ def generate_donut_fig(df: pd.DataFrame):
 
     values = list(temp['Project Classification Count']) + list(df['Count'])
 
-    fig = go.Figure(go.Sunburst(
+    fig = figure_specs.sunburst(
         labels=label,
         parents=parents,
         values=values,
-        branchvalues="total",
-    ))
-
-    fig.update_layout(
         height=550,  # Adjust height as needed
         width=550,  # Adjust width as needed
     )
@@ -155,39 +158,31 @@ def generate_donut_fig(df: pd.DataFrame):
     return fig
 
 
-def update_dash2_visuals_func(df, council):
-    df_cleaned = clean_data(df)
-    df_council_and_projects = distinguish_data('council_view', df_cleaned, council)
-    df_council_and_projects = df_council_and_projects.drop_duplicates()
-
-    df_council_and_projects = df_council_and_projects.sort_values(['Count'], ascending=True)
-
-    fig_bar_chart = generate_bar_fig(
-        df_council_and_projects,
-        "Project Classification",
-        "Count",
-        "Project Classification Breakdown",
-        "Project Classification Distribution"
-    )
-
-    donut_fig = generate_donut_fig(df_council_and_projects)
-
-    return fig_bar_chart, donut_fig
-
-
-def update_project_classification_overview_fig(df, select_some, select_all):
-    df_clean = clean_data(df.copy())
-
-    if select_all != ['All']:
-        df_clean = df_clean[df_clean[
-            'Project Classification Breakdown'].isin(select_some)].copy()
-        df_clean = df_clean[df_clean['Count'] != 0]
-
-    fig_bar_chart = generate_bar_fig(
-        df_clean,
-        "Count",
-        "Organisations",
-        "Project Classification Breakdown",
-        "Project Classification Count Per Council"
-    )
-    return fig_bar_chart
+def update_project_classification_overview_patch(data, select_some,
+                                                 select_all) -> Patch:
+    """
+    Shows only the selected breakdowns on the overview chart already in
+    the browser, by switching the visibility of its traces (one per
+    breakdown) and fitting its height to the councils left. Nothing else
+    of the chart is sent again.
+    :param data: ProjectData
+    :param select_some: list of breakdown names from the dropdown
+    :param select_all: list, ['All'] when every breakdown is shown
+    :return: Patch of the figure
+    """
+    breakdowns = None if select_all == ['All'] else list(select_some or [])
+    df_clean = data.classification_cube.slice(breakdowns)
+
+    # Traces are in the order generate_project_classification_visualizations
+    # draws them, councils with only hidden bars drop off the axis
+    names = classified(data.classifications)[
+        'Project Classification Breakdown'].unique()
+    shown = set(names if breakdowns is None else breakdowns)
+
+    patch = Patch()
+    for i, name in enumerate(names):
+        patch['data'][i]['visible'] = bool(name in shown)
+    patch['layout']['height'] = max(
+        700, df_clean['Organisations'].nunique() * 40)
+
+    return patch
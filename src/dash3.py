@@ -1,18 +1,26 @@
+import math
+
+import numpy as np
 import pandas as pd
-import plotly.express as px
 
 from assets.config import Config
+from src import figure_specs
+from src.encoded_figures import encoded_figures
+from src.level_of_detail import equal_count_bins, format_value
 from src.load_data import distinguish_data
 
 config = Config()
 
 
-def generate_project_value_distribution_visualisation(df: pd.DataFrame, tab: str):
-    df_project_distribution_value = clean_data(df.copy())
-
-    df_project_distribution_value = distinguish_data(tab, df_project_distribution_value)
+def generate_project_value_distribution_visualisation(
+        data, tab: str, council: str = config.default_council):
+    df_project_distribution_value = distinguish_data(
+        tab, data.project_values, council,
+        data.council_index['project_values'])
 
-    fig_bar = generate_bar_graph(df_project_distribution_value)
+    fig_bar = generate_bar_graph(
+        df_project_distribution_value,
+        {'council': council if tab == 'council_view' else None})
 
     return fig_bar
 
@@ -25,10 +33,7 @@ def clean_data(df: pd.DataFrame):
     # Filter off rows with non int Project value
     df_project_distribution_value = df[
         ~(df["Project Value"].apply(
-            lambda x: isinstance(x, str)))]
-
-    df_project_distribution_value["Project Value"] = (
-        df_project_distribution_value["Project Value"].astype(int))
+            lambda x: isinstance(x, str)))].astype({"Project Value": int})
 
     df_project_distribution_value = (
         df_project_distribution_value.sort_values(
@@ -37,70 +42,211 @@ def clean_data(df: pd.DataFrame):
     return df_project_distribution_value
 
 
-def generate_bar_graph(df):
+def generate_bar_graph(df, view: dict = None):
+    """
+    One bar per project, or value bins above config.lod_threshold projects
+    :param df: pd.DataFrame, projects sorted by value
+    :param view: dict, the value 'range' and 'council' shown, kept in the
+        figure so zooming in can fetch finer detail
+    :return: dict, figure spec
+    """
+    if len(df) > config.lod_threshold:
+        return generate_binned_bar_graph(df, view)
+
     max_value = len(set(df['Project Name']))
     fig_height = max(1100, max_value * 40)
 
-    fig_bar = px.bar(
+    fig_bar = figure_specs.bar(
         df,
         x="Project Value",
         y="Project Name",
         height=fig_height,
         title="Project Value Distribution",
-        color_discrete_sequence=[config.primary_color] * len(df)
+        colors=[config.primary_color]
     )
 
-    fig_bar.update_layout(
-        yaxis=dict(
-            tickvals=df['Project Name'],
-            ticktext=[wrap_label(label) for label in df['Project Name']]
-        ))
-
-    return fig_bar
-
-
-def wrap_label(label):
-    words = label.split()
-    wrapped = []
-
-    for i in range(0, len(words), 7):
-        wrapped.append(' '.join(words[i:i + 7]))
-
-    return '<br>'.join(wrapped)
+    fig_bar['layout']['yaxis'].update(
+        tickvals=df['Project Name'].tolist(),
+        ticktext=[wrap_label(label) for label in df['Project Name']]
+    )
 
+    # Zoomed in charts remember the range to reset to
+    if view and 'zoom' in view:
+        fig_bar['layout']['meta'] = view
 
-def update_dash3_visuals_func(df, council):
-    df_project_distribution_value = clean_data(df.copy())
+    return fig_bar
 
-    df_project_distribution_value = distinguish_data(
-        'council_view', df_project_distribution_value, council)
 
-    fig_bar = generate_bar_graph(df_project_distribution_value)
+def generate_binned_bar_graph(df, view: dict = None):
+    """
+    Projects grouped into value bins of equal project count, one bar per
+    bin showing its mean value
+    :param df: pd.DataFrame, projects sorted by value
+    :param view: dict, see generate_bar_graph
+    :return: dict, figure spec
+    """
+    values = df['Project Value'].to_numpy()
+    bins = equal_count_bins(values, config.lod_bins)
+    labels = bin_labels(bins['low'], bins['high'], bins['count'])
+
+    view = {'range': [int(values[0]), int(values[-1])], 'council': None,
+            **(view or {}), 'binned': True}
+
+    fig_bar = figure_specs.figure([{
+        'customdata': np.column_stack(
+            [bins['low'], bins['high'], bins['count']]),
+        'hovertemplate': '%{customdata[2]} projects valued %{customdata[0]}'
+                         ' - %{customdata[1]}<br>Mean value %{x}'
+                         '<extra></extra>',
+        'marker': {'color': config.primary_color},
+        'orientation': 'h',
+        'x': bins['mean'],
+        'y': np.arange(len(labels)),
+        'type': 'bar',
+    }], {
+        'title': {'text': binned_title(len(df), len(labels))},
+        'height': max(1100, len(labels) * 40),
+        'xaxis': {'title': {'text': 'Mean Project Value'}},
+        'yaxis': {'title': {'text': 'Project Value Range'},
+                  'tickvals': list(range(len(labels))), 'ticktext': labels},
+        'meta': view,
+    })
 
     return fig_bar
 
 
-def get_max_project_value(df):
-    df = df.droplevel(level=[0, 1], axis=1)
-    df = df.iloc[:, :3]
-    df = df.fillna(0)
+def bin_labels(lows, highs, counts) -> list:
+    return [f"{format_value(low)} - {format_value(high)} ({count} projects)"
+            for low, high, count in zip(lows, highs, counts)]
 
-    df_project_distribution_value = df[
-        ~(df["Project Value"].apply(
-            lambda x: isinstance(x, str)))]
 
-    df_project_distribution_value.loc[:, "Project Value"] = (
-        df_project_distribution_value["Project Value"].astype(int))
-    return max(list(df_project_distribution_value['Project Value']))
+def binned_title(projects: int, bins: int) -> str:
+    return (f"Project Value Distribution ({projects} projects in {bins} "
+            f"bins, zoom in for detail)")
 
 
-def update_project_value_overview_fig(df, slider_value):
-    df_project_distribution_value = clean_data(df)
+def wrap_label(label):
+    words = label.split()
+    wrapped = []
 
-    df_project_distribution_value = df_project_distribution_value[
-        (df_project_distribution_value['Project Value'] >= slider_value[0]) &
-        (df_project_distribution_value['Project Value'] <= slider_value[1])]
+    for i in range(0, len(words), 7):
+        wrapped.append(' '.join(words[i:i + 7]))
 
-    return generate_bar_graph(df_project_distribution_value)
+    return '<br>'.join(wrapped)
 
 
+def generate_value_slider_store(data) -> dict:
+    """
+    Everything the browser needs to redraw the overview chart for any
+    slider range: the value-sorted project names and values, their wrapped
+    tick labels and the figure without its data arrays. Only sent for up to
+    config.lod_threshold projects, so the chart is never binned.
+    :param data: ProjectData
+    :return: dict
+    """
+    df = data.project_values
+
+    figure = generate_bar_graph(df.iloc[:1])
+    del figure['data'][0]['x'], figure['data'][0]['y']
+    del figure['layout']['yaxis']['tickvals']
+    del figure['layout']['yaxis']['ticktext']
+
+    return {
+        'version': data.version,
+        'names': df['Project Name'].tolist(),
+        'values': df['Project Value'].tolist(),
+        'ticktext': [wrap_label(label) for label in df['Project Name']],
+        'figure': figure,
+    }
+
+
+def update_project_value_overview_fig(data, slider_value):
+    df_project_distribution_value = data.project_value_index.range(
+        slider_value[0], slider_value[1])
+
+    return generate_bar_graph(
+        df_project_distribution_value,
+        {'range': list(slider_value), 'council': None})
+
+
+def project_value_overview_patch(data, slider_value):
+    """
+    The overview chart for a slider range as a Patch of the chart already
+    in the browser. Only the traces and the layout properties that depend
+    on the range are sent, whether the chart is binned or not.
+    :param data: ProjectData
+    :param slider_value: list, low and high value
+    :return: Patch and the chart's project_value_view
+    """
+    fig_bar = update_project_value_overview_fig(data, slider_value)
+
+    # Binned charts keep the range in meta, a chart of projects has none
+    return (encoded_figures.patch(fig_bar,
+                                  layout_keys=('meta', 'legend', 'barmode')),
+            project_value_view(fig_bar))
+
+
+def project_value_view(figure: dict) -> dict:
+    """
+    What zooming into a project value chart needs to know of it, kept in a
+    store beside the chart so the figure is never sent back: the view in
+    its meta and the value range of each bin when it is binned
+    :param figure: dict, figure spec
+    :return: dict
+    """
+    view = figure['layout'].get('meta') or {}
+    bins = []
+    if view.get('binned'):
+        bins = figure['data'][0]['customdata'][:, :2].tolist()
+
+    return {'view': view, 'bins': bins}
+
+
+def project_value_zoom(relayout: dict, store: dict):
+    """
+    Value range to redraw after the user zooms or resets a binned project
+    value chart, None when the chart already has the detail
+    :param relayout: dict, relayoutData of the chart
+    :param store: dict, the chart's project_value_view
+    :return: tuple of low, high and the view to keep, or None
+    """
+    view = (store or {}).get('view') or {}
+    if not relayout or 'range' not in view:
+        return None
+
+    if relayout.get('yaxis.autorange') or relayout.get('xaxis.autorange'):
+        if 'zoom' not in view:
+            return None
+        low, high = view['range']
+        return low, high, {'range': view['range'],
+                           'council': view['council']}
+
+    if not view.get('binned') or 'yaxis.range[0]' not in relayout:
+        return None
+
+    # Bars sit on integer positions and are 0.8 wide
+    bins = store['bins']
+    first = max(0, math.ceil(relayout['yaxis.range[0]'] - 0.4))
+    last = min(len(bins) - 1, math.floor(relayout['yaxis.range[1]'] + 0.4))
+    if first > last:
+        return None
+
+    low, high = bins[first][0], bins[last][1]
+    return low, high, {'range': view['range'], 'council': view['council'],
+                       'zoom': [low, high]}
+
+
+def update_project_value_zoom_fig(data, low, high, view):
+    if view['council'] is None:
+        df_project_distribution_value = data.project_value_index.range(
+            low, high)
+    else:
+        # The council's rows are in value order too, so those in the range
+        # are one slice of them
+        start, end = data.project_value_index.positions(low, high)
+        rows = np.asarray(data.council_index['project_values'].get(
+            view['council'], []), dtype='int64')
+        df_project_distribution_value = data.project_values.iloc[
+            rows[np.searchsorted(rows, start):np.searchsorted(rows, end)]]
+
+    return generate_bar_graph(df_project_distribution_value, view)
@@ -1,50 +1,76 @@
 import pandas as pd
-import plotly.express as px
 
 from assets.config import Config
+from src import figure_specs
+from src.level_of_detail import others_title, others_view, \
+    top_n_with_others
 from src.load_data import distinguish_data
 
 config = Config()
 
 
-def generate_project_theme_distribution_visualisation(df: pd.DataFrame, tab: str):
-    df_cleaned = clean_data(df)
-    df_council_project_theme = distinguish_data(tab, df_cleaned)
+def generate_project_theme_distribution_visualisation(
+        data, tab: str, council: str = config.default_council):
+    df_council_project_theme = distinguish_data(
+        tab, data.themes, council, data.council_index['themes'])
 
     fig = generate_bar_graph(df_council_project_theme, tab)
 
     return fig
 
 
-def generate_bar_graph(df, tab):
+def generate_bar_graph(df, tab, skip: int = 0):
+    """
+    Theme count of each council, or of one council's themes. Above
+    config.lod_threshold councils the overview keeps the top
+    config.lod_top_n and 'Others'.
+    :param df: pd.DataFrame, theme counts per council
+    :param tab: str
+    :param skip: int, councils with the most projects left out, set when
+        zoomed into 'Others'
+    :return: dict, figure spec
+    """
+    view = None
     if tab == 'overview':
+        if df['Organisations'].nunique() > config.lod_threshold:
+            df = top_n_with_others(df, 'Organisations', 'Theme count',
+                                   config.lod_top_n, keys=('Theme',),
+                                   skip=skip)
+            view = others_view(df, 'Organisations', config.lod_top_n, skip)
+
         max_value = len(set(df['Organisations']))
         fig_height = max(600, max_value * 40)
 
-        fig = px.bar(
+        fig = figure_specs.bar(
             df,
             x="Theme count",
             y="Organisations",
             color="Theme",
-            title="Theme Count Per Council",
+            title=others_title("Theme Count Per Council", skip),
             height=fig_height
         )
+        if view:
+            fig['layout']['meta'] = view
 
     else:
         max_value = len(set(df['Theme count']))
         fig_height = max(600, max_value * 40)
 
-        fig = px.bar(
+        fig = figure_specs.bar(
             df,
             x="Theme",
             y="Theme count",
             title="Council Projects Theme Distribution",
             height=fig_height,
-            color_discrete_sequence=[config.primary_color] * len(df)
+            colors=[config.primary_color]
         )
     return fig
 
 
+def update_project_theme_zoom_fig(data, skip: int):
+    return generate_bar_graph(data.themes, 'overview', skip)
+
+
 def clean_data(df: pd.DataFrame):
     df_council_project_theme = df.droplevel(level=[0, 1], axis=1)
 
@@ -61,20 +87,12 @@ def clean_data(df: pd.DataFrame):
         'retrofit ': "Retrofit"
     }
 
-    df_council_project_theme['Theme'] = df_council_project_theme[
-        'Theme'].apply(lambda x: theme_mapping[x] if x in theme_mapping else x)
-
-    df_council_project_theme['Theme count'] = \
-        df_council_project_theme.groupby(['Organisations', 'Theme'])[
-            'Theme'].transform('count')
-
-    return df_council_project_theme.drop_duplicates()
+    df_council_project_theme = df_council_project_theme.assign(
+        Theme=df_council_project_theme['Theme'].apply(
+            lambda x: theme_mapping[x] if x in theme_mapping else x))
 
-
-def update_dash4_visuals_func(df, council):
-    df_cleaned = clean_data(df)
-    df_council_project_theme = distinguish_data("council_view", df_cleaned, council)
-
-    fig = generate_bar_graph(df_council_project_theme, "council_view")
-
-    return fig
+    return df_council_project_theme.assign(**{
+        'Theme count': df_council_project_theme.groupby(
+            ['Organisations', 'Theme'], observed=True)['Theme'].transform(
+            'count')
+    }).drop_duplicates()
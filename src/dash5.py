@@ -1,47 +1,38 @@
 import pandas as pd
-from dash import html
-import plotly.graph_objects as go
-import plotly.express as px
 import dash_bootstrap_components as dbc
 from dash import html
 from dash.dash_table import DataTable
 
 from assets.config import Config
 from src.load_data import distinguish_data
+from src.table_query import table_props, with_classification_filter
 
 config = Config()
 
 
-def generate_project_deep_dive_visualisation(df: pd.DataFrame, tab):
-    df_clean = clean_data(df)
-    df_all = distinguish_data(tab, df_clean)
-    table_fig = generate_table_data(df_all)
+def generate_project_deep_dive_visualisation(
+        data, tab, council: str = config.default_council):
+    df_all = distinguish_data(
+        tab, data.project_table(), council, data.council_index['projects'])
+    table_fig = generate_table_data(df_all, tab, council,
+                                    data.classification_flags.names)
 
     return table_fig
 
 
 def clean_data(df):
-    df.columns = df.columns.droplevel(0)
-    df.columns = df.columns.droplevel(0)
-
-    return df
+    return df.droplevel(level=[0, 1], axis=1)
 
 
-def generate_table_data(df: pd.DataFrame) -> DataTable:
+def generate_table_data(df: pd.DataFrame, tab: str = 'overview',
+                        council: str = config.default_council,
+                        classifications: tuple = ()):
     table = DataTable(
         columns=[{"name": col, "id": col} for col in df.columns[1:]],
-        data=df.to_dict('records'),
+        **table_props(df, 20, tab, council),
         page_size=20,
         style_table={'overflowX': 'auto'},
         style_cell={'textAlign': 'left'},
         style_header={'fontWeight': 'bold'},
     )
-    return table
-
-
-def update_dash5_visuals_func(df, council):
-    df_clean = clean_data(df)
-    df_all = distinguish_data('council_view', df_clean, council)
-    table_fig = generate_table_data(df_all)
-
-    return table_fig
+    return with_classification_filter(table, classifications, tab, council)
@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+import warnings
+
+from assets.config import Config
+from src.load_data import preprocess_data
+
+config = Config()
+
+
+class DataStore:
+    """
+    Holds the current ProjectData for a set of workbooks. Reloads build a new
+    model off the request path and publish it with a single reference swap,
+    so a callback that reads current() once keeps a consistent view
+    throughout. Only the workbooks that changed are parsed again.
+    """
+
+    def __init__(self, paths, interval: float = config.reload_interval):
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.interval = interval
+
+        self._reload_lock = threading.Lock()
+        self._signature = self._file_signature()
+        self._data = preprocess_data(self.paths,
+                                     version=data_version(self._signature))
+        self._watcher = None
+        self._listeners = []
+
+    @property
+    def version(self) -> int:
+        return self._data.version
+
+    def current(self):
+        """
+        Latest published model. Never blocks on a reload in progress.
+        :return: ProjectData
+        """
+        return self._data
+
+    def reload(self):
+        """
+        Re-reads the workbooks and swaps in the new model
+        :return: ProjectData
+        """
+        with self._reload_lock:
+            signature = self._file_signature()
+            data = preprocess_data(self.paths,
+                                   version=data_version(signature))
+
+            self._signature = signature
+            self._data = data
+
+        for listener in self._listeners:
+            listener(data)
+
+        return data
+
+    def add_listener(self, listener):
+        """
+        Calls listener(data) after every successful reload
+        :param listener: callable taking the new ProjectData
+        """
+        self._listeners.append(listener)
+
+    def start_watching(self):
+        """
+        Starts a daemon thread polling the workbooks for changes
+        """
+        if self._watcher is not None:
+            return
+
+        self._watcher = threading.Thread(
+            target=self._watch, name='workbook-watcher', daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        pending = None
+
+        while True:
+            time.sleep(self.interval)
+
+            try:
+                signature = self._file_signature()
+            except OSError:
+                # Workbook is being replaced, check again on the next poll
+                continue
+
+            if signature == self._signature:
+                pending = None
+                continue
+
+            # Wait for the file to settle so a half-written save is not read
+            if signature != pending:
+                pending = signature
+                continue
+
+            try:
+                self.reload()
+            except Exception as e:
+                warnings.warn(f"Keeping data version {self.version}, "
+                              f"reload of {', '.join(self.paths)} failed: {e}")
+                self._signature = signature
+            pending = None
+
+    def _file_signature(self):
+        return tuple((stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+                     for stat in map(os.stat, self.paths))
+
+
+def data_version(signature: tuple) -> int:
+    """
+    Version of the data read from workbooks with this signature, the time of
+    the latest change to any of them in milliseconds. Every process reading
+    the same files derives the same version, e.g. a recycled worker and the
+    ones it runs beside. The system sets a file's ctime on every write,
+    rename or copy, so the version never goes back, not even when an older
+    workbook is restored.
+    :param signature: tuple of (size, mtime_ns, ctime_ns), one per workbook
+    :return: int
+    """
+    return max(ctime_ns for _, _, ctime_ns in signature) // 1_000_000
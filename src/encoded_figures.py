@@ -0,0 +1,154 @@
+import re
+import uuid
+import weakref
+from functools import wraps
+
+import orjson
+from dash import Patch
+from dash.development.base_component import Component
+from flask import g
+
+from assets.config import Config
+
+config = Config()
+
+PLACEHOLDER = '__encoded_figure__:'
+
+_PATTERN = re.compile(rb'"__encoded_figure__:([0-9a-f]{32})"')
+
+
+class EncodedFigure(str):
+    """
+    A figure serialized ahead of time. Dash writes it into the response
+    as a placeholder string, which is swapped for the stored JSON before
+    the response is sent.
+    """
+    payload: bytes
+
+    def __reduce__(self):
+        # Figures built in a pool process are registered where unpickled
+        return _restore, (str(self), self.payload)
+
+
+class EncodedFigures:
+    """
+    Encodes figure specs once so cached callback outputs are never
+    serialized again
+    """
+
+    def __init__(self, enabled: bool = config.encoded_figures):
+        self.enabled = enabled
+        self._figures = weakref.WeakValueDictionary()
+
+    def encode(self, figure: dict):
+        """
+        :param figure: dict, figure spec, may hold numpy arrays
+        :return: EncodedFigure, or the spec itself when disabled
+        """
+        if not self.enabled or figure is None:
+            return figure
+
+        key = uuid.uuid4().hex
+        encoded = EncodedFigure(PLACEHOLDER + key)
+        encoded.payload = orjson.dumps(figure,
+                                       option=orjson.OPT_SERIALIZE_NUMPY)
+        self._figures[key] = encoded
+
+        return encoded
+
+    def patch(self, figure: dict, layout_keys: tuple = ()) -> Patch:
+        """
+        Patch turning a chart in the browser into figure, with the traces
+        encoded and every layout property but the template, which is never
+        sent again
+        :param figure: dict, figure spec
+        :param layout_keys: tuple, layout properties the chart may have that
+        are removed when figure does not set them
+        :return: Patch
+        """
+        patch = Patch()
+        patch['data'] = self.encode(figure['data'])
+        for key, value in figure['layout'].items():
+            if key != 'template':
+                patch['layout'][key] = value
+        for key in layout_keys:
+            if key not in figure['layout']:
+                del patch['layout'][key]
+
+        return patch
+
+    def callback(self, func):
+        """
+        Decorator for callbacks that may return encoded figures. Collects
+        the figures in the output, which keeps them alive until the
+        response has been expanded and limits the expansion to them.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            output = func(*args, **kwargs)
+            if self.enabled:
+                g.encoded_figures = {
+                    encoded[len(PLACEHOLDER):]: encoded
+                    for encoded in _encoded_in(output)}
+            return output
+
+        return wrapper
+
+    def expand(self, body: bytes, figures: dict = None) -> bytes:
+        """
+        Replaces the placeholders in a serialized callback response. Other
+        strings that look like one, e.g. a value sent by the client and
+        echoed back, are left as they are.
+        :param body: bytes
+        :param figures: dict, key -> EncodedFigure of the placeholders to
+        replace, every live figure when not given
+        :return: bytes
+        """
+        figures = self._figures if figures is None else figures
+
+        def substitute(match):
+            encoded = figures.get(match[1].decode())
+            return match[0] if encoded is None else encoded.payload
+
+        return _PATTERN.sub(substitute, body)
+
+    def init_app(self, server):
+        """
+        Expands encoded figures in callback responses. Register after any
+        other after_request hook that reads the response body.
+        :param server: flask.Flask
+        """
+        @server.after_request
+        def expand_encoded_figures(response):
+            if g.get('encoded_figures') and response.status_code == 200:
+                response.set_data(self.expand(response.get_data(),
+                                              g.encoded_figures))
+            return response
+
+
+encoded_figures = EncodedFigures()
+
+
+def _encoded_in(value):
+    """
+    Encoded figures anywhere in a callback output, including the props of
+    its components and the values of a Patch
+    """
+    if isinstance(value, EncodedFigure):
+        yield value
+    elif isinstance(value, (Component, Patch)):
+        yield from _encoded_in(value.to_plotly_json())
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _encoded_in(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _encoded_in(item)
+
+
+def _restore(placeholder: str, payload: bytes) -> EncodedFigure:
+    encoded = EncodedFigure(placeholder)
+    encoded.payload = payload
+    encoded_figures._figures[placeholder[len(PLACEHOLDER):]] = encoded
+
+    return encoded
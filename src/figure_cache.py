@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+
+from assets.config import Config
+
+config = Config()
+
+
+class Uncached(Exception):
+    """
+    Raised by a build to hand back an output that must not be cached, such
+    as a stale or degraded figure served while the real one is still built
+    """
+
+    def __init__(self, output):
+        super().__init__()
+        self.output = output
+
+
+class FigureCache:
+    """
+    Bounded LRU cache of dashboard outputs. Keys include the data version,
+    and the cache empties itself the first time it sees a newer version.
+    """
+
+    def __init__(self, maxsize: int = config.figure_cache_size):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def call(self, func, data, *args):
+        """
+        Returns func(data, *args), built at most once per data version
+        :param func: dashboard function taking the ProjectData first
+        :param data: ProjectData
+        :param args: hashable inputs, lists are converted to tuples
+        :return: output of func
+        """
+        key = cache_key(func, args)
+
+        with self._lock:
+            if self._version is None or data.version > self._version:
+                self._entries.clear()
+                self._version = data.version
+
+            if data.version == self._version and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            self.misses += 1
+
+        # Built outside the lock so other keys are not blocked meanwhile
+        try:
+            result = func(data, *args)
+        except Uncached as e:
+            return e.output
+
+        with self._lock:
+            # Requests still holding an older snapshot are not cached
+            if data.version == self._version:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'version': self._version,
+            }
+
+
+def cache_key(func, args: tuple) -> tuple:
+    """
+    Hashable key for func called with args
+    :param func: function
+    :param args: tuple, lists and dicts are converted to tuples
+    :return: tuple
+    """
+    return func.__module__, func.__qualname__, _freeze(args)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
@@ -0,0 +1,229 @@
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial, wraps
+
+from assets.config import Config
+from src.figure_cache import Uncached, cache_key
+
+config = Config()
+
+# ProjectData the pool processes build from, inherited when they are forked
+_data = None
+
+
+def _set_data(data):
+    global _data
+    _data = data
+
+
+def _build(func, args: tuple):
+    return func(_data, *args)
+
+
+def _ready():
+    pass
+
+
+class FigurePool:
+    """
+    Bounded pool of processes forked from the worker that build dashboard
+    outputs off the request thread. The processes read the ProjectData they
+    were forked with, so only the inputs and outputs are pickled, and a new
+    pool is forked for each data version. Identical concurrent requests
+    share one build.
+
+    Pools are forked from a dedicated thread, never a request thread, so
+    the processes do not inherit a request context. Only that thread
+    survives the fork, and the processes only run _build on the data, so
+    they never wait on a lock another thread of the worker held when it was
+    forked. Functions built in the pool must keep to that: no logging,
+    printing or locks of their own.
+    """
+
+    def __init__(self, processes: int = config.figure_pool_processes,
+                 timeout: float = config.figure_pool_timeout,
+                 maxsize: int = config.figure_cache_size):
+        self.processes = processes
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self.builds = 0
+        self.shared = 0
+        self.timeouts = 0
+
+        self._executor = None
+        self._version = None
+        # Process the executor belongs to, a forked worker starts its own
+        self._pid = None
+        self._forking = None
+        self._pending = {}
+        # Latest output per input, kept across versions for timeouts
+        self._outputs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def offload(self, func, fallback=None):
+        """
+        Wraps a dashboard function taking the ProjectData first to build in
+        the pool, for use through FigureCache.call
+        :param func: module level function, pickled by reference
+        :param fallback: function with the same arguments building a
+        degraded output in the request thread
+        :return: function
+        """
+        @wraps(func)
+        def wrapper(data, *args):
+            return self.call(func, data, *args, fallback=fallback)
+
+        return wrapper
+
+    def call(self, func, data, *args, fallback=None):
+        """
+        Returns func(data, *args) built in a pool process. When that takes
+        longer than timeout, the last output for the same inputs from an
+        earlier data version is raised as Uncached, or failing that
+        fallback(data, *args). The build carries on and its output is
+        returned to the next request.
+        :param func: module level function, pickled by reference
+        :param data: ProjectData
+        :param args: picklable inputs
+        :param fallback: function building a degraded output
+        :return: output of func
+        """
+        if not self.processes:
+            return func(data, *args)
+
+        key = cache_key(func, args)
+
+        with self._lock:
+            version, output = self._outputs.get(key, (None, None))
+            if version == data.version:
+                self._outputs.move_to_end(key)
+                return output
+
+            executor = self._executor_for(data)
+            if executor is not None:
+                future = self._pending.get((data.version, key))
+                submitted = future is None
+                if submitted:
+                    future = executor.submit(_build, func, args)
+                    self._pending[(data.version, key)] = future
+                    self.builds += 1
+                else:
+                    self.shared += 1
+
+        if executor is None:
+            # The pool holds other data, or is still being forked. Build
+            # here rather than from data the version key does not match.
+            return func(data, *args)
+
+        if submitted:
+            # Runs straight away if the build already failed, so not under
+            # the lock
+            future.add_done_callback(
+                partial(self._finished, data.version, key))
+
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            pass
+        except BrokenProcessPool:
+            # A pool process died, e.g. killed for memory. Fork a new pool
+            # next time and build this one here.
+            with self._lock:
+                if self._version == data.version:
+                    self._executor = None
+            return func(data, *args)
+
+        with self._lock:
+            self.timeouts += 1
+
+        if output is not None:
+            raise Uncached(output)
+        if fallback is not None:
+            raise Uncached(fallback(data, *args))
+
+        return future.result()
+
+    def clear(self):
+        with self._lock:
+            self._outputs.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'processes': self.processes,
+                'builds': self.builds,
+                'shared': self.shared,
+                'timeouts': self.timeouts,
+                'pending': len(self._pending),
+                'version': self._version,
+            }
+
+    def _executor_for(self, data):
+        """
+        The pool forked with data, or None when there is none yet. A pool is
+        then forked in the background for newer data. Call under the lock.
+        :param data: ProjectData
+        :return: ProcessPoolExecutor or None
+        """
+        current = self._executor is not None and self._pid == os.getpid()
+        if current and data.version == self._version:
+            return self._executor
+
+        if (not current or data.version > self._version) and (
+                self._forking is None or data.version > self._forking):
+            self._forking = data.version
+            threading.Thread(target=self._fork, args=(data,),
+                             name='figure-pool-fork', daemon=True).start()
+
+        return None
+
+    def _fork(self, data):
+        executor = ProcessPoolExecutor(
+            self.processes,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_set_data, initargs=(data,))
+        # The first submit forks every process, here rather than in the
+        # request thread that submits next
+        try:
+            executor.submit(_ready).result()
+        except BrokenProcessPool:
+            executor.shutdown(wait=False)
+            executor = None
+
+        with self._lock:
+            if self._forking == data.version:
+                self._forking = None
+            if self._pid != os.getpid():
+                # Inherited from the process this worker was forked from
+                self._executor = None
+            if executor is not None and (self._executor is None
+                                         or data.version > self._version):
+                executor, self._executor = self._executor, executor
+                self._version, self._pid = data.version, os.getpid()
+
+        if executor is not None:
+            # The pool replaced, or this one when a newer one was forked
+            # first. Builds already queued finish in the old processes.
+            executor.shutdown(wait=False)
+
+    def _finished(self, version: int, key: tuple, future):
+        with self._lock:
+            self._pending.pop((version, key), None)
+            if future.cancelled() or future.exception() is not None:
+                return
+
+            previous = self._outputs.get(key, (None, None))[0]
+            if previous is None or version >= previous:
+                self._outputs[key] = (version, future.result())
+                self._outputs.move_to_end(key)
+
+            while len(self._outputs) > self.maxsize:
+                self._outputs.popitem(last=False)
+
+
+figure_pool = FigurePool(config.figure_pool_processes
+                         if config.figure_pool else 0)
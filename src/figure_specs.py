@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+# Same template plotly.express and go.Figure apply, built once
+TEMPLATE = pio.templates[pio.templates.default].to_plotly_json()
+
+
+def figure(data: list, layout: dict) -> dict:
+    """
+    Figure spec with the default template, ready for JSON encoding
+    :param data: list of trace dicts
+    :param layout: dict
+    :return: dict
+    """
+    return {'data': data, 'layout': {'template': TEMPLATE, **layout}}
+
+
+def bar(df: pd.DataFrame, x: str, y: str, title: str, height: int,
+        color: str = None, colors: list = None) -> dict:
+    """
+    Bar chart spec matching plotly.express.bar, built straight from the
+    columns of df
+    :param df: pd.DataFrame
+    :param x: str, column on the x axis
+    :param y: str, column on the y axis
+    :param title: str
+    :param height: int
+    :param color: str, column splitting the bars into one trace per value
+    :param colors: list, trace colours, the template colorway by default
+    :return: dict
+    """
+    colors = colors or TEMPLATE['layout']['colorway']
+
+    # Horizontal when the values are on x, like plotly.express
+    orientation = 'h' if _is_numeric(df[x]) and not _is_numeric(df[y]) \
+        else 'v'
+
+    if color is None:
+        groups = {'': slice(None)}
+    else:
+        groups = df.groupby(color, sort=False, observed=True).indices
+
+    data = []
+    for i, (name, positions) in enumerate(groups.items()):
+        rows = df.iloc[positions]
+        hovertemplate = f'{x}=%{{x}}<br>{y}=%{{y}}<extra></extra>'
+        if color is not None:
+            hovertemplate = f'{color}={name}<br>{hovertemplate}'
+
+        data.append({
+            'alignmentgroup': 'True',
+            'hovertemplate': hovertemplate,
+            'legendgroup': name,
+            'marker': {'color': colors[i % len(colors)],
+                       'pattern': {'shape': ''}},
+            'name': name,
+            'offsetgroup': name,
+            'orientation': orientation,
+            'showlegend': color is not None,
+            'textposition': 'auto',
+            'x': values(rows[x]),
+            'xaxis': 'x',
+            'y': values(rows[y]),
+            'yaxis': 'y',
+            'type': 'bar',
+        })
+
+    legend = {'tracegroupgap': 0}
+    if color is not None:
+        legend = {'title': {'text': color}, **legend}
+
+    return figure(data, {
+        'xaxis': {'anchor': 'y', 'domain': [0.0, 1.0],
+                  'title': {'text': x}},
+        'yaxis': {'anchor': 'x', 'domain': [0.0, 1.0],
+                  'title': {'text': y}},
+        'legend': legend,
+        'title': {'text': title},
+        'barmode': 'relative',
+        'height': height,
+    })
+
+
+def sunburst(labels: list, parents: list, values: list = None,
+             **layout) -> dict:
+    """
+    Sunburst spec matching go.Figure(go.Sunburst(..., branchvalues='total'))
+    :param labels: list
+    :param parents: list
+    :param values: list, leaf counts when given
+    :param layout: layout properties
+    :return: dict
+    """
+    trace = {'branchvalues': 'total', 'labels': labels, 'parents': parents}
+    if values is not None:
+        trace['values'] = values
+    trace['type'] = 'sunburst'
+
+    return figure([trace], layout)
+
+
+def values(series: pd.Series):
+    """
+    Column values for a trace, numbers as a numpy array the encoder
+    writes directly, anything else as a list
+    :param series: pd.Series
+    :return: np.ndarray or list
+    """
+    if _is_numeric(series):
+        return np.ascontiguousarray(series.to_numpy())
+    return series.tolist()
+
+
+def _is_numeric(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series) and \
+        not pd.api.types.is_bool_dtype(series)
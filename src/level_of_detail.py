@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+
+def top_n_with_others(df: pd.DataFrame, label: str, value: str, n: int,
+                      keys: tuple = (), noun: str = 'councils',
+                      skip: int = 0):
+    """
+    Keeps the rows of the n labels with the largest total value and sums
+    the rest into one 'Others' label, placed first
+    :param df: pd.DataFrame
+    :param label: str, column holding the bar labels
+    :param value: str, column summed into the Others rows
+    :param n: int, number of labels kept
+    :param keys: tuple of columns the Others rows are split by
+    :param noun: str, what the labels are, used in the Others label
+    :param skip: int, number of the largest labels left out, those shown
+        before zooming into Others
+    :return: pd.DataFrame
+    """
+    totals = df.groupby(label, sort=False, observed=True)[value].sum()
+    if len(totals) <= n and not skip:
+        return df
+
+    ranked = totals.sort_values(ascending=False, kind='stable').index
+    keep = df[label].isin(ranked[skip:skip + n])
+    if len(ranked) <= skip + n:
+        return df[keep]
+
+    rest = df[df[label].isin(ranked[skip + n:])]
+
+    if keys:
+        others = rest.groupby(list(keys), sort=False, observed=True,
+                              as_index=False)[value].sum()
+    else:
+        others = pd.DataFrame({value: [rest[value].sum()]})
+    others[label] = f"Others ({len(ranked) - skip - n} {noun})"
+
+    return pd.concat([others[df.columns], df[keep]], ignore_index=True)
+
+
+def others_view(df: pd.DataFrame, label: str, n: int, skip: int) -> dict:
+    """
+    What zooming into a chart of top_n_with_others(df, ..., n, skip=skip)
+    needs to know of it, kept in the figure's meta and a store beside it
+    :param df: pd.DataFrame, the rows charted
+    :param label: str, column holding the bar labels
+    :param n: int
+    :param skip: int
+    :return: dict
+    """
+    others = len(df) > 0 and str(df[label].iloc[0]).startswith('Others (')
+    return {'top_n': n, 'skip': skip, 'others': bool(others)}
+
+
+def others_title(title: str, skip: int, noun: str = 'councils') -> str:
+    if not skip:
+        return title
+    return f"{title} (below the top {skip} {noun}, double-click for all)"
+
+
+def others_zoom(relayout: dict, view: dict):
+    """
+    Labels to skip after the user zooms into the Others bar of a chart or
+    resets it, None when the chart already has the detail
+    :param relayout: dict, relayoutData of the chart
+    :param view: dict, the chart's others_view
+    :return: int or None
+    """
+    if not relayout or not view:
+        return None
+
+    if relayout.get('yaxis.autorange') or relayout.get('xaxis.autorange'):
+        return 0 if view['skip'] else None
+
+    if not view['others'] or 'yaxis.range[0]' not in relayout:
+        return None
+
+    # Others is the first bar, at position 0 and 0.8 wide
+    if min(relayout['yaxis.range[0]'], relayout['yaxis.range[1]']) > 0.4:
+        return None
+
+    return view['skip'] + view['top_n']
+
+
+def equal_count_bins(values: np.ndarray, bins: int) -> dict:
+    """
+    Splits sorted values into bins holding the same number of values
+    (differing by at most one)
+    :param values: np.ndarray of ints, sorted ascending
+    :param bins: int, at most this many bins
+    :return: dict of 'low', 'high', 'count' and 'mean' arrays
+    """
+    values = np.asarray(values, dtype='int64')
+    bins = min(bins, len(values))
+    edges = (np.arange(bins + 1) * len(values)) // bins
+
+    starts, ends = edges[:-1], edges[1:]
+    counts = ends - starts
+    sums = np.add.reduceat(values, starts) if bins else values[:0]
+
+    return {
+        'low': values[starts],
+        'high': values[ends - 1],
+        'count': counts,
+        # Integer mean so the browser computes the same bars
+        'mean': sums // np.maximum(counts, 1),
+    }
+
+
+def format_value(value) -> str:
+    # Integer rounding so the browser formats the same labels
+    value = int(value)
+    if value >= 1_000_000:
+        tenths = (value + 50_000) // 100_000
+        return f"{tenths // 10}.{tenths % 10}m"
+    if value >= 1_000:
+        return f"{value // 1_000}k"
+    return str(value)
@@ -1,10 +1,65 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 from assets.config import Config
+import numpy as np
 import pandas as pd
 
+from src.metrics import metrics
+from src.snapshot_cache import decode_snapshot, load_model, load_snapshot, \
+    map_snapshot, snapshot_hash, write_model, write_snapshot
+from src.workbook_stream import read_workbook_streaming
+
 config = Config()
 
+# The dashboards slice the shared data without copying it, copy-on-write
+# keeps writes to a slice from reaching it. Always on from pandas 3.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Tags each project with the workbook it came from when several are loaded
+SOURCE_COLUMN = ("Fast Followers member", "Unnamed: 0_level_1", "Source")
+
+# Project columns the dashboards use, the other free-text ones are only
+# shown in the project tables
+SUMMARY_COLUMNS = ('Organisations', 'Project Name', 'Project Value',
+                   'Actual or Estimated', 'Theme')
+
+
+def is_classification_column(column: tuple) -> bool:
+    return column[0] == 'Project Classification'
+
+
+def is_detail_column(column: tuple) -> bool:
+    """
+    Whether only the project tables show a workbook column's cells, the
+    free text and the classification cells. The dashboards count the
+    classifications when the data is built, not from the cells.
+    :param column: tuple, 3-level column name
+    :return: bool
+    """
+    return is_classification_column(column) or \
+        (column[-1] not in SUMMARY_COLUMNS and column != SOURCE_COLUMN)
+
+
+def is_dashboard_column(column: tuple) -> bool:
+    """
+    Whether the data is built from a workbook column, the summary and
+    classification columns
+    :param column: tuple, 3-level column name
+    :return: bool
+    """
+    return is_classification_column(column) or not is_detail_column(column)
+
+
+def read_workbook(path: str,
+                  stream: bool = config.stream_workbooks) -> pd.DataFrame:
+    if stream:
+        # Same frame, without holding every parsed cell at once
+        return read_workbook_streaming(path)
 
-def preprocess_data(path: str):
     df_raw = pd.read_excel(path, header=[0, 1, 2])
 
     df_raw[
@@ -22,10 +77,233 @@ def preprocess_data(path: str):
     return df_raw
 
 
-def distinguish_data(tab, cleaned_data, council: str = config.default_council):
+def load_workbook(path: str, use_snapshot: bool = config.snapshot_cache,
+                  select=None):
+    """
+    Reads the preprocessed workbook, from its Arrow snapshot when the
+    workbook has not changed since the snapshot was written
+    :param path: str
+    :param use_snapshot: bool
+    :param select: function taking a column name, only the columns it
+    returns True for are kept
+    :return: pd.DataFrame
+    """
+    df = load_snapshot(path, select) if use_snapshot else None
+    if df is not None:
+        return df
+
+    df = parse_workbook(path, use_snapshot)
+    if select is not None:
+        df = df[list(filter(select, df.columns))]
+
+    return df
+
+
+def parse_workbook(path: str, use_snapshot: bool = config.snapshot_cache):
+    df = read_workbook(path)
+    if use_snapshot:
+        write_snapshot(path, df)
+    return df
+
+
+def load_partitions(paths: list, use_snapshot: bool = config.snapshot_cache,
+                    processes: int = config.ingest_processes,
+                    select=None) -> list:
+    """
+    Reads every workbook, each from its own snapshot when it has one. Only
+    the workbooks that changed are parsed, in parallel when there are
+    several.
+    :param paths: list of workbook paths
+    :param use_snapshot: bool
+    :param processes: int, max number of parsing processes
+    :param select: function taking a column name, only the columns it
+    returns True for are kept
+    :return: list of pd.DataFrame, one per workbook
+    """
+    frames = [load_snapshot(path, select) if use_snapshot else None
+              for path in paths]
+    stale = [path for path, df in zip(paths, frames) if df is None]
+
+    parsed = _parse_all(partial(parse_workbook, use_snapshot=use_snapshot),
+                        stale, processes)
+
+    if select is not None:
+        parsed = [df[list(filter(select, df.columns))] for df in parsed]
+
+    parsed = iter(parsed)
+    return [next(parsed) if df is None else df for df in frames]
+
+
+def snapshot_workbook(path: str):
+    write_snapshot(path, read_workbook(path))
+
+
+def map_partitions(paths: list,
+                   processes: int = config.ingest_processes) -> list:
+    """
+    Memory-maps the snapshot of every workbook, parsing the workbooks that
+    changed first as load_partitions does
+    :param paths: list of workbook paths
+    :param processes: int, max number of parsing processes
+    :return: list of snapshots, see snapshot_cache.map_snapshot, None for a
+    workbook that could not be snapshot
+    """
+    snapshots = [map_snapshot(path) for path in paths]
+    stale = [path for path, snapshot in zip(paths, snapshots)
+             if snapshot is None]
+
+    _parse_all(snapshot_workbook, stale, processes)
+
+    return [map_snapshot(path) if snapshot is None else snapshot
+            for path, snapshot in zip(paths, snapshots)]
+
+
+def _parse_all(parse, paths: list, processes: int) -> list:
+    if len(paths) > 1 and processes > 1:
+        with ProcessPoolExecutor(
+                min(processes, len(paths)),
+                mp_context=multiprocessing.get_context('fork')) as executor:
+            return list(executor.map(parse, paths))
+
+    return [parse(path) for path in paths]
+
+
+def combine_partitions(paths: list, frames: list) -> pd.DataFrame:
+    """
+    Concatenates the workbooks into one frame with a Source column holding
+    each project's workbook name. Columns are matched by their name in the
+    bottom header row, those missing from a workbook are left empty for its
+    projects.
+    :param paths: list of workbook paths
+    :param frames: list of pd.DataFrame, one per workbook
+    :return: pd.DataFrame
+    """
+    if len(frames) == 1:
+        return frames[0]
+
+    # Blank top header cells are numbered by position, e.g. 'Unnamed:
+    # 5_level_1', so they differ between workbooks with other columns
+    columns = {}
+    for frame in frames:
+        for column in frame.columns:
+            columns.setdefault(column[-1], column)
+
+    df = pd.concat(
+        [frame.set_axis(pd.MultiIndex.from_tuples(
+            [columns[column[-1]] for column in frame.columns]), axis=1)
+         for frame in frames],
+        ignore_index=True, sort=False)
+
+    # Project details first, then the classifications, as in one workbook
+    details = [column for column in df.columns
+               if column[0] != 'Project Classification']
+    df = df[details + [column for column in df.columns
+                       if column[0] == 'Project Classification']]
+
+    df.insert(len(details), SOURCE_COLUMN, np.repeat(
+        [os.path.splitext(os.path.basename(path))[0] for path in paths],
+        [len(frame) for frame in frames]))
+
+    return df
+
+
+def load_details(snapshots: list) -> pd.DataFrame:
+    """
+    Free-text and classification cells of the workbooks, in project order
+    :param snapshots: list of the mapped snapshots the projects were built
+    from, see snapshot_cache.map_snapshot
+    :return: pd.DataFrame with the bottom header row as column names
+    """
+    frames = [decode_snapshot(snapshot, is_detail_column)
+              for snapshot in snapshots]
+    frames = [df.set_axis([column[-1] for column in df.columns], axis=1)
+              for df in frames]
+
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+
+def preprocess_data(paths, use_snapshot: bool = config.snapshot_cache,
+                    version: int = 1,
+                    use_model: bool = config.model_snapshot):
+    """
+    Reads the workbooks and builds the cleaned model used by every
+    dashboard, or loads the model snapshot when no workbook has changed
+    :param paths: str or list of workbook paths
+    :param use_snapshot: bool
+    :param version: int, data version stamped on the model
+    :param use_model: bool
+    :return: ProjectData
+    """
+    # The dashboards import this module, so the model is imported lazily
+    from src.project_data import ProjectData, ProjectDetails
+
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    lazy = use_snapshot and config.lazy_details
+
+    def lazy_details(snapshots):
+        # The project tables read the free-text columns the first time they
+        # are opened, from the same snapshots as the rest of the model even
+        # if the workbooks have changed since
+        return ProjectDetails(load=partial(load_details, snapshots))
+
+    def build():
+        # Also returns the content hashes of the workbooks the lazy data
+        # was built from
+        snapshots = map_partitions(paths) if lazy else None
+        if snapshots is None or None in snapshots:
+            # Eager, also when a workbook cannot be snapshot
+            return ProjectData.from_raw(combine_partitions(
+                paths, load_partitions(paths, use_snapshot)), version), None
+
+        # Only the columns the dashboards use are decoded now
+        frames = [decode_snapshot(snapshot, is_dashboard_column)
+                  for snapshot in snapshots]
+        data = ProjectData.from_raw(combine_partitions(paths, frames),
+                                    version, lazy_details(snapshots))
+        return data, [snapshot_hash(snapshot) for snapshot in snapshots]
+
+    if not (use_snapshot and use_model):
+        return build()[0]
+
+    # A model written with the other Config.lazy_details is rebuilt
+    model = load_model(paths)
+    if model is not None and model[1]['lazy_details'] == lazy:
+        frames, meta, content_hashes = model
+        if not lazy:
+            return ProjectData.from_snapshot(frames, meta, version)
+
+        # Rebuilt unless the snapshots of the versions of the workbooks the
+        # model was built from are still there
+        snapshots = [map_snapshot(path, content_hash)
+                     for path, content_hash in zip(paths, content_hashes)]
+        if None not in snapshots:
+            return ProjectData.from_snapshot(frames, meta, version,
+                                             lazy_details(snapshots))
+
+    data, content_hashes = build()
+    write_model(paths, *data.snapshot(), content_hashes)
+    return data
+
+
+def build_council_index(df: pd.DataFrame) -> dict:
+    """
+    Maps each council to the row positions of its projects in df
+    :param df: pd.DataFrame with an Organisations column
+    :return: dict
+    """
+    return df.groupby('Organisations', sort=False, observed=True).indices
+
+
+@metrics.stage('pandas')
+def distinguish_data(tab, cleaned_data, council: str = config.default_council,
+                     council_index: dict = None):
     if tab == "overview":
         return cleaned_data
     elif tab == "council_view":
+        if council_index is not None:
+            # Only touches the council's own rows
+            return cleaned_data.iloc[council_index.get(council, [])]
+
         return cleaned_data[cleaned_data['Organisations'] == council]
 
 
@@ -0,0 +1,288 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+import orjson
+from dash import callback_context
+from flask import Response, g, has_request_context, request
+
+CALLBACK_PATH = '/_dash-update-component'
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5,
+                   5, 10)
+BYTES_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000,
+                 5_000_000, 10_000_000)
+
+# Stages reported per callback request, in Server-Timing order
+STAGES = ('pandas', 'figure', 'serialize', 'total')
+
+
+class Histogram:
+    """
+    Prometheus histogram with a fixed label set
+    """
+
+    def __init__(self, name: str, description: str, label_names: tuple,
+                 buckets: tuple):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {
+                    'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+
+            series['counts'][bisect_left(self.buckets, value)] += 1
+            series['sum'] += value
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.description}',
+                 f'# TYPE {self.name} histogram']
+
+        with self._lock:
+            series = {k: (list(v['counts']), v['sum'])
+                      for k, v in self._series.items()}
+
+        for labels, (counts, total) in sorted(series.items()):
+            label_text = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = _labels(self.label_names + ('le',),
+                             labels + (str(bound),))
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            lines.append(f'{self.name}_sum{label_text} {total}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+
+        return lines
+
+
+class Metrics:
+    """
+    Callback timings and payload sizes for one worker process. Stages are
+    collected per request in flask.g, reported in a Server-Timing header
+    and aggregated into histograms served at /metrics.
+    """
+
+    def __init__(self):
+        self.callback_seconds = Histogram(
+            'dash_callback_seconds',
+            'Callback request duration',
+            ('callback',), SECONDS_BUCKETS)
+        self.stage_seconds = Histogram(
+            'dash_callback_stage_seconds',
+            'Time spent in each stage of a callback request',
+            ('callback', 'stage'), SECONDS_BUCKETS)
+        self.output_bytes = Histogram(
+            'dash_callback_output_bytes',
+            'Size of each callback response and of each output in it',
+            ('callback', 'output'), BYTES_BUCKETS)
+
+        self._gauges = []
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Adds the time spent in the block (or decorated function) to the
+        current request's stage. Does nothing outside a request.
+        :param name: str
+        """
+        if not has_request_context():
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stages = g.setdefault('metrics_stages', {})
+            stages[name] = stages.get(name, 0) + time.perf_counter() - start
+
+    def callback(self, func):
+        """
+        Decorator for Dash callbacks, records the callback name and the
+        time spent in the callback itself
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if has_request_context():
+                g.metrics_callback = func.__name__
+
+                # Where each output is in the response, read from the
+                # body in after_request
+                g.metrics_outputs = callback_context.outputs_list
+
+            with self.stage('callback'):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def gauge(self, name: str, description: str, func):
+        """
+        Registers a gauge read from func() when /metrics is scraped
+        :param name: str
+        :param description: str
+        :param func: zero-argument callable returning a number
+        """
+        self._gauges.append((name, description, func))
+
+    def init_app(self, server, data_version):
+        """
+        Adds the timing hooks and the /metrics route to the Flask server
+        :param server: flask.Flask
+        :param data_version: zero-argument callable, current data version
+        """
+        @server.before_request
+        def start_timer():
+            if request.path == CALLBACK_PATH:
+                g.metrics_start = time.perf_counter()
+                g.metrics_version = data_version()
+
+        @server.after_request
+        def record_timings(response):
+            if 'metrics_start' in g and 'metrics_callback' in g:
+                self._record(response)
+            return response
+
+        @server.route('/metrics')
+        def metrics_route():
+            return Response(self.render(),
+                            mimetype='text/plain; version=0.0.4')
+
+    def render(self) -> str:
+        lines = []
+        for name, description, func in self._gauges:
+            lines += [f'# HELP {name} {description}',
+                      f'# TYPE {name} gauge',
+                      f'{name}{_labels(("pid",), (str(os.getpid()),))} '
+                      f'{func()}']
+
+        for histogram in (self.callback_seconds, self.stage_seconds,
+                          self.output_bytes):
+            lines += histogram.render()
+
+        return '\n'.join(lines) + '\n'
+
+    def _record(self, response):
+        name = g.metrics_callback
+        stages = g.get('metrics_stages', {})
+
+        for output, size in _output_sizes(
+                response, g.get('metrics_outputs', [])).items():
+            self.output_bytes.observe((name, output), size)
+
+        # Includes the accounting above, so nothing the request costs is
+        # left out
+        total = time.perf_counter() - g.metrics_start
+
+        # Whatever the callback did besides pandas is building the figure,
+        # what happened outside it is Dash parsing and serializing JSON
+        callback = stages.get('callback', 0)
+        timings = {
+            'pandas': stages.get('pandas', 0),
+            'figure': max(0, callback - stages.get('pandas', 0)),
+            'serialize': max(0, total - callback),
+            'total': total,
+        }
+
+        self.callback_seconds.observe((name,), total)
+        for stage in STAGES[:-1]:
+            self.stage_seconds.observe((name, stage), timings[stage])
+
+        response.headers['Server-Timing'] = ', '.join(
+            [f'{stage};dur={timings[stage] * 1000:.2f}' for stage in STAGES]
+            + [f'data;desc="version {g.metrics_version}"'])
+
+
+def _output_sizes(response, outputs_list) -> dict:
+    """
+    Size of a callback response and of each output in it, sliced from the
+    body Dash serialized rather than serializing the outputs again. An
+    output's size includes its property name.
+    :param response: flask.Response
+    :param outputs_list: the callback's outputs, as in callback_context
+    :return: dict, 'response' or output label -> bytes
+    """
+    if response.status_code != 200 or response.direct_passthrough:
+        return {}
+
+    body = response.get_data()
+    sizes = {'response': len(body)}
+
+    if isinstance(outputs_list, dict):
+        outputs_list = [outputs_list]
+    # Pattern-matching outputs give a list of ids
+    specs = [spec for specs in outputs_list
+             for spec in (specs if isinstance(specs, list) else [specs])]
+
+    # The body is {"multi":true,"response":{id:{property:value}}}, with the
+    # outputs in callback order and no_update outputs left out
+    starts = []
+    position = 0
+    component = None
+    for spec in specs:
+        boundary = None
+        if spec['id'] != component:
+            boundary = body.find(_key(_stringify_id(spec['id'])), position)
+            if boundary < 0:
+                continue
+            component, position = spec['id'], boundary
+        start = body.find(_key(spec['property']), position)
+        if start < 0:
+            continue
+        # An output ends where the next one, or the next id, starts
+        starts.append((start, start if boundary is None else boundary,
+                       _output_label(spec)))
+        position = start + 1
+
+    # The last output runs to the closing braces
+    ends = [boundary for _, boundary, _ in starts[1:]] + [len(body) - 3]
+    for (start, _, label), end in zip(starts, ends):
+        sizes[label] = sizes.get(label, 0) + max(0, end - start)
+
+    return sizes
+
+
+def _stringify_id(component_id) -> str:
+    # As Dash keys pattern-matching ids in the response
+    if isinstance(component_id, dict):
+        return json.dumps(component_id, sort_keys=True,
+                          separators=(',', ':'))
+    return component_id
+
+
+def _key(name: str) -> bytes:
+    return orjson.dumps(name) + b':'
+
+
+def _output_label(spec: dict) -> str:
+    # Pattern-matching ids are labelled by their type, so there is one
+    # series per output rather than one per council
+    component_id = spec['id']
+    if isinstance(component_id, dict):
+        component_id = component_id.get('type', '')
+    return f'{component_id}.{spec["property"]}'
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    return '{' + ','.join(f'{n}="{_escape(v)}"'
+                          for n, v in zip(names, values)) + '}'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+metrics = Metrics()
@@ -0,0 +1,250 @@
+import threading
+from dataclasses import dataclass
+
+import pandas as pd
+
+from src import dash1, dash2, dash3, dash4, dash5
+from src.classification_cube import ClassificationCube
+from src.classification_flags import ClassificationFlags
+from src.value_index import ProjectValueIndex
+from src.load_data import SUMMARY_COLUMNS, build_council_index, \
+    get_project_classification, is_detail_column
+
+
+class ProjectDetails:
+    """
+    Free-text and classification cells of the projects, only shown in the
+    project tables. Either given up front or loaded the first time a table
+    needs them, and kept apart from the dashboards' views.
+    """
+
+    def __init__(self, frame: pd.DataFrame = None, load=None):
+        """
+        :param frame: pd.DataFrame, flat detail columns in project order
+        :param load: function returning that frame
+        """
+        self._frame = frame
+        self._load = load
+        self._table = None
+        self._lock = threading.Lock()
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """
+        The detail columns given up front, None when they are loaded lazily
+        """
+        return self._frame
+
+    @property
+    def loaded(self) -> bool:
+        return self._table is not None
+
+    @property
+    def lazy(self) -> bool:
+        return self._load is not None
+
+    def table(self, projects: pd.DataFrame,
+              classifications: tuple = ()) -> pd.DataFrame:
+        """
+        projects with the free-text columns after its summary columns and
+        the classifications last, as they are ordered in the workbook
+        :param projects: pd.DataFrame, ProjectData.projects
+        :param classifications: tuple, names of the classification columns
+        :return: pd.DataFrame
+        """
+        if self._table is None:
+            with self._lock:
+                if self._table is None:
+                    frame = self._frame if self._load is None \
+                        else self._load()
+                    self._table = _join_details(projects, frame,
+                                                classifications)
+
+        return self._table
+
+    def __getstate__(self):
+        state = dict(self.__dict__, _table=None)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def _join_details(projects: pd.DataFrame, details: pd.DataFrame,
+                  classifications: tuple):
+    position = next((i for i, column in enumerate(projects.columns)
+                     if column not in SUMMARY_COLUMNS), len(projects.columns))
+
+    details = details.set_axis(projects.index)
+    trailing = [column for column in details.columns
+                if column in classifications]
+
+    return pd.concat([projects.iloc[:, :position],
+                      details.drop(columns=trailing),
+                      projects.iloc[:, position:],
+                      details[trailing]], axis=1)
+
+
+# Per-dashboard views, built from the workbook and kept in the model snapshot
+VIEWS = ('projects', 'project_names', 'classifications', 'project_values',
+         'themes')
+
+# Columns repeating a few values on every row of the views, stored as codes
+CATEGORY_COLUMNS = ('Organisations', 'Theme')
+
+
+def _compact(view: pd.DataFrame) -> pd.DataFrame:
+    return view.astype({column: 'category' for column in CATEGORY_COLUMNS
+                        if column in view.columns})
+
+
+@dataclass(frozen=True)
+class ProjectData:
+    """
+    Cleaned project workbook shared by all dashboards. Every view is built
+    once at load time and must be treated as read-only by the callbacks.
+    """
+    # Flat project table with the summary columns
+    projects: pd.DataFrame
+
+    # Free-text and classification cells, see project_table()
+    details: ProjectDetails
+
+    # Per-dashboard views. In these and projects, councils and themes are
+    # categories.
+    project_names: pd.DataFrame
+    classifications: pd.DataFrame
+    project_values: pd.DataFrame
+    themes: pd.DataFrame
+
+    # View name -> council -> row positions in that view
+    council_index: dict
+
+    # Organisation x classification breakdown counts
+    classification_cube: ClassificationCube
+
+    # Classifications of each project as bits, rows as in projects
+    classification_flags: ClassificationFlags
+
+    # Projects sorted by value for slider range queries
+    project_value_index: ProjectValueIndex
+
+    # Control options
+    councils: tuple
+    classification_names: tuple
+    max_project_value: int
+
+    # Time of the latest change to the workbooks, see data_store.data_version
+    version: int = 1
+
+    @classmethod
+    def from_raw(cls, df: pd.DataFrame, version: int = 1,
+                 details: ProjectDetails = None) -> "ProjectData":
+        """
+        Builds the model from the preprocessed 3-level header workbook
+        :param df: pd.DataFrame
+        :param version: int
+        :param details: ProjectDetails, when df holds only the summary
+        and classification columns
+        :return: ProjectData
+        """
+        detail_columns = [c for c in df.columns if is_detail_column(c)]
+        if details is None:
+            details = ProjectDetails(df[detail_columns].set_axis(
+                [column[-1] for column in detail_columns], axis=1))
+
+        views = {
+            'projects': dash5.clean_data(df.drop(columns=detail_columns)),
+            'project_names': dash1.clean_data(df),
+            'classifications': dash2.clean_data(df),
+            'project_values': dash3.clean_data(df),
+            'themes': dash4.clean_data(df),
+        }
+        views = {name: _compact(view) for name, view in views.items()}
+
+        return cls.from_views(views, details, ClassificationFlags(df),
+                              get_project_classification(df), version)
+
+    @classmethod
+    def from_views(cls, views: dict, details: ProjectDetails,
+                   classification_flags: ClassificationFlags,
+                   classification_names, version: int = 1) -> "ProjectData":
+        """
+        Builds the indexes and control options from the cleaned views
+        :param views: dict of pd.DataFrame, one per name in VIEWS
+        :param details: ProjectDetails
+        :param classification_flags: ClassificationFlags
+        :param classification_names: iterable of str
+        :param version: int
+        :return: ProjectData
+        """
+        value_index = ProjectValueIndex(views['project_values'])
+
+        return cls(
+            **views,
+            details=details,
+            council_index={name: build_council_index(view)
+                           for name, view in views.items()},
+            classification_cube=ClassificationCube(views['classifications']),
+            classification_flags=classification_flags,
+            project_value_index=value_index,
+            councils=tuple(
+                sorted(views['projects']['Organisations'].unique())),
+            classification_names=tuple(classification_names),
+            max_project_value=value_index.max,
+            version=version,
+        )
+
+    def snapshot(self) -> tuple:
+        """
+        The model as frames and JSON values for the model snapshot. The
+        indexes are rebuilt from the views when it is loaded, and lazily
+        loaded details are read from the workbook snapshots again.
+        :return: tuple of dict of pd.DataFrame and dict
+        """
+        frames = {name: getattr(self, name) for name in VIEWS}
+        bits = self.classification_flags.bits
+        frames['classification_flags'] = pd.DataFrame(
+            {f'word{i}': bits[:, i] for i in range(bits.shape[1])})
+        if not self.details.lazy:
+            frames['details'] = self.details.frame
+
+        meta = {
+            'classification_names': list(self.classification_names),
+            'classification_flags': list(self.classification_flags.names),
+            'lazy_details': self.details.lazy,
+        }
+
+        return frames, meta
+
+    @classmethod
+    def from_snapshot(cls, frames: dict, meta: dict, version: int = 1,
+                      details: ProjectDetails = None) -> "ProjectData":
+        """
+        Model read back from snapshot()
+        :param frames: dict of pd.DataFrame
+        :param meta: dict
+        :param version: int
+        :param details: ProjectDetails, when they are loaded lazily
+        :return: ProjectData
+        """
+        if details is None:
+            details = ProjectDetails(frames['details'])
+        flags = ClassificationFlags.from_bits(
+            meta['classification_flags'],
+            frames['classification_flags'].to_numpy())
+
+        return cls.from_views({name: frames[name] for name in VIEWS},
+                              details, flags, meta['classification_names'],
+                              version)
+
+    def project_table(self) -> pd.DataFrame:
+        """
+        Every workbook column of the projects, for the project tables. The
+        free-text and classification cells are loaded on the first call.
+        :return: pd.DataFrame, rows as in projects
+        """
+        return self.details.table(self.projects,
+                                  self.classification_flags.names)
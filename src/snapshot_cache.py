@@ -0,0 +1,441 @@
+import glob
+import hashlib
+import json
+import os
+import warnings
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Bump whenever the on-disk layout changes so stale snapshots are re-parsed
+SNAPSHOT_FORMAT = 2
+
+# Cell kinds for workbook columns that mix numbers and text
+MISSING, INTEGER, FLOAT, TEXT = 0, 1, 2, 3
+
+# The model snapshot is this magic, the length of its JSON header and the
+# header, then one Arrow IPC file per frame, each at an aligned offset
+MODEL_MAGIC = b'PDMODEL1'
+MODEL_ALIGNMENT = 64
+
+
+def snapshot_path(path: str) -> str:
+    """
+    Location of the snapshot written next to the workbook
+    :param path: str
+    :return: str
+    """
+    return os.path.splitext(path)[0] + '.snapshot.arrow'
+
+
+def model_path(paths: list) -> str:
+    """
+    Location of the cleaned model snapshot, written next to the first
+    workbook and named after the whole set when there are several
+    :param paths: list of workbook paths
+    :return: str
+    """
+    stem = os.path.splitext(paths[0])[0]
+    if len(paths) > 1:
+        digest = hashlib.sha256(
+            '\n'.join(map(os.path.abspath, paths)).encode())
+        stem = f'{stem}.{digest.hexdigest()[:12]}'
+
+    return stem + '.model.arrow'
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def workbook_key(path: str, content_hash: str = None) -> dict:
+    """
+    Identifies a workbook by size, mtime and content hash
+    :param path: str
+    :param content_hash: str, hashed from the file if not given
+    :return: dict
+    """
+    stat = os.stat(path)
+
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': content_hash or file_hash(path),
+        'format': SNAPSHOT_FORMAT,
+        'pandas': pd.__version__,
+    }
+
+
+def load_snapshot(path: str, select=None):
+    """
+    Reads the memory-mapped snapshot of a workbook if it is still current
+    :param path: str, workbook path
+    :param select: function taking a column name, only the columns it
+    returns True for are decoded
+    :return: pd.DataFrame or None when there is no valid snapshot
+    """
+    snapshot = map_snapshot(path)
+    return None if snapshot is None else decode_snapshot(snapshot, select)
+
+
+def map_snapshot(path: str, content_hash: str = None):
+    """
+    Memory-maps the snapshot of a workbook without decoding it. Size and
+    mtime are checked first, the content hash only when they differ. Given
+    content_hash, the snapshot must have been written from that version of
+    the workbook instead, whether or not the workbook has changed since.
+    The mapping stays readable after the snapshot is replaced.
+    :param path: str, workbook path
+    :param content_hash: str
+    :return: tuple of the pa.Table and its metadata, or None when there is
+    no valid snapshot
+    """
+    cache_path = snapshot_path(path)
+    if not os.path.exists(cache_path):
+        return None
+
+    try:
+        with pa.memory_map(cache_path) as source:
+            table = pa.ipc.open_file(source).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+    meta = json.loads(table.schema.metadata[b'snapshot'])
+    key = meta['key']
+
+    if key['format'] != SNAPSHOT_FORMAT or key['pandas'] != pd.__version__:
+        return None
+
+    if content_hash is not None:
+        return (table, meta) if key['sha256'] == content_hash else None
+
+    stat = os.stat(path)
+    if key['size'] != stat.st_size or key['mtime_ns'] != stat.st_mtime_ns:
+        # Touched but possibly unchanged, e.g. after a checkout or copy
+        content_hash = file_hash(path)
+        if content_hash != key['sha256']:
+            return None
+
+        meta['key'] = workbook_key(path, content_hash)
+        _write_table(path, table.replace_schema_metadata(
+            {b'snapshot': json.dumps(meta).encode()}))
+
+    return table, meta
+
+
+def decode_snapshot(snapshot: tuple, select=None) -> pd.DataFrame:
+    """
+    Decodes a snapshot mapped by map_snapshot
+    :param snapshot: tuple of the pa.Table and its metadata
+    :param select: function taking a column name, only the columns it
+    returns True for are decoded
+    :return: pd.DataFrame
+    """
+    return _decode_table(*snapshot, select)
+
+
+def snapshot_hash(snapshot: tuple) -> str:
+    """
+    Content hash of the workbook a mapped snapshot was written from
+    :param snapshot: tuple of the pa.Table and its metadata
+    :return: str
+    """
+    return snapshot[1]['key']['sha256']
+
+
+def write_snapshot(path: str, df: pd.DataFrame, content_hash: str = None):
+    """
+    Writes the preprocessed workbook frame as an uncompressed Arrow IPC file
+    so later loads can memory-map it. Failures only skip the cache.
+    :param path: str, workbook path
+    :param df: pd.DataFrame, output of read_workbook
+    :param content_hash: str
+    """
+    table = _encode_frame(df)
+    if table is None:
+        warnings.warn(f"Cannot snapshot {path}: unsupported cell types")
+        return
+
+    meta = json.loads(table.schema.metadata[b'snapshot'])
+    meta['key'] = workbook_key(path, content_hash)
+    _write_table(path, table.replace_schema_metadata(
+        {b'snapshot': json.dumps(meta).encode()}))
+
+
+def _write_table(path: str, table: pa.Table):
+    cache_path = snapshot_path(path)
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        # Workers may race on a cold start, so publish atomically
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        warnings.warn(f"Cannot write snapshot {cache_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@lru_cache(maxsize=None)
+def source_hash() -> str:
+    """
+    Hash of the code under src/, so model snapshots written by other code
+    are rebuilt rather than loaded
+    :return: str
+    """
+    digest = hashlib.sha256()
+
+    src = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(glob.glob(os.path.join(src, '*.py'))):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def load_model(paths: list):
+    """
+    Reads the frames of the cleaned model of a set of workbooks if the
+    workbooks and the code building it are unchanged since they were
+    written. The key is checked from the JSON header, and the frames are
+    Arrow data, so reading the file never runs code from it.
+    :param paths: list of workbook paths
+    :return: tuple of the frames, dict of pd.DataFrame, the model's JSON
+    values and the content hashes of the workbooks it was built from, or
+    None when there is no valid model snapshot
+    """
+    cache_path = model_path(paths)
+    if not os.path.exists(cache_path):
+        return None
+
+    try:
+        with open(cache_path, 'rb') as f:
+            if f.read(len(MODEL_MAGIC)) != MODEL_MAGIC:
+                return None
+            header_size = int.from_bytes(f.read(8), 'little')
+            header = json.loads(f.read(header_size))
+
+        key = header['key']
+        if (key['format'], key['pandas'], key['numpy'], key['code'],
+                len(key['workbooks'])) != \
+                (SNAPSHOT_FORMAT, pd.__version__, np.__version__,
+                 source_hash(), len(paths)):
+            return None
+
+        content_hashes = []
+        touched = False
+        for path, workbook in zip(paths, key['workbooks']):
+            stat = os.stat(path)
+            if workbook['size'] == stat.st_size and \
+                    workbook['mtime_ns'] == stat.st_mtime_ns:
+                content_hashes.append(workbook['sha256'])
+                continue
+
+            content_hash = file_hash(path)
+            if content_hash != workbook['sha256']:
+                return None
+            content_hashes.append(content_hash)
+            touched = True
+
+        start = _aligned(len(MODEL_MAGIC) + 8 + header_size)
+        frames = {}
+        with pa.memory_map(cache_path) as source:
+            for name, (offset, size) in header['parts'].items():
+                # Zero-copy slices of the mapped file
+                table = pa.ipc.open_file(
+                    source.read_at(size, start + offset)).read_all()
+                frames[name] = _decode_table(
+                    table, json.loads(table.schema.metadata[b'snapshot']))
+    except (OSError, ValueError, KeyError, TypeError, pa.ArrowInvalid):
+        return None
+
+    if touched:
+        # Touched but unchanged, refresh the key so the next load skips the
+        # hash
+        write_model(paths, frames, header['meta'], content_hashes)
+
+    return frames, header['meta'], content_hashes
+
+
+def write_model(paths: list, frames: dict, meta: dict,
+                content_hashes: list = None):
+    """
+    Writes the frames of the cleaned model next to the workbooks, so a
+    restart skips parsing and cleaning them. Failures only skip the cache.
+    :param paths: list of workbook paths
+    :param frames: dict of pd.DataFrame, see ProjectData.snapshot
+    :param meta: dict of JSON values, see ProjectData.snapshot
+    :param content_hashes: list of str, one per workbook
+    """
+    key = {
+        'workbooks': [workbook_key(path, content_hash) for path, content_hash
+                      in zip(paths, content_hashes or [None] * len(paths))],
+        'format': SNAPSHOT_FORMAT,
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'code': source_hash(),
+    }
+
+    cache_path = model_path(paths)
+
+    parts, blobs, offset = {}, [], 0
+    for name, df in frames.items():
+        table = _encode_frame(df)
+        if table is None:
+            warnings.warn(f"Cannot write model snapshot {cache_path}: "
+                          f"unsupported cell types in {name}")
+            return
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        blob = sink.getvalue()
+
+        parts[name] = [offset, blob.size]
+        blobs.append(blob)
+        offset += _aligned(blob.size)
+
+    header = json.dumps({'key': key, 'meta': meta, 'parts': parts}).encode()
+
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(MODEL_MAGIC)
+            f.write(len(header).to_bytes(8, 'little'))
+            f.write(header)
+            # Frames start at aligned offsets, counted from the first one
+            for blob in blobs:
+                f.write(bytes(_aligned(f.tell()) - f.tell()))
+                f.write(blob)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        warnings.warn(f"Cannot write model snapshot {cache_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _aligned(size: int) -> int:
+    return -(-size // MODEL_ALIGNMENT) * MODEL_ALIGNMENT
+
+
+def _encode_frame(df: pd.DataFrame):
+    arrays = {'index': pa.array(df.index.to_numpy())}
+    columns = []
+
+    for i, (name, series) in enumerate(df.items()):
+        field = f'c{i}'
+        # Workbook columns have 3-level names, the model's are flat
+        stored_name = list(name) if isinstance(name, tuple) else name
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            arrays[field] = pa.array(series.cat.codes.to_numpy())
+            columns.append({'name': stored_name, 'encoding': 'category',
+                            'categories': series.cat.categories.tolist()})
+            continue
+
+        if series.dtype.kind in 'biuf':
+            arrays[field] = pa.array(series.to_numpy())
+            columns.append({'name': stored_name, 'encoding': 'plain'})
+            continue
+
+        if isinstance(series.dtype, pd.StringDtype):
+            # Decoded without copying, so the strings stay in the mapped file
+            arrays[field] = pa.array(series)
+            columns.append({'name': stored_name, 'encoding': 'text',
+                            'dtype': str(series.dtype)})
+            continue
+
+        # Excel columns can mix numbers and text, which Arrow cannot store in
+        # one column, so split them into kind, number and text parts
+        values = series.to_numpy(dtype=object)
+        kinds = np.full(len(values), MISSING, dtype=np.int8)
+        numbers = np.zeros(len(values), dtype=np.float64)
+        texts = np.full(len(values), None, dtype=object)
+
+        for j, value in enumerate(values):
+            if isinstance(value, str):
+                kinds[j] = TEXT
+                texts[j] = value
+            elif isinstance(value, (bool, np.bool_)):
+                return None
+            elif isinstance(value, (int, np.integer)):
+                kinds[j] = INTEGER
+                numbers[j] = value
+            elif isinstance(value, (float, np.floating)):
+                if not np.isnan(value):
+                    kinds[j] = FLOAT
+                    numbers[j] = value
+            elif value is not None and value is not pd.NA:
+                return None
+
+        arrays[f'{field}.kind'] = pa.array(kinds)
+        arrays[f'{field}.number'] = pa.array(numbers)
+        arrays[f'{field}.text'] = pa.array(texts, type=pa.string())
+        columns.append({'name': stored_name, 'encoding': 'mixed',
+                        'dtype': str(series.dtype)})
+
+    meta = {'columns': columns}
+    return pa.table(arrays).replace_schema_metadata(
+        {b'snapshot': json.dumps(meta).encode()})
+
+
+def _decode_table(table: pa.Table, meta: dict, select=None) -> pd.DataFrame:
+    data = {}
+
+    for i, column in enumerate(meta['columns']):
+        field = f'c{i}'
+        name = column['name']
+        if isinstance(name, list):
+            name = tuple(name)
+        if select is not None and not select(name):
+            continue
+
+        if column['encoding'] == 'category':
+            data[name] = pd.Series(pd.Categorical.from_codes(
+                table.column(field).to_numpy(), column['categories']))
+            continue
+
+        if column['encoding'] == 'plain':
+            data[name] = pd.Series(table.column(field).to_numpy())
+            continue
+
+        if column['encoding'] == 'text':
+            dtype = pd.api.types.pandas_dtype(column['dtype'])
+            data[name] = pd.Series(
+                dtype.__from_arrow__(table.column(field)))
+            continue
+
+        kinds = table.column(f'{field}.kind').to_numpy()
+        numbers = table.column(f'{field}.number').to_numpy()
+        texts = table.column(f'{field}.text').to_numpy(zero_copy_only=False)
+
+        values = np.full(len(kinds), np.nan, dtype=object)
+        values[kinds == TEXT] = texts[kinds == TEXT]
+        values[kinds == FLOAT] = numbers[kinds == FLOAT]
+        values[kinds == INTEGER] = [
+            int(x) for x in numbers[kinds == INTEGER]]
+
+        series = pd.Series(values, dtype=object)
+        if column['dtype'] != 'object':
+            series = series.astype(column['dtype'])
+        data[name] = series
+
+    index = pd.Index(table.column('index').to_numpy())
+    if not data:
+        return pd.DataFrame(index=index)
+
+    df = pd.DataFrame(data)
+    df.index = index
+
+    return df
@@ -0,0 +1,322 @@
+import math
+import re
+
+import numpy as np
+import pandas as pd
+from dash import dcc, html
+
+from assets.config import Config
+from src.metrics import metrics
+
+config = Config()
+
+TABLE_TYPE = 'project-table'
+
+# Classification filter above a server-side table, matched to it by tab
+# and council
+CLASSIFICATION_FILTER_TYPE = 'project-table-classifications'
+CLASSIFICATION_MATCH_TYPE = 'project-table-classification-match'
+
+FILTER_PART = re.compile(
+    r'^\s*\{(?P<column>[^}]+)\}\s+(?P<operator>\S+)\s*(?P<value>.*?)\s*$')
+# Operators without an operand, e.g. {Project Value} is blank
+UNARY_PART = re.compile(
+    r'^\s*\{(?P<column>[^}]+)\}\s+is\s+(?P<negate>not\s+)?'
+    r'(?P<operator>\S+)\s*$')
+
+# DataTable filter operators, symbolic and word forms
+OPERATORS = {
+    '=': 'eq', 'eq': 'eq',
+    '!=': 'ne', 'ne': 'ne',
+    '<': 'lt', 'lt': 'lt',
+    '<=': 'le', 'le': 'le',
+    '>': 'gt', 'gt': 'gt',
+    '>=': 'ge', 'ge': 'ge',
+    'contains': 'contains',
+    'datestartswith': 'datestartswith',
+}
+
+UNARY_OPERATORS = ('blank', 'nil', 'num', 'str', 'bool', 'even', 'odd')
+
+
+def table_props(df: pd.DataFrame, page_size: int, tab: str,
+                council: str) -> dict:
+    """
+    DataTable data and paging props for df. In server-side mode only the
+    first page is sent, later pages come from query_table.
+    :param df: pd.DataFrame, rows shown in the table
+    :param page_size: int
+    :param tab: str, used with council to find the rows again
+    :param council: str
+    :return: dict
+    """
+    if not config.server_side_tables:
+        return {'data': df.to_dict('records')}
+
+    data, page_count = query_table(df, 0, page_size)
+
+    return {
+        'id': {'type': TABLE_TYPE, 'tab': tab, 'council': council},
+        'data': data,
+        'page_count': page_count,
+        'page_action': 'custom',
+        'sort_action': 'custom',
+        'sort_mode': 'multi',
+        'sort_by': [],
+        'filter_action': 'custom',
+        'filter_query': '',
+    }
+
+
+def with_classification_filter(table, classifications, tab: str,
+                               council: str):
+    """
+    The table with a filter on its projects' classifications above it, for
+    server-side tables. Projects classified under any or all of the
+    selected classifications are shown, see update_project_table in app.py.
+    :param table: DataTable
+    :param classifications: iterable of classification names
+    :param tab: str, as given to table_props
+    :param council: str
+    :return: the table, or a Div holding the filter and the table
+    """
+    if not config.server_side_tables:
+        return table
+
+    def component_id(type_):
+        return {'type': type_, 'tab': tab, 'council': council}
+
+    return html.Div([
+        html.Div([
+            dcc.Dropdown(
+                id=component_id(CLASSIFICATION_FILTER_TYPE),
+                options=list(classifications),
+                value=[],
+                multi=True,
+                searchable=True,
+                placeholder="Filter by classification",
+            ),
+            dcc.RadioItems(
+                id=component_id(CLASSIFICATION_MATCH_TYPE),
+                options=[{'label': 'Any of them', 'value': 'any'},
+                         {'label': 'All of them', 'value': 'all'}],
+                value='any',
+                inline=True,
+            ),
+        ], style={'marginBottom': '10px'}),
+        table,
+    ])
+
+
+@metrics.stage('pandas')
+def query_table(df: pd.DataFrame, page_current: int, page_size: int,
+                sort_by: list = None, filter_query: str = '',
+                keep: np.ndarray = None):
+    """
+    Filters, sorts and pages df for a custom-paged DataTable
+    :param df: pd.DataFrame
+    :param page_current: int
+    :param page_size: int
+    :param sort_by: list of {'column_id', 'direction'} dicts
+    :param filter_query: str, DataTable filter expression
+    :param keep: np.ndarray of bool, one per row of df, the rows other
+    filters left, e.g. the classification filter
+    :return: records of the requested page and the page count
+    """
+    # Filter and sort row positions so only the requested page is copied out
+    # of df, which may be shared with other workers
+    rows = filter_rows(df, filter_query)
+    if keep is not None:
+        rows = rows[keep[rows]]
+    rows = sort_rows(df, sort_by or [], rows)
+
+    page_count = max(1, math.ceil(len(rows) / page_size))
+    start = page_current * page_size
+
+    return (df.iloc[rows[start:start + page_size]].to_dict('records'),
+            page_count)
+
+
+def filter_rows(df: pd.DataFrame, filter_query: str) -> np.ndarray:
+    """
+    :param df: pd.DataFrame
+    :param filter_query: str, DataTable filter expression
+    :return: np.ndarray, positions of the matching rows
+    :raises ValueError: if a clause has an unknown column or operator
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if not filter_query:
+        return np.flatnonzero(mask)
+
+    for part in filter_query.split(' && '):
+        mask &= _clause_mask(df, part).to_numpy(dtype=bool, na_value=False)
+
+    return np.flatnonzero(mask)
+
+
+def sort_rows(df: pd.DataFrame, sort_by: list, rows: np.ndarray) -> np.ndarray:
+    """
+    :param df: pd.DataFrame
+    :param sort_by: list of {'column_id', 'direction'} dicts
+    :param rows: np.ndarray, positions of the rows to sort
+    :return: np.ndarray, rows in sorted order
+    """
+    sort_by = [s for s in sort_by if s['column_id'] in df.columns]
+    if not sort_by:
+        return rows
+
+    # Only the sort keys are built, not a sorted copy of every column
+    keys, ascending = {}, []
+    for s in sort_by:
+        for key in _sort_keys(df[s['column_id']].iloc[rows]):
+            keys[len(keys)] = key.reset_index(drop=True)
+            ascending.append(s['direction'] == 'asc')
+    keys = pd.DataFrame(keys)
+    order = keys.sort_values(
+        list(keys.columns),
+        ascending=ascending,
+        kind='stable',
+        na_position='last').index.to_numpy()
+
+    return rows[order]
+
+
+def _clause_mask(df: pd.DataFrame, part: str) -> pd.Series:
+    match = UNARY_PART.match(part)
+    if match is not None and match['operator'] in UNARY_OPERATORS:
+        s = _column(df, match['column'], part)
+        mask = _unary_mask(s, match['operator'])
+        return ~mask if match['negate'] else mask
+
+    match = FILTER_PART.match(part)
+    if match is None:
+        raise ValueError(f'Unsupported filter: {part!r}')
+    s = _column(df, match['column'], part)
+
+    operator = match['operator']
+    case = True
+    # s/i prefixes select case-sensitive or insensitive matching
+    if operator[0] in 'si' and operator[1:] in OPERATORS:
+        case = operator[0] == 's'
+        operator = operator[1:]
+    if operator not in OPERATORS:
+        raise ValueError(f'Unsupported filter operator: {part!r}')
+
+    return _filter_mask(s, OPERATORS[operator], match['value'], case)
+
+
+def _column(df: pd.DataFrame, column: str, part: str) -> pd.Series:
+    if column not in df.columns:
+        raise ValueError(f'Unknown filter column: {part!r}')
+    return df[column]
+
+
+def _unquote(value: str):
+    """
+    :param value: str, operand text from the filter query
+    :return: the text without its quotes, and whether it was quoted
+    """
+    if len(value) > 1 and value[0] == value[-1] and value[0] in '\'"`':
+        return value[1:-1].replace('\\' + value[0], value[0]), True
+    return value, False
+
+
+def _parse_number(value: str):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _is_number(x) -> bool:
+    return isinstance(x, (int, float, np.number)) and not isinstance(
+        x, (bool, np.bool_))
+
+
+def _unary_mask(s: pd.Series, operator: str) -> pd.Series:
+    # As the DataTable's own filtering, nil is a missing cell and blank is
+    # a missing or whitespace-only cell
+    missing = s.isna()
+    if operator == 'nil':
+        return missing
+    if operator == 'blank':
+        return missing | _as_text(s).str.strip().eq('')
+
+    if s.dtype.kind in 'iuf':
+        numbers = s.astype(float)
+        is_number = ~missing
+    else:
+        values = s.astype(object)
+        is_number = values.map(_is_number).astype(bool) & ~missing
+        numbers = pd.to_numeric(values.where(is_number), errors='coerce')
+
+    if operator == 'num':
+        return is_number
+    if operator == 'str':
+        return s.astype(object).map(lambda x: isinstance(x, str)).astype(bool)
+    if operator == 'bool':
+        return s.astype(object).map(
+            lambda x: isinstance(x, (bool, np.bool_))).astype(bool)
+
+    # even / odd, only for whole numbers
+    remainder = numbers % 2
+    return is_number & remainder.eq(0 if operator == 'even' else 1)
+
+
+def _as_text(s: pd.Series) -> pd.Series:
+    return s.astype(object).where(s.notna(), '').astype(str)
+
+
+def _filter_mask(s: pd.Series, operator: str, value: str, case: bool):
+    value, quoted = _unquote(value)
+
+    # Text operators match the operand as typed, so 50 finds "50" rather
+    # than "50.0"
+    if operator in ('contains', 'datestartswith'):
+        text = _as_text(s)
+        if not case:
+            text, value = text.str.lower(), value.lower()
+
+        if operator == 'contains':
+            return text.str.contains(value, regex=False)
+        return text.str.startswith(value)
+
+    number = None if quoted else _parse_number(value)
+    if number is not None:
+        # Workbook columns mix numbers and text, text never matches a number
+        s, value = pd.to_numeric(s, errors='coerce'), number
+    else:
+        s = _as_text(s)
+        if not case:
+            s, value = s.str.lower(), value.lower()
+
+    return {
+        'eq': s.__eq__, 'ne': s.__ne__, 'lt': s.__lt__,
+        'le': s.__le__, 'gt': s.__gt__, 'ge': s.__ge__,
+    }[operator](value)
+
+
+def _sort_keys(s: pd.Series) -> list:
+    """
+    :param s: pd.Series, one sorted column
+    :return: list of pd.Series, keys sorting the column, missing cells
+    missing in every key so they sort last in either direction
+    """
+    if s.dtype.kind in 'biuf':
+        return [s]
+
+    # Workbook columns mix numbers and text. Numbers sort by value before
+    # the text, which sorts as text, so a name that happens to be a number
+    # does not reorder the rest of its column.
+    values = s.astype(object)
+    is_number = values.map(_is_number).astype(bool).to_numpy()
+    present = s.notna().to_numpy()
+    is_text = present & ~is_number
+    if not is_text.any():
+        return [pd.to_numeric(values, errors='coerce')]
+
+    kind = pd.Series(np.where(is_number, 0.0, 1.0), index=s.index).where(
+        present)
+    numbers = pd.to_numeric(values.where(is_number), errors='coerce')
+    text = _as_text(s).str.lower().where(is_text)
+    return [kind, numbers, text]
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from src.metrics import metrics
+
+
+class ProjectValueIndex:
+    """
+    Projects sorted by value, answering min/max and value range queries
+    with binary search. Ranges are slices of the sorted frame, not copies.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        :param df: pd.DataFrame, output of dash3.clean_data (sorted by value)
+        """
+        self.frame = df
+        self.values = df['Project Value'].to_numpy()
+
+        if not np.all(self.values[:-1] <= self.values[1:]):
+            raise ValueError("Project values must be sorted ascending")
+
+    @property
+    def min(self) -> int:
+        return int(self.values[0]) if len(self.values) else 0
+
+    @property
+    def max(self) -> int:
+        return int(self.values[-1]) if len(self.values) else 0
+
+    def positions(self, low, high):
+        """
+        Start and end positions of the projects valued within [low, high]
+        :return: tuple
+        """
+        start = np.searchsorted(self.values, low, side='left')
+        end = np.searchsorted(self.values, high, side='right')
+
+        return int(start), int(max(start, end))
+
+    @metrics.stage('pandas')
+    def range(self, low, high) -> pd.DataFrame:
+        """
+        Projects valued within [low, high], in ascending value order
+        :return: pd.DataFrame
+        """
+        start, end = self.positions(low, high)
+        return self.frame.iloc[start:end]
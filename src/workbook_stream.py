@@ -0,0 +1,263 @@
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+from assets.config import Config
+
+config = Config()
+
+HEADER_ROWS = 3
+
+ORGANISATIONS = (
+    "Fast Followers member", "Unnamed: 0_level_1", "Organisations")
+PROJECT_NAME = (
+    "Fast Followers member", "Unnamed: 1_level_1", "Project Name")
+
+
+def read_header(path: str) -> pd.MultiIndex:
+    """
+    Columns of the workbook's 3-level header, as pd.read_excel names them
+    :param path: str
+    :return: pd.MultiIndex
+    """
+    return pd.read_excel(path, header=list(range(HEADER_ROWS)),
+                         nrows=0).columns
+
+
+def iter_workbook(path: str, chunk_rows: int = config.stream_chunk_rows):
+    """
+    Reads the workbook through openpyxl's read-only row iterator and yields
+    it as typed frames of up to chunk_rows rows, with the Organisations
+    forward fill and the total rows removed as in load_data.read_workbook.
+    Only one chunk of cells is held at a time.
+    :param path: str
+    :param chunk_rows: int
+    :return: iterator of pd.DataFrame, indexed by row as read_workbook is
+    """
+    for chunk, _ in _read_chunks(path, chunk_rows):
+        yield chunk
+
+
+def read_workbook_streaming(path: str,
+                            chunk_rows: int = config.stream_chunk_rows):
+    """
+    Same frame as load_data.read_workbook, built from iter_workbook chunks
+    so the parsed cells never exist as one list of rows
+    :param path: str
+    :param chunk_rows: int
+    :return: pd.DataFrame
+    """
+    chunks, kinds = [], []
+    for chunk, chunk_kinds in _read_chunks(path, chunk_rows):
+        chunks.append(chunk)
+        kinds.append(chunk_kinds)
+
+    if not chunks:
+        return pd.DataFrame(columns=read_header(path))
+
+    columns = chunks[0].columns
+    data = {}
+    for i, column in enumerate(columns):
+        dtype = _column_dtype([chunk_kinds[i] for chunk_kinds in kinds])
+        data[column] = _concat_column(
+            [chunk.iloc[:, i] for chunk in chunks], dtype)
+
+    df = pd.DataFrame(data, columns=columns)
+    df.index = pd.Index(
+        np.concatenate([chunk.index.to_numpy() for chunk in chunks]))
+
+    return df
+
+
+class WorkbookAggregates:
+    """
+    Per-council project counts and the dash2 classification counts built
+    one chunk at a time, for sheets too large to hold. Memory grows with
+    the number of councils and distinct projects, not with the rows.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._projects = set()
+        self._classification_counts = None
+
+    def add(self, chunk: pd.DataFrame):
+        # The dashboards import load_data, which imports this module
+        from src.dash2 import classification_counts
+
+        self.rows += len(chunk)
+        self._projects.update(zip(chunk[ORGANISATIONS],
+                                  chunk[PROJECT_NAME]))
+
+        counts = classification_counts(chunk)
+        if self._classification_counts is None:
+            self._classification_counts = counts
+        else:
+            self._classification_counts = self._classification_counts.add(
+                counts, fill_value=0).astype('int64')
+
+    def project_counts(self) -> pd.Series:
+        """
+        Distinct projects per council, as the project count dashboard
+        counts them
+        :return: pd.Series
+        """
+        return pd.Series(
+            [organisation for organisation, _ in self._projects],
+            dtype=object).value_counts().sort_index().rename('Project Counts')
+
+    def classifications(self) -> pd.DataFrame:
+        """
+        :return: pd.DataFrame, same as dash2.clean_data on the whole sheet
+        """
+        from src.dash2 import melt_classification_counts
+
+        return melt_classification_counts(self._classification_counts)
+
+
+def aggregate_workbook(path: str, chunk_rows: int = config.stream_chunk_rows):
+    """
+    Streams the workbook into its aggregates without keeping its rows
+    :param path: str
+    :param chunk_rows: int
+    :return: WorkbookAggregates
+    """
+    aggregates = WorkbookAggregates()
+    for chunk in iter_workbook(path, chunk_rows):
+        aggregates.add(chunk)
+    return aggregates
+
+
+def _convert_cell(cell):
+    # As pandas' openpyxl reader converts cells
+    if cell.value is None:
+        return ''
+    elif cell.data_type == TYPE_ERROR:
+        return np.nan
+    elif cell.data_type == TYPE_NUMERIC:
+        value = int(cell.value)
+        if value == cell.value:
+            return value
+        return float(cell.value)
+
+    return cell.value
+
+
+def _read_chunks(path: str, chunk_rows: int):
+    """
+    Chunks of iter_workbook with the dtype, whether it has values and
+    whether it has missing cells, of each column before the total rows
+    were removed
+    """
+    columns = read_header(path)
+    width = len(columns)
+
+    book = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = book.worksheets[0]
+        sheet.reset_dimensions()
+
+        rows, positions, organisation = [], [], None
+        blank = None
+        for position, row in enumerate(
+                sheet.iter_rows(min_row=HEADER_ROWS + 1)):
+            values = [_convert_cell(cell) for cell in row[:width]]
+            if all(value == '' for value in values):
+                blank = position
+                continue
+
+            # Blank rows before the last row are read as missing cells, so
+            # one of each run is kept for typing the columns. Like the
+            # total rows, they have no project name and are dropped.
+            if blank is not None:
+                rows.append([''] * width)
+                positions.append(blank)
+                blank = None
+            rows.append(values + [''] * (width - len(values)))
+            positions.append(position)
+
+            if len(rows) >= chunk_rows:
+                df, kinds, organisation = _chunk(rows, positions, columns,
+                                                 organisation)
+                rows, positions = [], []
+                yield df, kinds
+
+        if rows:
+            df, kinds, _ = _chunk(rows, positions, columns, organisation)
+            yield df, kinds
+    finally:
+        book.close()
+
+
+def _chunk(rows: list, positions: list, columns: pd.MultiIndex,
+           organisation):
+    """
+    Typed frame of rows with the forward fill carried over from the
+    previous chunk, the kinds of its columns and the last organisation for
+    the next chunk
+    """
+    df = pd.io.parsers.TextParser(rows, header=None).read()
+    df.columns = columns
+    df.index = pd.Index(positions)
+
+    missing = df.isna()
+    kinds = list(zip(df.dtypes, ~missing.all(), missing.any()))
+
+    organisations = df[ORGANISATIONS].ffill()
+    if organisation is not None:
+        organisations = organisations.fillna(organisation)
+    df[ORGANISATIONS] = organisations
+    if organisations.notna().any():
+        organisation = organisations.iloc[-1]
+
+    # Cells that are not text count as total rows, as with the .str
+    # accessor on the whole column. Kept as objects so the missing names
+    # stay missing, and the accessor works on a chunk without any text.
+    names = df[PROJECT_NAME]
+    names = names.where(names.map(type) == str).astype(object)
+    df = df[~names.str.lower().str.contains("total", na=True)]
+
+    return df, kinds, organisation
+
+
+def _column_dtype(kinds: list):
+    """
+    dtype pd.read_excel infers for a column from the kinds of its chunks
+    """
+    dtypes = {dtype for dtype, has_values, _ in kinds if has_values}
+    has_missing = any(has_missing for _, _, has_missing in kinds)
+
+    if not dtypes:
+        return kinds[0][0]
+    if len(dtypes) == 1:
+        dtype, = dtypes
+        # Missing cells turn ints into floats and bools into objects
+        if has_missing and dtype.kind in 'iu':
+            return np.dtype('float64')
+        if has_missing and dtype.kind == 'b':
+            return np.dtype(object)
+        return dtype
+    if all(dtype.kind in 'iuf' for dtype in dtypes):
+        return np.dtype('float64')
+    return np.dtype(object)
+
+
+def _concat_column(parts: list, dtype) -> pd.Series:
+    if dtype != object:
+        return pd.concat([part.astype(dtype) for part in parts],
+                         ignore_index=True)
+
+    # Whole numbers in float chunks are ints in the cells, as pd.read_excel
+    # keeps them in a column that also holds text
+    return pd.Series(np.concatenate([_cell_values(part) for part in parts]),
+                     dtype=object)
+
+
+def _cell_values(part: pd.Series) -> np.ndarray:
+    values = part.to_numpy(dtype=object)
+    if part.dtype.kind == 'f':
+        numbers = part.to_numpy()
+        whole = ~np.isnan(numbers) & (numbers == np.floor(numbers))
+        values[whole] = [int(value) for value in numbers[whole]]
+    return values